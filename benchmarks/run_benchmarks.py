@@ -0,0 +1,264 @@
+import argparse
+import ipaddress
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts.placeholder_processor import PlaceholderProcessor
+from scripts.subnet_carver import SubnetCarver
+from scripts.terraform_data_external import TerraformDataExternal
+from scripts.vpc_blueprint import VpcGenerator, generate_all
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_BASELINE = os.path.join(BENCHMARKS_DIR, "baseline.json")
+
+# A benchmark regresses when it is this much slower than the baseline.
+DEFAULT_THRESHOLD = 0.35
+
+# Timed runs per benchmark; the median of many runs is stable under load.
+DEFAULT_REPEAT = 15
+
+
+def calibrate():
+    """
+    Time a fixed pure-Python workload to normalize results across machines.
+
+    :return: Seconds taken by the calibration loop.
+    """
+    start = time.perf_counter()
+    table = {}
+    for i in range(200000):
+        table[i & 1023] = str(i)
+    return time.perf_counter() - start
+
+
+def large_vpc(scale):
+    return {
+        "vpc_id": 1,
+        "vpc_cidr": "10.0.0.0/8",
+        "vpc_name": "Large",
+        "vpc_subnets": max(int(65536 * scale), 1),
+        "settings": {"domain": "lan", "subdomains": ["a"], "vlan_range": None},
+    }
+
+
+def small_vpcs(scale):
+    return [
+        {
+            "vpc_id": i,
+            "vpc_cidr": f"10.{i // 256}.{i % 256}.0/24",
+            "vpc_name": f"Site {i}",
+            "vpc_subnets": 16,
+            "settings": {
+                "domain": "lan",
+                "subdomains": ["office", "guest", "iot"],
+                "vlan_range": "1-16",
+            },
+            "template": {
+                "domain": "{settings_subdomains}.{settings_domain}",
+                "name": "{vpc_name} {settings_subdomains} {count_index}",
+            },
+        }
+        for i in range(max(int(1000 * scale), 1))
+    ]
+
+
+def template_vpc(scale):
+    return {
+        "vpc_id": 1,
+        "vpc_cidr": "10.0.0.0/8",
+        "vpc_name": "Templated",
+        "vpc_subnets": max(int(20000 * scale), 1),
+        "settings": {
+            "domain": "example.com",
+            "subdomains": ["eng", "ops", "sales", "hr", "lab", "dmz", "voip"],
+            "sites": {"regions": ["eu", "us", "ap"], "tiers": ["a", "b"]},
+            "vlan_range": "1-4094",
+        },
+        "template": {
+            "domain": "{settings_subdomains}.{settings_sites_regions}.{settings_domain}",
+            "name": (
+                "{vpc_name}-{settings_sites_regions}-{settings_sites_tiers}"
+                "-{settings_subdomains}-{count_index}"
+            ),
+        },
+    }
+
+
+def workloads(scale):
+    """
+    Build the benchmark workloads.
+
+    Inputs are prepared here, outside the timed functions, so every benchmark
+    only measures its own stage.
+
+    :param scale: Fraction of the full workload sizes to run.
+    :return: Dictionary mapping benchmark names to zero-argument callables.
+    """
+    large = large_vpc(scale)
+    network = ipaddress.ip_network(large["vpc_cidr"])
+    carver = SubnetCarver(network, 24)
+    count = large["vpc_subnets"]
+
+    many = small_vpcs(scale)
+
+    templated = template_vpc(scale)
+    processor = PlaceholderProcessor({"vpcs": [templated]})
+
+    payload = TerraformDataExternal(deterministic=True, source_mode="omit")
+    payload.process_inputs({"vpcs": "[]"})
+    payload.config = {
+        "1": {"subnets": VpcGenerator(large, False, True).generate_subnets()}
+    }
+
+    def carve():
+        columns = carver.columns(0, count)
+        carver.format_networks(columns["network"])
+        for field in ("gateway", "dhcp_start", "dhcp_stop"):
+            carver.format_addresses(columns[field])
+
+    return {
+        "carve_large_vpc": carve,
+        "generate_large_vpc": lambda: VpcGenerator(
+            large, False, True
+        ).generate_subnets(),
+        "generate_many_vpcs": lambda: generate_all(many, deterministic=True),
+        "render_templates": lambda: processor.render_templates(
+            templated, templated["vpc_subnets"]
+        ),
+        "encode_large_payload": payload.encode_data,
+    }
+
+
+def run(scale=1.0, repeat=DEFAULT_REPEAT, only=None):
+    """
+    Time every benchmark.
+
+    :param scale: Fraction of the full workload sizes to run.
+    :param repeat: Number of timed runs per benchmark.
+    :param only: Optional substring; only benchmarks whose name contains it run.
+    :return: Results document with per-benchmark timings in seconds, and the
+        median of each run's time relative to the calibration loop run just
+        before it.
+    """
+    results = {}
+    for name, benchmark in workloads(scale).items():
+        if only and only not in name:
+            continue
+        benchmark()  # Warm up caches and lazy imports
+        timings = []
+        calibrations = []
+        # Calibrating before each run follows CPU frequency and load changes,
+        # and the median ratio ignores runs disturbed by either.
+        for _ in range(repeat):
+            calibrations.append(calibrate())
+            start = time.perf_counter()
+            benchmark()
+            timings.append(time.perf_counter() - start)
+        results[name] = {
+            "best": min(timings),
+            "median": statistics.median(timings),
+            "calibration": statistics.median(calibrations),
+            "relative": statistics.median(
+                timing / calibration
+                for timing, calibration in zip(timings, calibrations)
+            ),
+        }
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "scale": scale,
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare results against a baseline.
+
+    Median times relative to the calibration loop are compared, so a baseline
+    recorded on another machine still applies.
+
+    :param current: Results document from run().
+    :param baseline: Baseline results document.
+    :param threshold: Allowed slowdown as a fraction, e.g. 0.25 for 25%.
+    :return: List of (name, ratio, regressed) tuples for benchmarks in both.
+    :raises ValueError: If the documents were recorded at different scales.
+    """
+    if current["scale"] != baseline["scale"]:
+        raise ValueError(
+            f"Cannot compare scale {current['scale']} against a baseline "
+            f"recorded at scale {baseline['scale']}."
+        )
+    rows = []
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        ratio = result["relative"] / baseline["results"][name]["relative"]
+        rows.append((name, ratio, ratio > 1 + threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark carving, templating and encoding against a baseline."
+    )
+    parser.add_argument(
+        "--baseline",
+        default=DEFAULT_BASELINE,
+        help="Baseline results to compare against (default: benchmarks/baseline.json).",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Write the results to the baseline file instead of comparing.",
+    )
+    parser.add_argument("--output", help="Also write the results to this file.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Allowed slowdown as a fraction (default: {DEFAULT_THRESHOLD}).",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        help=f"Timed runs per benchmark (default: {DEFAULT_REPEAT}).",
+    )
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Fraction of the full workload sizes to run (default: 1.0).",
+    )
+    parser.add_argument("--only", help="Only run benchmarks whose name contains this.")
+    args = parser.parse_args(argv)
+
+    current = run(args.scale, args.repeat, args.only)
+    for path in filter(None, [args.output, args.update_baseline and args.baseline]):
+        with open(path, "w") as f:
+            json.dump(current, f, indent=2)
+            f.write("\n")
+    if args.update_baseline:
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    rows = compare(current, baseline, args.threshold)
+    for name, ratio, regressed in rows:
+        median = current["results"][name]["median"]
+        status = "REGRESSION" if regressed else "ok"
+        print(f"{name:<24} {median * 1000:10.1f} ms {ratio:8.2f}x  {status}")
+    return 1 if any(regressed for _, _, regressed in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,25 @@
 # Use a more robust way to specify the path to the Python script
 locals {
-  script_path = "${path.module}/scripts/vpc_blueprint.py"
+  script_path = var.use_daemon ? "${path.module}/scripts/vpc_blueprint_client.py" : "${path.module}/scripts/vpc_blueprint.py"
 }
 
 data "external" "config" {
   program = ["python3", local.script_path]
   query = {
-    "vpcs"           = jsonencode(var.vpc_configurations)
-    "ubiquity_unifi" = jsonencode(var.ubiquity_unifi)
+    "vpcs"             = jsonencode(var.vpc_configurations)
+    "ubiquity_unifi"   = jsonencode(var.ubiquity_unifi)
+    "subnet_sizes"     = jsonencode(var.subnet_sizes)
+    "reserved_ranges"  = jsonencode(var.reserved_ranges)
+    "excluded_ranges"  = jsonencode(var.excluded_ranges)
+    "deterministic"    = jsonencode(var.deterministic)
+    "cache_dir"        = var.cache_dir
+    "state_dir"        = var.state_dir
+    "source_mode"      = var.source_mode
+    "layout"           = var.output_layout
+    "fields"           = join(",", var.output_fields)
+    "strict"           = jsonencode(var.strict_templates)
+    "vpc_pools"        = jsonencode(var.vpc_pools)
+    "vpc_prefixes"     = jsonencode(var.vpc_prefixes)
+    "vpc_pool_newbits" = jsonencode(var.vpc_pool_newbits)
   }
 }
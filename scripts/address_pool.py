@@ -0,0 +1,168 @@
+import ipaddress
+
+from scripts.subnet_carver import format_ipv4
+
+# Subnet size assumed when a pooled VPC only declares vpc_subnets, by IP version.
+DEFAULT_SUBNET_PREFIXES = {4: 24, 6: 64}
+
+# Bits added to a pool's prefix length to cut it into one slot per VPC ID.
+DEFAULT_NEWBITS = 8
+
+
+def _parse_network(cidr, what):
+    try:
+        return ipaddress.ip_network(cidr)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid {what}: {cidr}") from e
+
+
+def _vpc_prefixlen(vpc, version):
+    """
+    Prefix length a pooled VPC asks for.
+
+    :param vpc: VPC configuration without a vpc_cidr.
+    :param version: IP version of the pool.
+    :return: vpc_prefix if set, otherwise the smallest block that holds
+        vpc_subnets subnets of DEFAULT_SUBNET_PREFIXES[version].
+    :raises ValueError: If neither is a valid size.
+    """
+    max_prefixlen = 32 if version == 4 else 128
+    prefix = vpc.get("vpc_prefix")
+    try:
+        if prefix is not None:
+            prefixlen = int(str(prefix).lstrip("/"))
+        else:
+            subnets = int(vpc["vpc_subnets"])
+            if subnets <= 0:
+                raise ValueError(subnets)
+            prefixlen = DEFAULT_SUBNET_PREFIXES[version] - (subnets - 1).bit_length()
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(
+            f"VPC {vpc.get('vpc_id')} needs a vpc_cidr, a vpc_prefix or vpc_subnets."
+        ) from None
+    if not 0 <= prefixlen <= max_prefixlen:
+        raise ValueError(f"Invalid size for VPC {vpc.get('vpc_id')}: /{prefixlen}.")
+    return prefixlen
+
+
+def find_overlaps(blocks):
+    """
+    Find overlapping address blocks with one sort and one sweep.
+
+    :param blocks: List of (version, first address, last address) tuples.
+    :return: List of (i, j) index pairs, each pairing block j with the block i
+        before it in address order that reaches furthest into it.
+    """
+    order = sorted(range(len(blocks)), key=blocks.__getitem__)
+    overlaps = []
+    reach = None  # Index of the furthest reaching block so far
+    for index in order:
+        version, start, end = blocks[index]
+        if reach is not None and blocks[reach][0] == version:
+            if start <= blocks[reach][2]:
+                overlaps.append((reach, index))
+            if end <= blocks[reach][2]:
+                continue
+        reach = index
+    return overlaps
+
+
+def _block(network):
+    start = int(network.network_address)
+    return network.version, start, start + network.num_addresses - 1
+
+
+def _format_cidr(version, address, prefixlen):
+    if version == 4:
+        return f"{format_ipv4(address)}/{prefixlen}"
+    return f"{ipaddress.IPv6Address(address)}/{prefixlen}"
+
+
+def _slot(vpc_id, network, newbits):
+    """
+    Slot of a VPC ID in a pool, as cidrsubnet(pool, newbits, vpc_id) would.
+
+    :param vpc_id: ID of the VPC.
+    :param network: ipaddress network object of the pool.
+    :param newbits: Bits added to the pool's prefix length.
+    :return: (integer address, prefix length) of the slot, or None if the pool
+        has no slot for that ID.
+    """
+    prefixlen = network.prefixlen + newbits
+    if prefixlen > network.max_prefixlen or vpc_id >= 1 << newbits:
+        return None
+    offset = vpc_id << (network.max_prefixlen - prefixlen)
+    return int(network.network_address) + offset, prefixlen
+
+
+def assign_vpc_cidrs(vpcs, pools, newbits=DEFAULT_NEWBITS):
+    """
+    Give every VPC without a vpc_cidr a fixed slot of the first pool with room.
+
+    Each pool is cut into 2**newbits equal slots, and a VPC without a vpc_cidr
+    gets the start of slot vpc_id of the first pool whose slots hold it. It asks
+    for vpc_prefix, or for a block that holds vpc_subnets /24 (IPv4) or /64
+    (IPv6) subnets. A VPC's CIDR therefore only depends on its own ID and size
+    and on the pools: adding, removing or resizing other VPCs never moves it.
+
+    All VPCs, assigned or not, must then be disjoint.
+
+    :param vpcs: List of VPC configuration dictionaries.
+    :param pools: List of supernet CIDRs, in order of preference.
+    :param newbits: Bits added to a pool's prefix length to get its slot size.
+    :return: List of VPC configurations, copied where a vpc_cidr was assigned.
+    :raises ValueError: If a pool, CIDR or ID is invalid, pools overlap, a VPC
+        does not fit in any pool or two VPCs overlap.
+    """
+    if isinstance(newbits, bool) or not isinstance(newbits, int) or newbits < 0:
+        raise ValueError(f"Invalid VPC pool newbits: {newbits}")
+    networks = [_parse_network(cidr, "VPC pool") for cidr in pools]
+    overlaps = find_overlaps([_block(network) for network in networks])
+    if overlaps:
+        i, j = overlaps[0]
+        raise ValueError(f"VPC pools overlap: {networks[i]} and {networks[j]}.")
+
+    placed = list(vpcs)
+    blocks = []
+    for index, vpc in enumerate(vpcs):
+        if vpc.get("vpc_cidr"):
+            blocks.append(_block(_parse_network(vpc["vpc_cidr"], "VPC CIDR")))
+            continue
+        vpc_id = vpc.get("vpc_id")
+        if isinstance(vpc_id, bool) or not isinstance(vpc_id, int) or vpc_id < 0:
+            raise ValueError(
+                f"VPC {vpc_id} needs a non-negative integer vpc_id to get a "
+                "slot of vpc_pools."
+            )
+        sizes = []
+        for network in networks:
+            prefixlen = _vpc_prefixlen(vpc, network.version)
+            slot = _slot(vpc_id, network, newbits)
+            if slot is None:
+                continue
+            sizes.append(f"/{prefixlen} in /{slot[1]}")
+            if prefixlen >= slot[1]:
+                address = slot[0]
+                size = 1 << (network.max_prefixlen - prefixlen)
+                blocks.append((network.version, address, address + size - 1))
+                cidr = _format_cidr(network.version, address, prefixlen)
+                placed[index] = dict(vpc, vpc_cidr=cidr)
+                break
+        else:
+            raise ValueError(
+                f"No VPC pool has a slot for VPC {vpc_id} "
+                f"({', '.join(dict.fromkeys(sizes)) or 'ID out of range'})."
+            )
+
+    overlaps = find_overlaps(blocks)
+    if overlaps:
+        raise ValueError(
+            "VPCs overlap: "
+            + "; ".join(
+                f"{placed[i]['vpc_id']} ({placed[i]['vpc_cidr']}) and "
+                f"{placed[j]['vpc_id']} ({placed[j]['vpc_cidr']})"
+                for i, j in overlaps
+            )
+            + "."
+        )
+    return placed
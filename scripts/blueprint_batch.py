@@ -0,0 +1,180 @@
+import argparse
+import json
+import os
+import sys
+
+# Make the scripts package importable when this file is run directly.
+if not __package__:
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts import diagnostics, instrumentation
+from scripts.lazy_logging import get_logger
+from scripts.terraform_data_external import dumps
+from scripts.vpc_blueprint import LAYOUTS, VpcGenerator, configure_worker
+
+logger = get_logger(__name__)
+
+# Records submitted to the pool per worker before the oldest result is written.
+WINDOW_PER_JOB = 2
+
+
+def iter_records(paths):
+    """
+    Read blueprint records line by line from JSONL files.
+
+    :param paths: File paths; "-" reads standard input.
+    :return: Iterator over (source, line) tuples, where source is "path:line".
+    """
+    for path in paths:
+        f = sys.stdin if path == "-" else open(path)
+        try:
+            for number, line in enumerate(f, 1):
+                if line.strip():
+                    yield f"{path}:{number}", line
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+
+def process_record(task):
+    """
+    Generate the subnets of one blueprint record.
+
+    Errors are returned as an error record rather than raised, so one bad
+    record does not stop the batch.
+
+    :param task: Tuple of (source, line, options), where options are the
+        VpcGenerator arguments (ubiquity_unifi, deterministic, fields) and the
+        layout.
+    :return: Tuple of (ok, JSON result line, trace or None, diagnostics).
+    """
+    source, line, (ubiquity_unifi, deterministic, fields, layout) = task
+    try:
+        vpc = json.loads(line)
+        generator = VpcGenerator(vpc, ubiquity_unifi, deterministic, fields)
+        if layout == "columns":
+            subnets = generator.generate_columns()
+        else:
+            subnets = generator.generate_subnets()
+        ok, result = True, {"vpc_id": vpc["vpc_id"], "subnets": subnets}
+    except Exception as e:
+        logger.error(f"Failed to generate {source}: {e}")
+        ok, result = False, {"source": source, "error": str(e)}
+    trace = instrumentation.collect() if instrumentation.enabled() else None
+    return ok, dumps(result), trace, diagnostics.collect()
+
+
+def run_batch(records, out, options, jobs=1):
+    """
+    Generate every record and write the results as JSONL in input order.
+
+    With several jobs, at most WINDOW_PER_JOB records per job are in flight,
+    so memory stays bounded by a few records however long the input is.
+
+    :param records: Iterable of (source, line) tuples from iter_records().
+    :param out: Text stream that receives one JSON line per record.
+    :param options: Tuple of (ubiquity_unifi, deterministic, fields, layout).
+    :param jobs: Number of worker processes; 1 to run in this process.
+    :return: Tuple of (records written, records that failed).
+    """
+    written = failed = 0
+
+    def write(ok, line, trace, problems):
+        nonlocal written, failed
+        if trace is not None:
+            instrumentation.merge(trace)
+        diagnostics.merge(problems)
+        out.write(line + "\n")
+        written += 1
+        failed += not ok
+
+    tasks = ((source, line, options) for source, line in records)
+    if jobs <= 1:
+        for task in tasks:
+            write(*process_record(task))
+        return written, failed
+
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+
+    pending = deque()
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=configure_worker,
+        initargs=(instrumentation.current_target(), diagnostics.is_strict()),
+    ) as executor:
+        for task in tasks:
+            pending.append(executor.submit(process_record, task))
+            if len(pending) >= jobs * WINDOW_PER_JOB:
+                write(*pending.popleft().result())
+        while pending:
+            write(*pending.popleft().result())
+    return written, failed
+
+
+def main(argv=None):
+    """
+    Generate address plans for JSONL blueprint records outside Terraform.
+
+    Each input line is one VPC configuration object, as in vpc_configurations.
+    Each output line is {"vpc_id": ..., "subnets": ...}, or
+    {"source": "file:line", "error": ...} for a record that failed.
+
+    :param argv: Command line arguments; defaults to sys.argv[1:].
+    :return: Exit status; 1 if any record failed.
+    """
+    parser = argparse.ArgumentParser(
+        description="Generate subnets for JSONL blueprint records."
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="*",
+        default=["-"],
+        help="JSONL files with one VPC configuration per line (default: stdin).",
+    )
+    parser.add_argument("-o", "--output", help="Write results here (default: stdout).")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Worker processes; 0 for one per CPU (default: 1).",
+    )
+    parser.add_argument(
+        "--ubiquity-unifi", action="store_true", help="Apply the Unifi reservations."
+    )
+    parser.add_argument(
+        "--deterministic",
+        action="store_true",
+        help="Derive subnet UUIDs from the subnets.",
+    )
+    parser.add_argument(
+        "--fields", help="Comma separated subnet fields to generate (default: all)."
+    )
+    parser.add_argument(
+        "--layout", choices=LAYOUTS, default="rows", help="Output layout."
+    )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="Fail a record on its first unresolved template placeholder.",
+    )
+    args = parser.parse_args(argv)
+    diagnostics.configure(args.strict)
+
+    jobs = args.jobs or os.cpu_count() or 1
+    options = (args.ubiquity_unifi, args.deterministic, args.fields, args.layout)
+    out = sys.stdout if args.output is None else open(args.output, "w")
+    try:
+        written, failed = run_batch(iter_records(args.inputs), out, options, jobs)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    logger.info(f"Wrote {written} records, {failed} failed")
+    diagnostics.emit()
+    instrumentation.emit()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import argparse
+import io
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import sys
+
+# Make the scripts package importable when this file is run directly.
+if not __package__:
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts.lazy_logging import get_logger
+from scripts.vpc_blueprint import handle_request
+from scripts.vpc_blueprint_client import socket_path
+
+logger = get_logger(__name__)
+
+
+class BlueprintRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        """
+        Read one query until the client shuts down its write side, and answer it.
+
+        The query is preceded by a JSON header line with the client's working
+        directory and $VPC_BLUEPRINT_* variables, which apply to the request in
+        place of the server's own. The response is a one byte status ("0"
+        success, "1" error) followed by the response document or the error
+        message. A client that goes away before sending a query, or before
+        reading the answer, is not an error.
+        """
+        header = self.rfile.readline()
+        if not header:
+            return  # Connected and left, as the stale socket probe does
+        raw = self.rfile.read()
+        response = io.StringIO()
+        try:
+            client = json.loads(header)
+            environ, cwd = dict(client["environ"]), str(client["cwd"])
+        except (KeyError, TypeError, ValueError) as e:
+            status, error = 1, f"Invalid request header: {e}"
+        else:
+            status, error = handle_request(
+                raw.decode(), response, environ=environ, cwd=cwd
+            )
+        if status:
+            logger.error(error)
+            text = error
+        else:
+            text = response.getvalue()
+        try:
+            self.wfile.write(str(status).encode() + text.encode())
+        except (BrokenPipeError, ConnectionResetError):
+            logger.info("Client disconnected before reading the response")
+
+
+class BlueprintServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path):
+        """
+        Bind a long-lived server to a Unix socket.
+
+        Compiled templates, the script version hash and imported modules stay warm
+        across requests, so each query only pays for its own generation.
+
+        :param path: Filesystem path of the Unix socket.
+        :raises OSError: If another server is already listening on the path.
+        """
+        self._remove_stale_socket(path)
+        old_umask = os.umask(0o177)  # Socket is only usable by the owning user
+        try:
+            super().__init__(path, BlueprintRequestHandler)
+        finally:
+            os.umask(old_umask)
+
+    @staticmethod
+    def _remove_stale_socket(path):
+        if not os.path.exists(path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            os.unlink(path)  # Left behind by a server that is no longer running
+        else:
+            raise OSError(f"A server is already listening on {path}")
+        finally:
+            probe.close()
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+def main(argv=None):
+    """
+    Run the server until interrupted.
+
+    :param argv: Command line arguments; defaults to sys.argv[1:].
+    """
+    parser = argparse.ArgumentParser(
+        description="Serve vpc_blueprint queries over a Unix socket."
+    )
+    parser.add_argument(
+        "--socket",
+        default=socket_path(),
+        help="Unix socket path (default: $VPC_BLUEPRINT_SOCKET or a per-user path).",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    # Exit through the context manager on SIGTERM so the socket is removed.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    with BlueprintServer(args.socket) as server:
+        logger.info(f"Serving on {args.socket}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import heapq
+
+
+class BuddyAllocator:
+    def __init__(self, network):
+        """
+        Allocate aligned power-of-two blocks from a network with the buddy system.
+
+        Free blocks are kept in one min-heap per prefix length, so every
+        allocation takes the lowest free address that fits and placement is
+        deterministic. Allocating or freeing a block splits or merges at most one
+        block per prefix length and costs O(log n) heap operations.
+
+        :param network: ipaddress network object to allocate from.
+        """
+        self.network = network
+        self.base = int(network.network_address)
+        self.prefixlen = network.prefixlen
+        self.max_prefixlen = network.max_prefixlen
+        # Offsets from the base address; heaps may hold stale entries that are
+        # no longer in the matching set and are skipped when popped.
+        self._heaps = {self.prefixlen: [0]}
+        self._free = {self.prefixlen: {0}}
+
+    def _size(self, prefixlen):
+        return 1 << (self.max_prefixlen - prefixlen)
+
+    def _push(self, offset, prefixlen):
+        heapq.heappush(self._heaps.setdefault(prefixlen, []), offset)
+        self._free.setdefault(prefixlen, set()).add(offset)
+
+    def _pop(self, prefixlen):
+        heap = self._heaps.get(prefixlen)
+        free = self._free.get(prefixlen)
+        while heap:
+            offset = heapq.heappop(heap)
+            if offset in free:
+                free.remove(offset)
+                return offset
+        return None
+
+    def allocate(self, prefixlen):
+        """
+        Allocate the lowest free block of a prefix length.
+
+        :param prefixlen: Prefix length of the block.
+        :return: Integer network address of the block.
+        :raises ValueError: If the prefix length is outside the network or no
+            free block is large enough.
+        """
+        if not self.prefixlen <= prefixlen <= self.max_prefixlen:
+            raise ValueError(
+                f"Cannot allocate a /{prefixlen} block from {self.network}."
+            )
+        order = prefixlen
+        while order >= self.prefixlen and not self._free.get(order):
+            order -= 1
+        if order < self.prefixlen:
+            raise ValueError(f"No free /{prefixlen} block left in {self.network}.")
+        offset = self._pop(order)
+        # Split down to the requested size, freeing the upper halves.
+        while order < prefixlen:
+            order += 1
+            self._push(offset + self._size(order), order)
+        return self.base + offset
+
+    def free(self, address, prefixlen):
+        """
+        Return a block, merging it with its free buddies.
+
+        :param address: Integer network address returned by allocate().
+        :param prefixlen: Prefix length the block was allocated with.
+        """
+        offset = address - self.base
+        while prefixlen > self.prefixlen:
+            buddy = offset ^ self._size(prefixlen)
+            free = self._free.get(prefixlen)
+            if not free or buddy not in free:
+                break
+            free.remove(buddy)  # Its heap entry goes stale
+            offset = min(offset, buddy)
+            prefixlen -= 1
+        self._push(offset, prefixlen)
+
+
+def allocate_blocks(network, prefixes):
+    """
+    Place blocks of the given prefix lengths in a network, largest first.
+
+    Placing the largest blocks first keeps every later block aligned without
+    fragmentation, so the blocks fit exactly when their total size does.
+
+    :param network: ipaddress network object to allocate from.
+    :param prefixes: Prefix length of each block, in request order.
+    :return: Integer network addresses of the blocks, in request order.
+    :raises ValueError: If the blocks do not fit in the network.
+    """
+    requested = sum(1 << (network.max_prefixlen - prefixlen) for prefixlen in prefixes)
+    if requested > network.num_addresses:
+        raise ValueError(
+            f"Subnet sizes need {requested} addresses but {network} "
+            f"only has {network.num_addresses}."
+        )
+    allocator = BuddyAllocator(network)
+    addresses = [None] * len(prefixes)
+    # Stable sort: equal sizes are placed in request order.
+    for index in sorted(range(len(prefixes)), key=prefixes.__getitem__):
+        addresses[index] = allocator.allocate(prefixes[index])
+    return addresses
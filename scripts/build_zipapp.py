@@ -0,0 +1,69 @@
+import argparse
+import os
+import py_compile
+import shutil
+import tempfile
+import zipapp
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MAIN_MODULE = """import sys
+
+from scripts.vpc_blueprint import main
+
+sys.exit(main())
+"""
+
+
+def build(target, interpreter="/usr/bin/env python3"):
+    """
+    Bundle the helper scripts into a single-file zipapp.
+
+    :param target: Path of the .pyz archive to write.
+    :param interpreter: Interpreter for the archive's shebang line.
+    :return: The target path.
+    """
+    with tempfile.TemporaryDirectory() as staging:
+        package_dir = os.path.join(staging, "scripts")
+        os.makedirs(package_dir)
+        for name in sorted(os.listdir(SCRIPTS_DIR)):
+            if name.endswith(".py") and name != os.path.basename(__file__):
+                source = shutil.copy2(os.path.join(SCRIPTS_DIR, name), package_dir)
+                # zipimport cannot write bytecode, so ship it next to the source.
+                py_compile.compile(
+                    source,
+                    cfile=source + "c",
+                    doraise=True,
+                    invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+                )
+        with open(os.path.join(staging, "__main__.py"), "w") as f:
+            f.write(MAIN_MODULE)
+
+        target_dir = os.path.dirname(os.path.abspath(target))
+        os.makedirs(target_dir, exist_ok=True)
+        zipapp.create_archive(
+            staging, target, interpreter=interpreter, compressed=False
+        )
+    return target
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build a single-file zipapp of the vpc_blueprint entry point."
+    )
+    parser.add_argument(
+        "--output",
+        default=os.path.join(os.path.dirname(SCRIPTS_DIR), "dist", "vpc_blueprint.pyz"),
+        help="Path of the archive to write (default: dist/vpc_blueprint.pyz).",
+    )
+    parser.add_argument(
+        "--python",
+        default="/usr/bin/env python3",
+        help="Interpreter for the shebang line.",
+    )
+    args = parser.parse_args(argv)
+    print(build(args.output, args.python))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import contextvars
+
+from scripts.lazy_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Entries listed in the summary; the rest are only counted.
+MAX_REPORTED = 20
+
+
+class _State:
+    __slots__ = ("strict", "entries")
+
+    def __init__(self):
+        self.strict = False  # Whether the first problem raises
+        self.entries = {}
+
+
+# Problems of the current request; handle_request() starts a new one with begin().
+_state = contextvars.ContextVar("diagnostics")
+
+
+def _current():
+    state = _state.get(None)
+    if state is None:
+        state = _State()
+        _state.set(state)
+    return state
+
+
+def begin():
+    """
+    Start recording the problems of a new request in the current context.
+
+    Problems and strict mode are kept per context, so concurrent requests of the
+    daemon neither see nor drain each other's problems.
+    """
+    _state.set(_State())
+
+
+def configure(strict):
+    """
+    Enable or disable strict mode for the current request.
+
+    :param strict: If True, the first problem raises instead of being collected.
+    """
+    _current().strict = bool(strict)
+
+
+def is_strict():
+    """
+    Tell whether strict mode is enabled for the current request.
+
+    :return: True if the first problem raises.
+    """
+    return _current().strict
+
+
+def unresolved(vpc_id, key, placeholder, count=1):
+    """
+    Record a template placeholder that is not in the context.
+
+    The placeholder is kept in the output as it is.
+
+    :param vpc_id: ID of the VPC the template belongs to.
+    :param key: Template key, or None for a value outside the template.
+    :param placeholder: Placeholder name.
+    :param count: Number of occurrences, for example one per subnet.
+    :raises ValueError: In strict mode.
+    """
+    state = _current()
+    if state.strict:
+        raise ValueError(
+            f"Unresolved placeholder {{{placeholder}}} in {_where(vpc_id, key)}."
+        )
+    entry = ("unresolved", vpc_id, key, placeholder)
+    state.entries[entry] = state.entries.get(entry, 0) + count
+
+
+def template_error(vpc_id, key, error, count=1):
+    """
+    Record a template that failed to render and was kept as it is.
+
+    :param vpc_id: ID of the VPC the template belongs to.
+    :param key: Template key, or None for a value outside the template.
+    :param error: The exception raised while rendering.
+    :param count: Number of occurrences.
+    :raises ValueError: In strict mode.
+    """
+    state = _current()
+    if state.strict:
+        raise ValueError(f"Error resolving {_where(vpc_id, key)}: {error}") from error
+    entry = ("error", vpc_id, key, f"{type(error).__name__}: {error}")
+    state.entries[entry] = state.entries.get(entry, 0) + count
+
+
+def _where(vpc_id, key):
+    if key is None:
+        return f"a value of VPC {vpc_id}"
+    return f"template '{key}' of VPC {vpc_id}"
+
+
+def collect():
+    """
+    Return the problems recorded so far and start over.
+
+    :return: Dictionary mapping (kind, vpc_id, key, detail) to a count, where
+        kind is "unresolved" (detail is the placeholder) or "error" (detail is
+        the error message).
+    """
+    state = _current()
+    entries, state.entries = state.entries, {}
+    return entries
+
+
+def merge(entries):
+    """
+    Add problems collected elsewhere, for example in a worker process.
+
+    :param entries: Dictionary returned by collect().
+    """
+    current = _current().entries
+    for entry, count in entries.items():
+        current[entry] = current.get(entry, 0) + count
+
+
+def summary(entries):
+    """
+    Describe collected problems, most frequent first.
+
+    :param entries: Dictionary returned by collect().
+    :return: Multi-line summary, or None if there are no entries.
+    """
+    if not entries:
+        return None
+    ranked = sorted(entries.items(), key=lambda item: -item[1])
+    lines = [
+        f"{len(entries)} template problem(s) in {sum(entries.values())} place(s); "
+        "affected values are kept as written:"
+    ]
+    for (kind, vpc_id, key, detail), count in ranked[:MAX_REPORTED]:
+        problem = (
+            f"unresolved placeholder {{{detail}}}" if kind == "unresolved" else detail
+        )
+        lines.append(f"  {_where(vpc_id, key)}: {problem} (x{count})")
+    if len(ranked) > MAX_REPORTED:
+        lines.append(f"  ... and {len(ranked) - MAX_REPORTED} more")
+    return "\n".join(lines)
+
+
+def emit():
+    """
+    Log one warning summarizing the problems recorded so far and start over.
+
+    Does nothing when no problem was recorded.
+    """
+    text = summary(collect())
+    if text is not None:
+        logger.warning(text)
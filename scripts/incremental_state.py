@@ -0,0 +1,122 @@
+import json
+import os
+import time
+
+from scripts import request_context
+from scripts.lazy_logging import get_logger
+from scripts.result_cache import _DirectoryLock, atomic_write, script_version
+from scripts.terraform_data_external import RawJSON, dumps
+
+logger = get_logger(__name__)
+
+
+class IncrementalState:
+    def __init__(self, directory, options, sort_keys=False, max_age=7 * 24 * 3600):
+        """
+        Per-VPC results of previous runs, one file per VPC fingerprint.
+
+        Results are stored as the JSON text the encoder would emit for them and
+        handed back as RawJSON, so reusing a VPC costs one small file read and
+        never parses or re-serializes its subnets.
+
+        Entries are only pruned once unused for max_age, so module instances or
+        workspaces sharing a directory keep each other's results.
+
+        :param directory: State directory; created if it does not exist.
+        :param options: JSON-serializable generation options shared by all VPCs
+            (Unifi reservations, deterministic mode, fields, layout). They are
+            part of every fingerprint, as is the script version.
+        :param sort_keys: Whether the encoder sorts keys, so stored text matches it.
+        :param max_age: Entries unused for longer than this many seconds are pruned.
+        """
+        self.directory = directory
+        self.options = options
+        self.sort_keys = sort_keys
+        self.max_age = max_age
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_query(cls, query, options, sort_keys=False):
+        """
+        Create the state from the query keys or environment, if enabled.
+
+        :param query: Decoded Terraform query dictionary.
+        :param options: Generation options shared by all VPCs.
+        :param sort_keys: Whether the encoder sorts keys.
+        :return: IncrementalState instance, or None if no state directory is set.
+        """
+        directory = query.get("state_dir") or request_context.getenv(
+            "VPC_BLUEPRINT_STATE_DIR"
+        )
+        if not directory:
+            return None
+        directory = request_context.resolve(directory)
+        kwargs = {}
+        value = query.get("state_max_age")
+        if value not in (None, ""):
+            kwargs["max_age"] = int(value)
+        return cls(directory, options, sort_keys, **kwargs)
+
+    def fingerprint(self, vpc):
+        """
+        Fingerprint a VPC configuration together with the generation options.
+
+        :param vpc: VPC configuration dictionary.
+        :return: Hex digest of the canonicalized configuration and script version.
+        """
+        import hashlib
+
+        canonical = json.dumps(
+            [self.options, vpc], sort_keys=True, separators=(",", ":")
+        )
+        digest = hashlib.sha256(script_version().encode())
+        digest.update(canonical.encode())
+        return digest.hexdigest()
+
+    def _path(self, fingerprint):
+        return os.path.join(self.directory, f"{fingerprint}.json")
+
+    def lookup(self, fingerprint):
+        """
+        Return the previous result for a fingerprint.
+
+        :param fingerprint: Fingerprint from fingerprint().
+        :return: The stored result as RawJSON, or None if the VPC was not
+            generated before.
+        """
+        path = self._path(fingerprint)
+        try:
+            os.utime(path)  # Mark as used before a concurrent prune looks at it
+            with open(path) as f:
+                return RawJSON(f.read())
+        except OSError:
+            return None
+
+    def record(self, fingerprint, result):
+        """
+        Record the result of a VPC for the next run.
+
+        :param fingerprint: Fingerprint from fingerprint().
+        :param result: Generated result, or the RawJSON returned by lookup().
+        """
+        if not isinstance(result, RawJSON):
+            text = dumps(result, sort_keys=self.sort_keys)
+            atomic_write(self._path(fingerprint), text)
+
+    def prune(self):
+        """
+        Remove the results of VPCs that no run has used for max_age.
+
+        Holds the directory lock, so concurrent runs do not prune at once.
+        """
+        with _DirectoryLock(os.path.join(self.directory, ".lock")):
+            now = time.time()
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    if now - entry.stat().st_mtime <= self.max_age:
+                        continue
+                    os.unlink(entry.path)
+                except OSError as e:
+                    logger.warning(f"Could not remove state entry {entry.path}: {e}")
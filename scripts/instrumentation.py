@@ -0,0 +1,199 @@
+import contextvars
+import os
+import sys
+import time
+
+from scripts import request_context
+
+# Where traces go: "1" or "stderr" for standard error, anything else is a file
+# path that traces are appended to as JSON lines. Unset disables tracing.
+TARGET = os.environ.get("VPC_BLUEPRINT_TRACE") or None
+
+
+class _Trace:
+    __slots__ = ("target", "stages", "counters")
+
+    def __init__(self, target):
+        self.target = target
+        self.stages = {}
+        self.counters = {}
+
+
+# Stages and counters of the current request, see begin().
+_trace = contextvars.ContextVar("trace")
+
+
+def _current():
+    trace = _trace.get(None)
+    if trace is None:
+        trace = _Trace(TARGET)
+        _trace.set(trace)
+    return trace
+
+
+class _Stage:
+    __slots__ = ("name", "start", "stages")
+
+    def __init__(self, name, stages):
+        self.name = name
+        self.stages = stages
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        totals = self.stages.get(self.name)
+        if totals is None:
+            self.stages[self.name] = [1, elapsed]
+        else:
+            totals[0] += 1
+            totals[1] += elapsed
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+def configure(target):
+    """
+    Enable or disable tracing at runtime, for this and later requests.
+
+    :param target: Trace target as for $VPC_BLUEPRINT_TRACE, or None to disable.
+    """
+    global TARGET
+    TARGET = target or None
+    _current().target = TARGET
+
+
+def begin():
+    """
+    Start the trace of a new request in the current context.
+
+    Stages, counters and the target are kept per context, so concurrent
+    requests of the daemon neither mix their traces nor reset each other's. A
+    request made on behalf of a client (see request_context.begin()) is traced
+    to the client's $VPC_BLUEPRINT_TRACE instead of TARGET.
+    """
+    environ = request_context.environ()
+    if environ is None:
+        target = TARGET
+    else:
+        target = environ.get("VPC_BLUEPRINT_TRACE") or None
+        if target not in (None, "1", "stderr"):
+            target = request_context.resolve(target)
+    _trace.set(_Trace(target))
+
+
+def enabled():
+    """
+    Tell whether the current request is traced.
+
+    :return: True if stages and counters are recorded.
+    """
+    return _current().target is not None
+
+
+def current_target():
+    """
+    Return the trace target of the current request, for example for pool workers.
+
+    :return: Trace target as for $VPC_BLUEPRINT_TRACE, or None if disabled.
+    """
+    return _current().target
+
+
+def stage(name):
+    """
+    Time a block of code as a named stage.
+
+    Stages may nest; each one reports its own total time and number of calls.
+    When tracing is disabled a shared no-op context manager is returned.
+
+    :param name: Stage name.
+    :return: Context manager that times its block.
+    """
+    trace = _current()
+    if trace.target is None:
+        return _NULL_STAGE
+    return _Stage(name, trace.stages)
+
+
+def count(name, value=1):
+    """
+    Add to a named counter.
+
+    :param name: Counter name.
+    :param value: Amount to add.
+    """
+    trace = _current()
+    if trace.target is not None:
+        trace.counters[name] = trace.counters.get(name, 0) + value
+
+
+def collect():
+    """
+    Return the trace recorded so far and start a new one.
+
+    :return: Dictionary with 'stages' ({name: {'calls', 'seconds'}}) and
+        'counters' ({name: value}).
+    """
+    current = _current()
+    trace = {
+        "stages": {
+            name: {"calls": calls, "seconds": seconds}
+            for name, (calls, seconds) in current.stages.items()
+        },
+        "counters": dict(current.counters),
+    }
+    current.stages.clear()
+    current.counters.clear()
+    return trace
+
+
+def merge(trace):
+    """
+    Add a trace collected elsewhere, for example in a worker process.
+
+    :param trace: Dictionary returned by collect().
+    """
+    stages = _current().stages
+    for name, totals in trace["stages"].items():
+        current = stages.setdefault(name, [0, 0.0])
+        current[0] += totals["calls"]
+        current[1] += totals["seconds"]
+    for name, value in trace["counters"].items():
+        count(name, value)
+
+
+def emit():
+    """
+    Write the trace recorded so far as one JSON line and start a new one.
+
+    Does nothing when tracing is disabled. Errors writing the trace file are
+    reported on standard error but never fail the request.
+    """
+    target = _current().target
+    if target is None:
+        return
+    import json
+
+    line = json.dumps({"pid": os.getpid(), **collect()}, sort_keys=True) + "\n"
+    if target in ("1", "stderr"):
+        sys.stderr.write(line)
+        return
+    try:
+        with open(target, "a") as f:
+            f.write(line)
+    except OSError as e:
+        sys.stderr.write(f"Could not write trace to {target}: {e}\n")
@@ -0,0 +1,77 @@
+import os
+import sys
+
+from scripts import request_context
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+
+
+def _threshold(environ):
+    name = environ.get("VPC_BLUEPRINT_LOG_LEVEL", "WARNING").upper()
+    return LEVELS.get(name, LEVELS["WARNING"])
+
+
+class LazyLogger:
+    def __init__(self, name):
+        """
+        A logger that imports and configures logging only when a record is emitted.
+
+        If the host process has already imported logging (a library caller, the
+        test runner), records go straight to the standard logger. Otherwise, as in
+        a one-shot Terraform run, records below $VPC_BLUEPRINT_LOG_LEVEL (default
+        WARNING) are dropped without importing logging at all. Requests the
+        daemon answers on behalf of a client drop records below the client's
+        $VPC_BLUEPRINT_LOG_LEVEL instead.
+
+        :param name: Logger name, usually the module's __name__.
+        """
+        self.name = name
+        self._logger = None
+
+    def _get_logger(self, level):
+        if self._logger is None:
+            if "logging" in sys.modules:
+                import logging
+            else:
+                threshold = _threshold(os.environ)
+                if level < threshold:
+                    return None
+                import logging
+
+                logging.basicConfig(
+                    level=threshold,
+                    format="%(asctime)s - %(levelname)s - %(message)s",
+                )
+            self._logger = logging.getLogger(self.name)
+        return self._logger
+
+    def _log(self, level, msg, *args, **kwargs):
+        environ = request_context.environ()
+        if environ is not None and level < _threshold(environ):
+            return
+        logger = self._get_logger(level)
+        if logger is not None:
+            kwargs.setdefault("stacklevel", 3)  # Attribute records to the caller
+            logger.log(level, msg, *args, **kwargs)
+
+    def debug(self, msg, *args, **kwargs):
+        self._log(LEVELS["DEBUG"], msg, *args, **kwargs)
+
+    def info(self, msg, *args, **kwargs):
+        self._log(LEVELS["INFO"], msg, *args, **kwargs)
+
+    def warning(self, msg, *args, **kwargs):
+        self._log(LEVELS["WARNING"], msg, *args, **kwargs)
+
+    def error(self, msg, *args, **kwargs):
+        self._log(LEVELS["ERROR"], msg, *args, **kwargs)
+
+
+def get_logger(name):
+    """
+    Return a LazyLogger for a module.
+
+    :param name: Logger name, usually the module's __name__.
+    :return: LazyLogger instance.
+    """
+    return LazyLogger(name)
@@ -0,0 +1,366 @@
+import bisect
+import ipaddress
+
+from scripts.subnet_carver import format_ipv4
+
+# Bits per word of the sparse pool bitmaps.
+WORD_BITS = 64
+
+_FULL_WORD = (1 << WORD_BITS) - 1
+
+_MAC_SEPARATORS = str.maketrans("", "", ":-.")
+
+_HEX_DIGITS = frozenset("0123456789abcdef")
+
+
+def normalize_mac(mac):
+    """
+    Normalize a MAC address to lowercase, colon separated form.
+
+    :param mac: MAC address with ":", "-" or "." separators, or none.
+    :return: MAC address such as "aa:bb:cc:dd:ee:ff".
+    :raises ValueError: If the address is not 12 hexadecimal digits.
+    """
+    d = str(mac).translate(_MAC_SEPARATORS).lower()
+    if len(d) != 12 or not _HEX_DIGITS.issuperset(d):
+        raise ValueError(f"Invalid MAC address: {mac!r}.")
+    return f"{d[0:2]}:{d[2:4]}:{d[4:6]}:{d[6:8]}:{d[8:10]}:{d[10:12]}"
+
+
+class LeasePool:
+    def __init__(self, cidr, dhcp_start, dhcp_stop):
+        """
+        Track the static addresses of one subnet in a bitmap.
+
+        The static band is every address outside the DHCP range except the
+        network, gateway (the first host) and broadcast addresses. Its addresses
+        are numbered from the bottom of the subnet, and bit n of the bitmap is
+        set while address n is assigned. The bitmap is a dictionary of 64-bit
+        words that only holds words with assigned addresses, so even the band of
+        an IPv6 /64 costs nothing until it is used.
+
+        Allocation hands out the lowest free address. A cursor below which every
+        address is taken only moves forward while allocating, so each full word
+        is skipped once and a run of allocations is O(1) amortized per address.
+
+        :param cidr: Subnet CIDR.
+        :param dhcp_start: First address of the DHCP range.
+        :param dhcp_stop: Last address of the DHCP range.
+        :raises ValueError: If the DHCP range is not inside the subnet.
+        """
+        network = ipaddress.ip_network(cidr)
+        start = int(network.network_address)
+        broadcast = start + network.num_addresses - 1
+        dhcp_start = int(ipaddress.ip_address(dhcp_start))
+        dhcp_stop = int(ipaddress.ip_address(dhcp_stop))
+        if not start < dhcp_start <= dhcp_stop + 1 <= broadcast:
+            raise ValueError(f"Invalid DHCP range for {cidr}.")
+
+        self.cidr = cidr
+        self.version = network.version
+        self.network = start
+        self.broadcast = broadcast
+        # Address n + 2 up to the DHCP range, then the addresses above it.
+        self.low_size = max(dhcp_start - start - 2, 0)
+        self.high_start = dhcp_stop + 1
+        self.size = self.low_size + max(broadcast - self.high_start, 0)
+        self.used = 0
+        self.words = {}
+        self.cursor = 0
+
+    @property
+    def free(self):
+        return self.size - self.used
+
+    def index(self, address):
+        """
+        Map an address to its position in the static band.
+
+        :param address: Integer address.
+        :return: Position in the band, or None if the address is not in it.
+        """
+        offset = address - self.network - 2
+        if 0 <= offset < self.low_size:
+            return offset
+        if self.high_start <= address < self.broadcast:
+            return self.low_size + address - self.high_start
+        return None
+
+    def address(self, index):
+        """
+        Map a position in the static band to its address.
+
+        :param index: Position in the band.
+        :return: Integer address.
+        """
+        if index < self.low_size:
+            return self.network + 2 + index
+        return self.high_start + index - self.low_size
+
+    def format(self, address):
+        """
+        Format an integer address of the subnet.
+
+        :param address: Integer address.
+        :return: Address string.
+        """
+        if self.version == 4:
+            return format_ipv4(address)
+        return str(ipaddress.IPv6Address(address))
+
+    def is_used(self, index):
+        return (self.words.get(index // WORD_BITS, 0) >> (index % WORD_BITS)) & 1 == 1
+
+    def _set(self, index):
+        word = index // WORD_BITS
+        self.words[word] = self.words.get(word, 0) | (1 << (index % WORD_BITS))
+        self.used += 1
+
+    def pin(self, address):
+        """
+        Assign a specific address.
+
+        :param address: Integer address in the static band.
+        :raises ValueError: If the address is outside the static band or taken.
+        """
+        index = self.index(address)
+        if index is None:
+            raise ValueError(
+                f"{self.format(address)} is not a static address of {self.cidr}."
+            )
+        if self.is_used(index):
+            raise ValueError(f"{self.format(address)} is already assigned.")
+        self._set(index)
+
+    def allocate(self):
+        """
+        Assign the lowest free address.
+
+        :return: Integer address, or None if the pool is exhausted.
+        """
+        index = self.cursor
+        while index < self.size:
+            word_index = index // WORD_BITS
+            # Bits below the cursor count as taken.
+            word = self.words.get(word_index, 0) | ((1 << (index % WORD_BITS)) - 1)
+            if word != _FULL_WORD:
+                index = word_index * WORD_BITS + (~word & (word + 1)).bit_length() - 1
+                break
+            index = (word_index + 1) * WORD_BITS
+        if index >= self.size:
+            self.cursor = self.size
+            return None
+        self._set(index)
+        self.cursor = index + 1
+        return self.address(index)
+
+    def release(self, address):
+        """
+        Return an assigned address to the pool.
+
+        :param address: Integer address in the static band.
+        :raises ValueError: If the address is not assigned.
+        """
+        index = self.index(address)
+        if index is None or not self.is_used(index):
+            raise ValueError(f"{self.format(address)} is not assigned in {self.cidr}.")
+        word = index // WORD_BITS
+        self.words[word] &= ~(1 << (index % WORD_BITS))
+        if not self.words[word]:
+            del self.words[word]
+        self.used -= 1
+        self.cursor = min(self.cursor, index)
+
+
+class LeasePlanner:
+    def __init__(self, subnets):
+        """
+        Place static DHCP leases in the static bands of generated subnets.
+
+        :param subnets: Subnets from VpcGenerator.generate_subnets(), with at
+            least the cidr, dhcp_start and dhcp_stop fields. Subnets without a
+            DHCP range, such as reserved ones, get no pool.
+        :raises ValueError: If two subnets share a CIDR.
+        """
+        self.pools = {}
+        for subnet in subnets:
+            if subnet.get("dhcp_start") is None or subnet.get("dhcp_stop") is None:
+                continue
+            cidr = subnet["cidr"]
+            if cidr in self.pools:
+                raise ValueError(f"Duplicate subnet: {cidr}.")
+            self.pools[cidr] = LeasePool(
+                cidr, subnet["dhcp_start"], subnet["dhcp_stop"]
+            )
+        # Pools ordered by network address, per IP version, to find an address's pool.
+        self._by_address = {
+            version: sorted(
+                (pool.network, pool)
+                for pool in self.pools.values()
+                if pool.version == version
+            )
+            for version in (4, 6)
+        }
+        self._starts = {
+            version: [network for network, _ in pools]
+            for version, pools in self._by_address.items()
+        }
+        self.leases = {}
+
+    def _pool(self, cidr):
+        try:
+            return self.pools[cidr]
+        except KeyError:
+            raise ValueError(f"No subnet with a static pool: {cidr}.") from None
+
+    def _pool_for(self, address):
+        pools = self._by_address[address.version]
+        i = bisect.bisect_right(self._starts[address.version], int(address)) - 1
+        if i >= 0 and int(address) <= pools[i][1].broadcast:
+            return pools[i][1]
+        raise ValueError(f"{address} is not in any subnet.")
+
+    @staticmethod
+    def _parse_address(address):
+        try:
+            return ipaddress.ip_address(address)
+        except ValueError as e:
+            raise ValueError(f"Invalid lease address: {address!r}.") from e
+
+    def _claim(self, mac):
+        mac = normalize_mac(mac)
+        if mac in self.leases:
+            raise ValueError(f"{mac} already has a lease.")
+        return mac
+
+    def pin(self, mac, address):
+        """
+        Give a MAC address a specific static address.
+
+        :param mac: MAC address.
+        :param address: IP address in the static band of one of the subnets.
+        :return: The assigned address string.
+        :raises ValueError: If the MAC already has a lease, or the address is
+            invalid, outside every static band or already assigned.
+        """
+        mac = self._claim(mac)
+        parsed = self._parse_address(address)
+        pool = self._pool_for(parsed)
+        pool.pin(int(parsed))
+        self.leases[mac] = (pool.cidr, str(parsed))
+        return str(parsed)
+
+    def assign(self, mac, cidr):
+        """
+        Give a MAC address the lowest free static address of a subnet.
+
+        :param mac: MAC address.
+        :param cidr: CIDR of the subnet.
+        :return: The assigned address string.
+        :raises ValueError: If the MAC already has a lease, the subnet is unknown
+            or its static pool is exhausted.
+        """
+        return self._allocate(self._claim(mac), self._pool(cidr))
+
+    def _allocate(self, mac, pool):
+        address = pool.allocate()
+        if address is None:
+            raise ValueError(
+                f"Static pool of {pool.cidr} is exhausted: "
+                f"all {pool.size} addresses are assigned."
+            )
+        self.leases[mac] = (pool.cidr, pool.format(address))
+        return self.leases[mac][1]
+
+    def release(self, mac):
+        """
+        Remove the lease of a MAC address.
+
+        :param mac: MAC address.
+        :raises ValueError: If the MAC has no lease.
+        """
+        mac = normalize_mac(mac)
+        if mac not in self.leases:
+            raise ValueError(f"{mac} has no lease.")
+        cidr, address = self.leases.pop(mac)
+        self.pools[cidr].release(int(ipaddress.ip_address(address)))
+
+    def plan(self, leases):
+        """
+        Place many leases at once.
+
+        Pinned leases are placed first, so automatically assigned ones never take
+        a pinned address. Capacity is checked before anything is assigned: if
+        any pool is too small, nothing changes and the error lists every short
+        pool.
+
+        :param leases: Iterable of dictionaries with 'mac' and either 'address'
+            for a pinned lease or 'subnet' (a CIDR) for the next free address.
+        :return: Dictionary mapping each normalized MAC to its address string.
+        :raises ValueError: If a lease is invalid or collides, or if pools are
+            exhausted.
+        """
+        pinned, requested = [], {}
+        seen, duplicates = set(self.leases), set()
+        for lease in leases:
+            mac = normalize_mac(lease["mac"])
+            if mac in seen:
+                duplicates.add(mac)
+            seen.add(mac)
+            if lease.get("address") is not None:
+                pinned.append((mac, self._parse_address(lease["address"])))
+            else:
+                requested.setdefault(lease.get("subnet"), []).append(mac)
+        if duplicates:
+            raise ValueError(
+                f"MAC addresses with more than one lease: {sorted(duplicates)}."
+            )
+
+        # Pinned addresses are checked up front and reduce the free space of
+        # their pool.
+        pinned_pools, pinned_addresses = [], set()
+        pinned_per_pool = {}
+        for mac, address in pinned:
+            pool = self._pool_for(address)
+            index = pool.index(int(address))
+            if index is None:
+                raise ValueError(f"{address} is not a static address of {pool.cidr}.")
+            if pool.is_used(index) or address in pinned_addresses:
+                raise ValueError(f"{address} is already assigned.")
+            pinned_addresses.add(address)
+            pinned_pools.append(pool)
+            pinned_per_pool[pool.cidr] = pinned_per_pool.get(pool.cidr, 0) + 1
+        shortfalls = []
+        for cidr, macs in requested.items():
+            pool = self._pool(cidr)
+            free = pool.free - pinned_per_pool.get(cidr, 0)
+            if len(macs) > free:
+                shortfalls.append(
+                    f"{cidr} needs {len(macs)} addresses but has "
+                    f"{free} of {pool.size} free"
+                )
+        if shortfalls:
+            raise ValueError("Static pools exhausted: " + "; ".join(shortfalls) + ".")
+
+        placed = {}
+        for (mac, address), pool in zip(pinned, pinned_pools):
+            pool.pin(int(address))
+            self.leases[mac] = (pool.cidr, str(address))
+            placed[mac] = str(address)
+        for cidr, macs in requested.items():
+            pool = self.pools[cidr]
+            for mac in macs:
+                placed[mac] = self._allocate(mac, pool)
+        return placed
+
+    def report(self):
+        """
+        Summarize the use of every static pool.
+
+        :return: Dictionary mapping each subnet CIDR to a dictionary with the
+            pool 'size' and the number of 'used' and 'free' addresses.
+        """
+        return {
+            cidr: {"size": pool.size, "used": pool.used, "free": pool.free}
+            for cidr, pool in self.pools.items()
+        }
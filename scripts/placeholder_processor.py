@@ -1,12 +1,198 @@
+import functools
 import json
-import logging
+import os
 import re
+import sys
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
-logger = logging.getLogger(__name__)
+# Make the scripts package importable when this file is run directly.
+if not __package__:
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts import diagnostics, instrumentation
+from scripts.lazy_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Matches "{name}" placeholders; the capturing group makes re.split() alternate
+# literal text (even positions) and placeholder names (odd positions).
+PLACEHOLDER_PATTERN = re.compile(r"{(\w+)}")
+
+
+class CompiledTemplate:
+    """
+    A template string parsed once into literal and placeholder segments.
+    """
+
+    __slots__ = ("source", "segments", "placeholders")
+
+    def __init__(self, source):
+        """
+        Parse a template string into segments.
+
+        :param source: Template string containing "{name}" placeholders.
+        """
+        self.source = source
+        self.segments = tuple(PLACEHOLDER_PATTERN.split(source))
+        self.placeholders = self.segments[1::2]
+
+    def render(self, context, index):
+        """
+        Render the template against a context with a single join.
+
+        Placeholders that are not in the context are kept as they are; callers
+        report them once per template through missing().
+
+        :param context: Context dictionary for placeholder values.
+        :param index: Current index for cycling through list placeholders.
+        :return: String with resolved placeholders.
+        """
+        if not self.placeholders:
+            return self.source
+        parts = list(self.segments)
+        for position in range(1, len(parts), 2):
+            placeholder = parts[position]
+            # A single lookup, so a LazyContext resolves each missing key once.
+            try:
+                value = context[placeholder]
+            except KeyError:
+                parts[position] = f"{{{placeholder}}}"
+                continue
+            if isinstance(value, list):
+                value = value[index % len(value)]
+            parts[position] = str(value)
+        return "".join(parts)
+
+    def missing(self, context):
+        """
+        List the placeholders that are not in a context.
+
+        :param context: Context dictionary for placeholder values.
+        :return: Tuple of placeholder names.
+        """
+        return tuple(name for name in self.placeholders if name not in context)
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_template(source):
+    """
+    Return the compiled form of a template string, cached per template text.
+
+    VPCs sharing the same template text reuse the same compiled template.
+
+    :param source: Template string containing "{name}" placeholders.
+    :return: CompiledTemplate instance.
+    """
+    return CompiledTemplate(source)
+
+
+_MISSING = object()
+
+
+def _lookup(node, key, sep="_", root=True):
+    """
+    Find the value of a flattened key in a nested dictionary.
+
+    A key joins the path of dictionary keys with sep, and list items that are
+    dictionaries are addressed by their index ("subnets_0_name"). A list that
+    holds anything other than dictionaries is a value of its own; only the
+    dictionaries before its first other item can be addressed by index. When
+    several paths spell the same key, the one whose first key comes last in the
+    dictionary wins.
+
+    :param node: Dictionary to search.
+    :param key: Flattened key.
+    :param sep: Separator between path components.
+    :param root: Whether the path so far is empty. The keys below an empty
+        path are not prefixed, so a dictionary under an empty key at the top
+        contributes its keys as they are.
+    :return: The value, or _MISSING if no path spells the key.
+    """
+    found, found_name = _MISSING, None
+    candidates = []
+    unprefixed = root and isinstance(node.get(""), dict)
+    if unprefixed:
+        candidates.append(("", _lookup(node[""], key, sep)))
+    position = len(key)
+    while position >= 0:
+        name = key[:position]
+        if name in node and not (unprefixed and name == ""):
+            rest = key[position + 1 :] if position < len(key) else None
+            candidates.append((name, _lookup_value(node[name], rest, sep)))
+        position = key.rfind(sep, 0, position)
+    for name, value in candidates:
+        if value is _MISSING:
+            continue
+        if found is _MISSING:
+            found, found_name = value, name
+        else:
+            names = list(node)
+            if names.index(name) > names.index(found_name):
+                found, found_name = value, name
+    return found
+
+
+def _lookup_value(value, rest, sep):
+    if isinstance(value, dict):
+        return _MISSING if rest is None else _lookup(value, rest, sep, False)
+    if isinstance(value, list):
+        if rest is None:
+            if all(isinstance(item, dict) for item in value):
+                return _MISSING
+            return value
+        index, found_sep, rest = rest.partition(sep)
+        if not (found_sep and index.isdecimal() and str(int(index)) == index):
+            return _MISSING
+        index = int(index)
+        if index >= len(value):
+            return _MISSING
+        if not all(isinstance(item, dict) for item in value[: index + 1]):
+            return _MISSING
+        return _lookup(value[index], rest, sep, False)
+    return value if rest is None else _MISSING
+
+
+class LazyContext(dict):
+    """
+    Template context that resolves flattened VPC keys on first use.
+
+    Looking up "settings_subdomains" walks the original nested VPC and stores the
+    value, so only the keys that templates use are ever resolved and nothing is
+    copied up front. Keys that do not resolve are remembered as well. Assigned
+    keys, such as count_index, take precedence over the VPC. Iterating the
+    context only covers the keys resolved or assigned so far.
+    """
+
+    __slots__ = ("_source", "_missing")
+
+    def __init__(self, source):
+        """
+        :param source: Nested dictionary the keys are resolved against.
+        """
+        super().__init__()
+        self._source = source
+        self._missing = set()
+
+    def __missing__(self, key):
+        if isinstance(key, str) and key not in self._missing:
+            value = _lookup(self._source, key)
+            if value is not _MISSING:
+                self[key] = value
+                return value
+            self._missing.add(key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
 
 
 class PlaceholderProcessor:
@@ -26,12 +212,12 @@ class PlaceholderProcessor:
 
     def _create_context(self, vpc):
         """
-        Creates a context dictionary for processing templates by flattening the VPC data.
+        Creates a context for processing templates that resolves flattened VPC keys on demand.
 
         :param vpc: A single VPC configuration dictionary.
-        :return: A context dictionary for template processing.
+        :return: A LazyContext for template processing.
         """
-        context = self._flatten(vpc)
+        context = LazyContext(vpc)
         context["count_index"] = 0  # Initialize, will be overridden in process method
         return context
 
@@ -50,6 +236,7 @@ class PlaceholderProcessor:
                         index + 1
                     )  # Update count_index for each iteration
                     result.append(self._process_vpc(vpc, context, index))
+            diagnostics.emit()
             return json.dumps(result, indent=2)
         except KeyError as ke:
             logger.error(f"KeyError in processing VPC data: {ke}")
@@ -58,6 +245,65 @@ class PlaceholderProcessor:
             logger.error(f"Unexpected error in processing VPC data: {e}")
             raise
 
+    def render_templates(self, vpc, count, start=0):
+        """
+        Render only the template fields of a VPC for a range of subnet indices.
+
+        The context is built once and each template value is compiled once, so
+        the cost grows with the number of subnets times the template size rather
+        than the size of the whole VPC.
+
+        :param vpc: VPC configuration dictionary.
+        :param count: Number of subnet indices to render.
+        :param start: First subnet index to render.
+        :return: List of dictionaries with resolved template fields, one per index.
+        :raises ValueError: On the first problem in strict diagnostics mode.
+        """
+        template = vpc.get("template") or {}
+        context = self._create_context(vpc)
+        compiled = []
+        for key, value in template.items():
+            compiled.append(
+                (
+                    key,
+                    compile_template(value) if isinstance(value, str) else None,
+                    value,
+                )
+            )
+
+        # The context keys are the same for every index, so unresolved
+        # placeholders are reported once per template with the number of indices.
+        vpc_id = vpc.get("vpc_id")
+        for key, template_value, _ in compiled:
+            if template_value is None:
+                continue
+            missing = template_value.missing(context)
+            for placeholder in missing:
+                diagnostics.unresolved(vpc_id, key, placeholder, count)
+            if instrumentation.enabled():
+                placeholders = template_value.placeholders
+                instrumentation.count(
+                    "placeholders_resolved", (len(placeholders) - len(missing)) * count
+                )
+                instrumentation.count("placeholders_missed", len(missing) * count)
+
+        rendered = []
+        with instrumentation.stage("render_templates"):
+            for index in range(start, start + count):
+                context["count_index"] = index + 1  # 1-based index
+                fields = {}
+                for key, template_value, value in compiled:
+                    if template_value is None:
+                        fields[key] = value
+                        continue
+                    try:
+                        fields[key] = template_value.render(context, index)
+                    except Exception as e:
+                        diagnostics.template_error(vpc_id, key, e)
+                        fields[key] = value
+                rendered.append(fields)
+        return rendered
+
     def _process_vpc(self, vpc, context, index):
         """
         Process a single VPC configuration, resolving placeholders.
@@ -77,7 +323,7 @@ class PlaceholderProcessor:
                 processed_vpc[key] = self._process_list(value, context, index)
             else:
                 processed_vpc[key] = self._resolve_placeholders(
-                    str(value), context, index
+                    str(value), context, index, key
                 )
         # Add dynamic vlan_id
         processed_vpc["vlan_id"] = index + 1
@@ -92,16 +338,10 @@ class PlaceholderProcessor:
         :param index: Current index for processing.
         :return: Dictionary with resolved placeholders.
         """
-        resolved = {}
-        for key, value in template.items():
-            try:
-                resolved[key] = self._resolve_placeholders(value, context, index)
-            except Exception as e:
-                logger.error(f"Error resolving template for key '{key}': {e}")
-                resolved[key] = (
-                    value  # If resolution fails, keep the original template value
-                )
-        return resolved
+        return {
+            key: self._resolve_placeholders(value, context, index, key)
+            for key, value in template.items()
+        }
 
     def _process_dict(self, data, context, index):
         """
@@ -141,60 +381,31 @@ class PlaceholderProcessor:
         else:
             return self._resolve_placeholders(str(item), context, index)
 
-    def _resolve_placeholders(self, value, context, index):
+    def _resolve_placeholders(self, value, context, index, key=None):
         """
         Resolve placeholders within a string value.
 
+        Unresolved placeholders and rendering errors are recorded in the
+        diagnostics; if resolution fails, the original value is kept.
+
         :param value: String value to resolve placeholders in.
         :param context: Context dictionary for placeholder values.
         :param index: Current index for cycling through list placeholders.
+        :param key: Key of the value, used to report problems.
         :return: String with resolved placeholders.
+        :raises ValueError: On the first problem in strict diagnostics mode.
         """
-        if isinstance(value, str):
-            placeholders = re.findall(r"{(\w+)}", value)
-            for placeholder in placeholders:
-                if placeholder in context:
-                    if isinstance(context[placeholder], list):
-                        value = value.replace(
-                            f"{{{placeholder}}}",
-                            str(
-                                context[placeholder][index % len(context[placeholder])]
-                            ),
-                        )
-                    else:
-                        value = value.replace(
-                            f"{{{placeholder}}}", str(context[placeholder])
-                        )
-                else:
-                    logger.warning(
-                        f"Placeholder {placeholder} not found in context. Keeping placeholder in output."
-                    )
-        return value
-
-    def _flatten(self, d, parent_key="", sep="_"):
-        """
-        Flatten a nested dictionary into a single level dictionary.
-
-        :param d: Dictionary to flatten.
-        :param parent_key: Parent key in recursion.
-        :param sep: Separator for key concatenation.
-        :return: Flattened dictionary.
-        """
-        items = {}
-        for k, v in d.items():
-            new_key = f"{parent_key}{sep}{k}" if parent_key else k
-            if isinstance(v, dict):
-                items.update(self._flatten(v, new_key, sep=sep))
-            elif isinstance(v, list):
-                for i, item in enumerate(v):
-                    if isinstance(item, dict):
-                        items.update(self._flatten(item, f"{new_key}{sep}{i}", sep=sep))
-                    else:
-                        items[new_key] = v
-                        break
-            else:
-                items[new_key] = v
-        return items
+        if not isinstance(value, str):
+            return value
+        template = compile_template(value)
+        vpc_id = context.get("vpc_id")
+        for placeholder in template.missing(context):
+            diagnostics.unresolved(vpc_id, key, placeholder)
+        try:
+            return template.render(context, index)
+        except Exception as e:
+            diagnostics.template_error(vpc_id, key, e)
+            return value
 
 
 if __name__ == "__main__":
@@ -0,0 +1,58 @@
+import contextvars
+import os
+
+# Environment and working directory of the client the current request is
+# answered for, see begin(). None answers it with this process's own.
+_client = contextvars.ContextVar("request_context", default=None)
+
+
+def begin(environ=None, cwd=None):
+    """
+    Start a new request in the current context.
+
+    The daemon answers each query on behalf of a client, whose settings must
+    apply instead of the ones the server happened to be started with.
+
+    :param environ: $VPC_BLUEPRINT_* variables of the client, or None to use
+        os.environ.
+    :param cwd: Working directory of the client that relative paths resolve
+        against, or None to use the current directory.
+    """
+    _client.set(None if environ is None and cwd is None else (environ, cwd))
+
+
+def environ():
+    """
+    Return the environment the current request was made with.
+
+    :return: Mapping of the client's variables, or None outside a client request.
+    """
+    client = _client.get()
+    return None if client is None else client[0]
+
+
+def getenv(name, default=None):
+    """
+    Read a variable of the environment the current request was made with.
+
+    :param name: Variable name.
+    :param default: Value if the variable is not set.
+    :return: Value of the variable, or default.
+    """
+    client = _client.get()
+    if client is None or client[0] is None:
+        return os.environ.get(name, default)
+    return client[0].get(name, default)
+
+
+def resolve(path):
+    """
+    Resolve a path given by the client against its working directory.
+
+    :param path: Absolute or relative filesystem path.
+    :return: Path relative to the current directory or absolute.
+    """
+    client = _client.get()
+    if client is None or client[1] is None:
+        return path
+    return os.path.join(client[1], path)
@@ -0,0 +1,109 @@
+import bisect
+import heapq
+
+
+class ReservedRanges:
+    def __init__(self, network, reserved=None, excluded=None):
+        """
+        Index reserved and excluded address ranges for overlap lookups.
+
+        Ranges are flattened into sorted, disjoint segments that each carry the
+        range that wins there: excluded ranges before reserved ones, then the
+        first declared. A sparse table over the segments finds the winner among
+        all segments a subnet overlaps, so a lookup is two bisections and does
+        not depend on how many ranges there are. Ranges of another IP version
+        or outside the network are dropped.
+
+        :param network: ipaddress network object the subnets are carved from.
+        :param reserved: Mapping of range CIDR to the purpose it is reserved for.
+        :param excluded: Iterable of range CIDRs no subnet may be handed out in.
+        :raises ValueError: If a range is not a valid CIDR.
+        """
+        import ipaddress
+
+        ranges = [(cidr, (True, None)) for cidr in excluded or ()]
+        ranges += [(cidr, (False, name)) for cidr, name in (reserved or {}).items()]
+
+        intervals = []
+        for priority, (cidr, label) in enumerate(ranges):
+            try:
+                reserved_network = ipaddress.ip_network(cidr)
+            except ValueError as e:
+                raise ValueError(f"Invalid reserved range: {cidr}") from e
+            if reserved_network.version != network.version or not (
+                reserved_network.overlaps(network)
+            ):
+                continue
+            start = int(reserved_network.network_address)
+            end = start + reserved_network.num_addresses - 1
+            intervals.append((start, end, priority, label))
+
+        self.starts = []
+        self.ends = []
+        self.labels = []
+        self._build(intervals)
+
+    def __bool__(self):
+        return bool(self.starts)
+
+    def _build(self, intervals):
+        points = sorted(
+            {start for start, _, _, _ in intervals}
+            | {end + 1 for _, end, _, _ in intervals}
+        )
+        intervals.sort()
+        active = []  # Heap of (priority, end, label); ended ranges are skipped lazily
+        priorities = []
+        next_interval = 0
+        for left, right in zip(points, points[1:]):
+            while (
+                next_interval < len(intervals) and intervals[next_interval][0] == left
+            ):
+                _, end, priority, label = intervals[next_interval]
+                heapq.heappush(active, (priority, end, label))
+                next_interval += 1
+            while active and active[0][1] < left:
+                heapq.heappop(active)
+            if not active:
+                continue
+            priority, _, label = active[0]
+            if priorities and priorities[-1] == priority and self.ends[-1] == left - 1:
+                self.ends[-1] = right - 1  # Same range continues
+                continue
+            self.starts.append(left)
+            self.ends.append(right - 1)
+            self.labels.append(label)
+            priorities.append(priority)
+
+        # table[level][i] is the winning (priority, segment) of segments
+        # i..i + 2**level - 1.
+        self._table = [[(priority, i) for i, priority in enumerate(priorities)]]
+        level = 1
+        while 1 << level <= len(priorities):
+            previous = self._table[-1]
+            half = 1 << (level - 1)
+            self._table.append(
+                [
+                    min(previous[i], previous[i + half])
+                    for i in range(len(previous) - half)
+                ]
+            )
+            level += 1
+
+    def lookup(self, start, end):
+        """
+        Find the range that applies to an address block.
+
+        :param start: First integer address of the block.
+        :param end: Last integer address of the block.
+        :return: None if no range overlaps the block, otherwise a tuple of
+            (excluded, name); name is None for excluded ranges.
+        """
+        last = bisect.bisect_right(self.starts, end) - 1
+        first = bisect.bisect_left(self.ends, start)
+        if first > last:
+            return None
+        level = (last - first + 1).bit_length() - 1
+        row = self._table[level]
+        _, segment = min(row[first], row[last - (1 << level) + 1])
+        return self.labels[segment]
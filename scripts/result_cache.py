@@ -0,0 +1,226 @@
+import json
+import os
+import time
+
+from scripts import request_context
+from scripts.lazy_logging import get_logger
+
+logger = get_logger(__name__)
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_script_version = None
+
+
+def script_version():
+    """
+    Hash the source of the helper scripts so a code change invalidates the cache.
+
+    :return: Hex digest of all scripts/*.py files.
+    """
+    global _script_version
+    if _script_version is None:
+        import hashlib
+
+        digest = hashlib.sha256()
+        if os.path.isdir(SCRIPTS_DIR):
+            for name in sorted(os.listdir(SCRIPTS_DIR)):
+                if name.endswith(".py"):
+                    digest.update(name.encode())
+                    with open(os.path.join(SCRIPTS_DIR, name), "rb") as f:
+                        digest.update(f.read())
+        else:
+            # Running from a zipapp: the archive itself identifies the version.
+            with open(os.path.dirname(SCRIPTS_DIR), "rb") as f:
+                digest.update(f.read())
+        _script_version = digest.hexdigest()
+    return _script_version
+
+
+def atomic_write(path, data):
+    """
+    Write a file atomically by renaming a temporary file over it.
+
+    :param path: Destination path.
+    :param data: String content to write, or a callable that writes to the file.
+    """
+    import tempfile
+
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            if callable(data):
+                data(f)
+            else:
+                f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class ResultCache:
+    # Query keys that configure the cache itself and are not part of the cache key.
+    CONTROL_KEYS = ("cache_dir", "cache_max_age", "cache_max_bytes")
+
+    def __init__(self, directory, max_age=7 * 24 * 3600, max_bytes=256 * 1024 * 1024):
+        """
+        Initialize an on-disk cache of final output documents.
+
+        :param directory: Cache directory; created if it does not exist.
+        :param max_age: Entries unused for longer than this many seconds are evicted.
+        :param max_bytes: Least recently used entries are evicted above this total size.
+        """
+        self.directory = directory
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_query(cls, query):
+        """
+        Create a cache from the query keys or environment, if caching is enabled.
+
+        :param query: Decoded Terraform query dictionary.
+        :return: ResultCache instance, or None if no cache directory is configured.
+        """
+        directory = query.get("cache_dir") or request_context.getenv(
+            "VPC_BLUEPRINT_CACHE_DIR"
+        )
+        if not directory:
+            return None
+        directory = request_context.resolve(directory)
+        kwargs = {}
+        for option in ("max_age", "max_bytes"):
+            value = query.get(f"cache_{option}")
+            if value not in (None, ""):
+                kwargs[option] = int(value)
+        return cls(directory, **kwargs)
+
+    def key(self, query):
+        """
+        Compute the cache key for a query.
+
+        :param query: Decoded Terraform query dictionary.
+        :return: Hex digest of the canonicalized query and the script version.
+        """
+        import hashlib
+
+        relevant = {k: v for k, v in query.items() if k not in self.CONTROL_KEYS}
+        canonical = json.dumps(relevant, sort_keys=True, separators=(",", ":"))
+        digest = hashlib.sha256(script_version().encode())
+        digest.update(canonical.encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def open(self, key):
+        """
+        Open a cached output document for reading.
+
+        :param key: Cache key from key().
+        :return: Text file object, or None on a miss or expired entry.
+        """
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                return None
+            f = open(path)
+            os.utime(path)  # Mark as recently used for eviction
+        except OSError:
+            return None
+        return f
+
+    def get(self, key):
+        """
+        Look up a cached output document.
+
+        :param key: Cache key from key().
+        :return: The cached document string, or None on a miss or expired entry.
+        """
+        f = self.open(key)
+        if f is None:
+            return None
+        with f:
+            return f.read()
+
+    def put(self, key, document):
+        """
+        Store an output document and evict old entries.
+
+        :param key: Cache key from key().
+        :param document: Output document string to store.
+        """
+        self.store(key, lambda f: f.write(document))
+
+    def store(self, key, write):
+        """
+        Store an output document written by a callback, then evict old entries.
+
+        The callback writes straight into the new cache entry, so large documents
+        are never held in memory. If it raises, nothing is stored.
+
+        :param key: Cache key from key().
+        :param write: Callable that receives a text file object to write to.
+        """
+        with self._lock():
+            atomic_write(self._path(key), write)
+            self._evict()
+
+    def _lock(self):
+        return _DirectoryLock(os.path.join(self.directory, ".lock"))
+
+    def _evict(self):
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.max_age:
+                self._remove(entry.path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def _remove(self, path):
+        try:
+            os.unlink(path)
+        except OSError as e:
+            logger.warning(f"Could not evict cache entry {path}: {e}")
+
+
+class _DirectoryLock:
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def __enter__(self):
+        try:
+            import fcntl
+        except ImportError:  # Windows: entries are still written atomically
+            fcntl = None
+        self.fcntl = fcntl
+        self.file = open(self.path, "a")
+        if fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.fcntl is not None:
+            self.fcntl.flock(self.file.fileno(), self.fcntl.LOCK_UN)
+        self.file.close()
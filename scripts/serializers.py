@@ -0,0 +1,287 @@
+import json
+import struct
+from collections.abc import Mapping
+
+from scripts.terraform_data_external import FORMATS, RawJSON, iter_json
+
+# Bytes buffered by the binary encoders before they are handed to the sink.
+FLUSH_SIZE = 65536
+
+_orjson = None
+
+
+def _load_orjson():
+    """
+    Import orjson on first use.
+
+    :return: The orjson module, or False if it is not installed.
+    """
+    global _orjson
+    if _orjson is None:
+        try:
+            import orjson
+        except ImportError:
+            orjson = False
+        _orjson = orjson
+    return _orjson
+
+
+def serialize(document, write, format="json", sort_keys=False):
+    """
+    Serialize a document in the given format.
+
+    :param document: JSON compatible document; may contain RawJSON values and
+        subnet records.
+    :param write: Callable that receives the output as str (json) or bytes
+        chunks (every other format).
+    :param format: One of FORMATS.
+    :param sort_keys: Whether to sort mapping keys.
+    :raises ValueError: If the format is unknown or its backend is not installed.
+    :raises TypeError: If the document contains an unsupported value.
+    """
+    if format == "json":
+        for chunk in iter_json(document, sort_keys):
+            write(chunk)
+    elif format == "orjson":
+        write(_orjson_dumps(document, sort_keys))
+    elif format == "msgpack":
+        MessagePackEncoder(write, sort_keys).encode(document)
+    elif format == "cbor":
+        CborEncoder(write, sort_keys).encode(document)
+    else:
+        raise ValueError(f"Invalid format: {format}. Must be one of {FORMATS}.")
+
+
+def _orjson_dumps(document, sort_keys):
+    orjson = _load_orjson()
+    if not orjson:
+        raise ValueError("The orjson format requires the orjson package.")
+
+    def default(obj):
+        if isinstance(obj, RawJSON):
+            return json.loads(obj)
+        if isinstance(obj, Mapping):
+            return dict(obj)
+        raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+    # RawJSON is a str subclass and must reach default() rather than be quoted.
+    option = orjson.OPT_PASSTHROUGH_SUBCLASS
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    return orjson.dumps(document, default=default, option=option)
+
+
+class _BinaryEncoder:
+    def __init__(self, write, sort_keys=False):
+        """
+        Stream a document as a binary encoding in bounded chunks.
+
+        :param write: Callable that receives bytes chunks.
+        :param sort_keys: Whether to sort mapping keys.
+        """
+        self.write = write
+        self.sort_keys = sort_keys
+        self.buffer = bytearray()
+        self.short_str_headers = [self._str_header(length) for length in range(256)]
+
+    def encode(self, document):
+        """
+        Encode a document and flush it to the sink.
+
+        :param document: JSON compatible document.
+        :raises TypeError: If the document contains an unsupported value.
+        """
+        self._encode(document)
+        self._flush()
+
+    def _flush(self):
+        if self.buffer:
+            self.write(bytes(self.buffer))
+            self.buffer.clear()
+
+    def _encode(self, obj):
+        buffer = self.buffer
+        cls = obj.__class__
+        # Exact types first: they make up nearly every value of a document.
+        if cls is str:
+            data = obj.encode()
+            length = len(data)
+            if length < 256:
+                buffer += self.short_str_headers[length]
+            else:
+                buffer += self._str_header(length)
+            buffer += data
+        elif cls is int:
+            buffer += self._int(obj)
+        elif obj is None:
+            buffer += self.NULL
+        elif cls is dict or isinstance(obj, Mapping):
+            buffer += self._map_header(len(obj))
+            items = sorted(obj.items()) if self.sort_keys else obj.items()
+            for key, value in items:
+                self._encode(key)
+                self._encode(value)
+        elif cls is list or cls is tuple:
+            buffer += self._array_header(len(obj))
+            for item in obj:
+                self._encode(item)
+                if len(buffer) >= FLUSH_SIZE:
+                    self._flush()
+        elif obj is True:
+            buffer += self.TRUE
+        elif obj is False:
+            buffer += self.FALSE
+        elif isinstance(obj, RawJSON):
+            self._encode(json.loads(obj))
+        elif isinstance(obj, float):
+            buffer += self._float(obj)
+        # Other subclasses are encoded as their base type.
+        elif isinstance(obj, str):
+            self._encode(str(obj))
+        elif isinstance(obj, int):
+            self._encode(int(obj))
+        elif isinstance(obj, (list, tuple)):
+            self._encode(list(obj))
+        else:
+            raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+class MessagePackEncoder(_BinaryEncoder):
+    """
+    MessagePack encoder for JSON compatible documents.
+
+    MessagePack has no integers beyond 64 bits, such as the device count of an
+    IPv6 /64 subnet; they are encoded as decimal strings.
+    """
+
+    NULL = b"\xc0"
+    TRUE = b"\xc3"
+    FALSE = b"\xc2"
+
+    def _int(self, value):
+        if 0 <= value < 0x80:
+            return bytes((value,))
+        if -0x20 <= value < 0:
+            return bytes((value & 0xFF,))
+        if value >= 0:
+            for limit, marker, fmt in (
+                (0x100, 0xCC, ">B"),
+                (0x10000, 0xCD, ">H"),
+                (0x100000000, 0xCE, ">I"),
+                (0x10000000000000000, 0xCF, ">Q"),
+            ):
+                if value < limit:
+                    return bytes((marker,)) + struct.pack(fmt, value)
+        else:
+            for limit, marker, fmt in (
+                (-0x80, 0xD0, ">b"),
+                (-0x8000, 0xD1, ">h"),
+                (-0x80000000, 0xD2, ">i"),
+                (-0x8000000000000000, 0xD3, ">q"),
+            ):
+                if value >= limit:
+                    return bytes((marker,)) + struct.pack(fmt, value)
+        digits = str(value).encode()
+        return self._str_header(len(digits)) + digits
+
+    def _float(self, value):
+        return b"\xcb" + struct.pack(">d", value)
+
+    def _header(self, length, fixed, fixed_limit, markers):
+        if length < fixed_limit:
+            return bytes((fixed | length,))
+        for limit, marker, fmt in markers:
+            if length < limit:
+                return bytes((marker,)) + struct.pack(fmt, length)
+        raise TypeError(f"Length out of MessagePack range: {length}")
+
+    def _str_header(self, length):
+        return self._header(
+            length,
+            0xA0,
+            32,
+            ((0x100, 0xD9, ">B"), (0x10000, 0xDA, ">H"), (0x100000000, 0xDB, ">I")),
+        )
+
+    def _array_header(self, length):
+        return self._header(
+            length, 0x90, 16, ((0x10000, 0xDC, ">H"), (0x100000000, 0xDD, ">I"))
+        )
+
+    def _map_header(self, length):
+        return self._header(
+            length, 0x80, 16, ((0x10000, 0xDE, ">H"), (0x100000000, 0xDF, ">I"))
+        )
+
+
+class CborEncoder(_BinaryEncoder):
+    """
+    CBOR (RFC 8949) encoder for JSON compatible documents.
+
+    Integers beyond 64 bits, such as the device count of an IPv6 /64 subnet,
+    are encoded as bignums (tags 2 and 3).
+    """
+
+    NULL = b"\xf6"
+    TRUE = b"\xf5"
+    FALSE = b"\xf4"
+
+    def _head(self, major, value):
+        major <<= 5
+        if value < 24:
+            return bytes((major | value,))
+        for limit, info, fmt in (
+            (0x100, 24, ">B"),
+            (0x10000, 25, ">H"),
+            (0x100000000, 26, ">I"),
+            (0x10000000000000000, 27, ">Q"),
+        ):
+            if value < limit:
+                return bytes((major | info,)) + struct.pack(fmt, value)
+        raise TypeError(f"Value out of CBOR range: {value}")
+
+    def _int(self, value):
+        major, value = (0, value) if value >= 0 else (1, -1 - value)
+        if value < 0x10000000000000000:
+            return self._head(major, value)
+        # Bignum: tag 2 (positive) or 3 (negative) around a byte string.
+        data = value.to_bytes((value.bit_length() + 7) // 8, "big")
+        return self._head(6, 2 + major) + self._head(2, len(data)) + data
+
+    def _float(self, value):
+        return b"\xfb" + struct.pack(">d", value)
+
+    def _str_header(self, length):
+        return self._head(3, length)
+
+    def _array_header(self, length):
+        return self._head(4, length)
+
+    def _map_header(self, length):
+        return self._head(5, length)
+
+
+class ZlibWriter:
+    def __init__(self, write):
+        """
+        Compress output incrementally with zlib.
+
+        :param write: Callable that receives the compressed bytes.
+        """
+        import zlib
+
+        self._compressor = zlib.compressobj()
+        self._write = write
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        compressed = self._compressor.compress(data)
+        if compressed:
+            self._write(compressed)
+
+    def close(self):
+        """
+        Write the remaining compressed bytes.
+        """
+        self._write(self._compressor.flush())
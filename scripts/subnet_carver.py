@@ -0,0 +1,299 @@
+# Below this many subnets the pure-Python path is faster than importing NumPy.
+NUMPY_THRESHOLD = 4096
+
+_numpy = None
+
+# Decimal strings for every octet value, indexed by the octet.
+_OCTETS = tuple(str(octet) for octet in range(256))
+
+
+def _load_numpy():
+    """
+    Import NumPy on first use.
+
+    :return: The numpy module, or False if it is not installed.
+    """
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            numpy = False
+        _numpy = numpy
+    return _numpy
+
+
+def _shift(values, delta):
+    """
+    Add a constant to a column of integer addresses without materializing it.
+
+    :param values: A range or NumPy array of integers.
+    :param delta: Constant to add to every value.
+    :return: Column of the same kind with every value shifted by delta.
+    """
+    if isinstance(values, range):
+        return range(values.start + delta, values.stop + delta, values.step)
+    return values + delta
+
+
+def format_ipv4(value):
+    """
+    Format an integer IPv4 address in dotted-quad notation.
+
+    :param value: IPv4 address as an integer.
+    :return: Dotted-quad string.
+    """
+    octets = _OCTETS
+    return (
+        f"{octets[value >> 24]}.{octets[(value >> 16) & 255]}"
+        f".{octets[(value >> 8) & 255]}.{octets[value & 255]}"
+    )
+
+
+class _Carver:
+    def __init__(self, network, count):
+        """
+        State shared by the carvers.
+
+        :param network: ipaddress network object the subnets are placed in.
+        :param count: Number of subnets.
+        """
+        self.version = network.version
+        self.max_prefixlen = network.max_prefixlen
+        self.base = int(network.network_address)
+        self.count = count
+
+    def _overlaps(self, network_int, block_size, other):
+        if other.version != self.version:
+            return False
+        other_start = int(other.network_address)
+        other_end = other_start + other.num_addresses - 1
+        return network_int <= other_end and other_start <= network_int + (
+            block_size - 1
+        )
+
+    def format_address(self, value):
+        """
+        Format a single integer address.
+
+        :param value: Address as an integer.
+        :return: Address string.
+        """
+        if self.version == 4:
+            return format_ipv4(value)
+        import ipaddress
+
+        return str(ipaddress.IPv6Address(value))
+
+
+class SubnetCarver(_Carver):
+    def __init__(self, network, new_prefix):
+        """
+        Carve a network into equally sized subnets using integer arithmetic.
+
+        Every subnet is described by its integer network address; the gateway,
+        broadcast address and DHCP bounds are fixed offsets from it, so they are
+        computed in closed form for a whole range of subnets at once.
+
+        :param network: ipaddress network object to carve.
+        :param new_prefix: Prefix length of the carved subnets.
+        :raises ValueError: If new_prefix is outside the network's prefix range.
+        """
+        if not network.prefixlen <= new_prefix <= network.max_prefixlen:
+            raise ValueError(f"Cannot carve {network} into /{new_prefix} subnets.")
+        super().__init__(network, 1 << (new_prefix - network.prefixlen))
+        self.prefixlen = new_prefix
+        self.block_size = 1 << (network.max_prefixlen - new_prefix)
+        self.device_count = self.block_size - 2
+        # 10% of the hosts at each end of the subnet are kept for static use.
+        self.static_count = max(self.device_count, 0) // 10
+
+    def network_ints(self, start=0, stop=None):
+        """
+        Return the integer network addresses of subnets start..stop-1.
+
+        :param start: Index of the first subnet.
+        :param stop: Index after the last subnet; defaults to the end of the split.
+        :return: NumPy array for large IPv4 ranges when NumPy is installed,
+            otherwise a lazy range.
+        """
+        stop = self.count if stop is None else min(stop, self.count)
+        start = min(start, stop)
+        if self.version == 4 and stop - start >= NUMPY_THRESHOLD:
+            numpy = _load_numpy()
+            if numpy:
+                indices = numpy.arange(start, stop, dtype=numpy.int64)
+                return indices * self.block_size + self.base
+        return range(
+            self.base + start * self.block_size,
+            self.base + stop * self.block_size,
+            self.block_size,
+        )
+
+    def columns(self, start=0, stop=None):
+        """
+        Compute the integer address columns of subnets start..stop-1.
+
+        :param start: Index of the first subnet.
+        :param stop: Index after the last subnet; defaults to the end of the split.
+        :return: Dictionary with 'network', 'gateway', 'broadcast', 'dhcp_start',
+            'dhcp_stop' and 'device_count' columns.
+        """
+        networks = self.network_ints(start, stop)
+        return {
+            "network": networks,
+            "gateway": _shift(networks, 1),
+            "broadcast": _shift(networks, self.block_size - 1),
+            "dhcp_start": _shift(networks, 1 + self.static_count),
+            "dhcp_stop": _shift(networks, self.block_size - 2 - self.static_count),
+            "device_count": [self.device_count] * len(networks),
+        }
+
+    def overlaps(self, network_int, other):
+        """
+        Check whether a carved subnet overlaps another network.
+
+        :param network_int: Integer network address of the carved subnet.
+        :param other: ipaddress network object to compare against.
+        :return: True if the address ranges intersect.
+        """
+        return self._overlaps(network_int, self.block_size, other)
+
+    def format_network(self, value):
+        """
+        Format a single integer network address in CIDR notation.
+
+        :param value: Integer network address of a carved subnet.
+        :return: CIDR string.
+        """
+        return f"{self.format_address(value)}/{self.prefixlen}"
+
+    def format_addresses(self, values):
+        """
+        Format a column of integer addresses.
+
+        :param values: Range or NumPy array of integer addresses.
+        :return: List of address strings.
+        """
+        if self.version == 4:
+            if isinstance(values, range):
+                return [format_ipv4(value) for value in values]
+            octets = _OCTETS
+            columns = [((values >> shift) & 255).tolist() for shift in (24, 16, 8, 0)]
+            return [
+                f"{octets[a]}.{octets[b]}.{octets[c]}.{octets[d]}"
+                for a, b, c, d in zip(*columns)
+            ]
+        return [self.format_address(value) for value in values]
+
+    def format_networks(self, values):
+        """
+        Format a column of integer network addresses in CIDR notation.
+
+        :param values: Range or NumPy array of integer network addresses.
+        :return: List of CIDR strings.
+        """
+        suffix = f"/{self.prefixlen}"
+        return [address + suffix for address in self.format_addresses(values)]
+
+
+class SizedSubnetCarver(_Carver):
+    def __init__(self, network, blocks):
+        """
+        Describe subnets of individual sizes placed in a network.
+
+        Provides the same columns and formatting methods as SubnetCarver for
+        blocks that were allocated elsewhere, for example by the buddy
+        allocator. Attributes that only exist for equal sizes, such as
+        prefixlen and block_size, are not defined.
+
+        :param network: ipaddress network object the blocks were placed in.
+        :param blocks: List of (integer network address, prefix length) tuples,
+            in output order.
+        """
+        super().__init__(network, len(blocks))
+        self.networks = [address for address, _ in blocks]
+        self.prefixes = {address: prefixlen for address, prefixlen in blocks}
+
+    def _block_size(self, network_int):
+        return 1 << (self.max_prefixlen - self.prefixes[network_int])
+
+    def network_ints(self, start=0, stop=None):
+        """
+        Return the integer network addresses of subnets start..stop-1.
+
+        :param start: Index of the first subnet.
+        :param stop: Index after the last subnet; defaults to the last subnet.
+        :return: List of integers.
+        """
+        return self.networks[start:stop]
+
+    def columns(self, start=0, stop=None):
+        """
+        Compute the integer address columns of subnets start..stop-1.
+
+        :param start: Index of the first subnet.
+        :param stop: Index after the last subnet; defaults to the last subnet.
+        :return: Dictionary with the same columns as SubnetCarver.columns().
+        """
+        networks = self.network_ints(start, stop)
+        columns = {
+            "network": networks,
+            "gateway": [],
+            "broadcast": [],
+            "dhcp_start": [],
+            "dhcp_stop": [],
+            "device_count": [],
+        }
+        for network_int in networks:
+            block_size = self._block_size(network_int)
+            device_count = block_size - 2
+            static_count = max(device_count, 0) // 10
+            columns["gateway"].append(network_int + 1)
+            columns["broadcast"].append(network_int + block_size - 1)
+            columns["dhcp_start"].append(network_int + 1 + static_count)
+            columns["dhcp_stop"].append(network_int + block_size - 2 - static_count)
+            columns["device_count"].append(device_count)
+        return columns
+
+    def overlaps(self, network_int, other):
+        """
+        Check whether a placed subnet overlaps another network.
+
+        :param network_int: Integer network address of the placed subnet.
+        :param other: ipaddress network object to compare against.
+        :return: True if the address ranges intersect.
+        """
+        return self._overlaps(network_int, self._block_size(network_int), other)
+
+    def format_network(self, value):
+        """
+        Format a single integer network address in CIDR notation.
+
+        :param value: Integer network address of a placed subnet.
+        :return: CIDR string.
+        """
+        return f"{self.format_address(value)}/{self.prefixes[value]}"
+
+    def format_addresses(self, values):
+        """
+        Format a column of integer addresses.
+
+        :param values: List of integer addresses.
+        :return: List of address strings.
+        """
+        if self.version == 4:
+            return [format_ipv4(value) for value in values]
+        return [self.format_address(value) for value in values]
+
+    def format_networks(self, values):
+        """
+        Format a column of integer network addresses in CIDR notation.
+
+        :param values: List of integer network addresses of placed subnets.
+        :return: List of CIDR strings.
+        """
+        return [
+            f"{address}/{self.prefixes[value]}"
+            for value, address in zip(values, self.format_addresses(values))
+        ]
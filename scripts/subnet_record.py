@@ -0,0 +1,275 @@
+import json
+from collections.abc import Mapping
+from json.encoder import encode_basestring_ascii
+
+
+def _encode(value, sort_keys):
+    """
+    Serialize a field value, with the same output as json.dumps.
+
+    :param value: Field value.
+    :param sort_keys: Whether to sort dictionary keys of rendered values.
+    :return: JSON text.
+    """
+    if value is None:
+        return "null"
+    if value.__class__ is str:
+        return encode_basestring_ascii(value)
+    if value.__class__ is int:
+        return int.__repr__(value)
+    return json.dumps(value, sort_keys=sort_keys)
+
+
+class RecordContext:
+    __slots__ = ("generator", "vpc_name", "key_orders", "prefixes", "reserved_fields")
+
+    def __init__(self, generator, keys, reserved_keys, reserved_fields):
+        """
+        Settings shared by every subnet record of a VPC.
+
+        :param generator: VpcGenerator that produced the records; provides the
+            UUID and VLAN description of a subnet.
+        :param keys: Field names of a regular subnet, in output order.
+        :param reserved_keys: Field names of a subnet overlapping a reserved
+            range, in output order.
+        :param reserved_fields: Values of the fields of a reserved subnet; strings
+            are formatted with the range's purpose as {name}.
+        """
+        self.generator = generator
+        self.vpc_name = generator.vpc.get("vpc_name")
+        # Indexed by (reserved, sort_keys).
+        self.key_orders = {
+            (False, False): tuple(keys),
+            (False, True): tuple(sorted(keys)),
+            (True, False): tuple(reserved_keys),
+            (True, True): tuple(sorted(reserved_keys)),
+        }
+        # JSON text preceding each field's value, as json.dumps writes it.
+        self.prefixes = {key: json.dumps(key) + ": " for key in (*keys, *reserved_keys)}
+        self.reserved_fields = reserved_fields
+
+
+class SubnetChunk:
+    __slots__ = ("context", "carver", "columns", "start")
+
+    def __init__(self, context, carver, columns, start):
+        """
+        Integer address columns shared by the records of one carved chunk.
+
+        :param context: RecordContext of the VPC.
+        :param carver: SubnetCarver that produced the columns; formats addresses.
+        :param columns: Dictionary of integer columns from carver.columns().
+        :param start: Index of the chunk's first subnet in the split.
+        """
+        self.context = context
+        self.carver = carver
+        self.columns = columns
+        self.start = start
+
+    def iter_json(self, records, sort_keys=False):
+        """
+        Serialize records of this chunk with the same output as their to_json().
+
+        Each address column is formatted once for the whole chunk instead of
+        once per record; reserved subnets fall back to to_json().
+
+        :param records: SubnetRecord objects of this chunk.
+        :param sort_keys: Whether to sort the fields of each record by name.
+        :return: Iterator over the JSON text of each record.
+        """
+        context = self.context
+        keys = context.key_orders[False, sort_keys]
+        template = "{" + ", ".join(context.prefixes[key] + "%s" for key in keys) + "}"
+        # Addresses and CIDRs never need escaping, so they are quoted directly.
+        quoted = {}
+        if "cidr" in keys or "uuid" in keys:
+            quoted["cidr"] = self.carver.format_networks(self.columns["network"])
+        for key in ("gateway", "dhcp_start", "dhcp_stop"):
+            if key in keys:
+                quoted[key] = self.carver.format_addresses(self.columns[key])
+        cidrs = quoted.get("cidr")
+        if "cidr" not in keys:
+            del quoted["cidr"]
+
+        for record in records:
+            if record._reserved is not None:
+                yield record.to_json(sort_keys)
+                continue
+            position = record._position
+            values = []
+            for key in keys:
+                column = quoted.get(key)
+                if column is not None:
+                    values.append('"' + column[position] + '"')
+                elif key == "uuid":
+                    if record._uuid is None:
+                        record._uuid = context.generator._subnet_uuid(
+                            cidrs[position], record._vlan_id
+                        )
+                    values.append('"' + record._uuid + '"')
+                else:
+                    values.append(_encode(_GETTERS[key](record), sort_keys))
+            yield template % tuple(values)
+
+
+class SubnetRecord(Mapping):
+    __slots__ = ("_chunk", "_position", "_vlan_id", "_rendered", "_reserved", "_uuid")
+
+    def __init__(self, chunk, position, vlan_id, rendered=None, reserved=None):
+        """
+        A generated subnet, read-only and formatted on access.
+
+        The record keeps the integer position of the subnet in its chunk instead
+        of a dictionary of strings; addresses, the CIDR, the UUID and the labels
+        are formatted only when a field is read or the record is serialized.
+        It compares equal to the dictionary of its fields.
+
+        :param chunk: SubnetChunk the subnet was carved in.
+        :param position: Index of the subnet within the chunk.
+        :param vlan_id: VLAN ID of the subnet, or None if untagged.
+        :param rendered: Dictionary of rendered template fields, if templated.
+        :param reserved: Purpose of the reserved range the subnet overlaps, if any.
+        """
+        self._chunk = chunk
+        self._position = position
+        self._vlan_id = vlan_id
+        self._rendered = rendered
+        self._reserved = reserved
+        self._uuid = None
+
+    def _keys(self, sort_keys=False):
+        return self._chunk.context.key_orders[self._reserved is not None, sort_keys]
+
+    def _reserved_field(self, key):
+        value = self._chunk.context.reserved_fields[key]
+        return value if value is None else value.format(name=self._reserved)
+
+    def _cidr(self):
+        chunk = self._chunk
+        return chunk.carver.format_network(chunk.columns["network"][self._position])
+
+    def _device_count(self):
+        return self._chunk.columns["device_count"][self._position]
+
+    def _uuid_field(self):
+        if self._uuid is None:
+            # Cached, so a random UUID stays the same once it has been read.
+            self._uuid = self._chunk.context.generator._subnet_uuid(
+                self._cidr(), self._vlan_id
+            )
+        return self._uuid
+
+    def _vlan_id_field(self):
+        return self._vlan_id
+
+    def _address(self, key):
+        if self._reserved is not None:
+            return self._reserved_field(key)
+        chunk = self._chunk
+        return chunk.carver.format_address(chunk.columns[key][self._position])
+
+    def _gateway(self):
+        return self._address("gateway")
+
+    def _dhcp_start(self):
+        return self._address("dhcp_start")
+
+    def _dhcp_stop(self):
+        return self._address("dhcp_stop")
+
+    def _label(self, key):
+        if self._reserved is not None:
+            return self._reserved_field(key)
+        if self._rendered is not None and key in self._rendered:
+            return self._rendered[key]
+        chunk = self._chunk
+        index = chunk.start + self._position
+        if key == "domain":
+            return f"subdomain_{index}.lan"
+        return f"{chunk.context.vpc_name} Region {index}"
+
+    def _domain(self):
+        return self._label("domain")
+
+    def _name(self):
+        return self._label("name")
+
+    def _description(self):
+        if self._reserved is not None:
+            return self._reserved_field("description")
+        return self._chunk.context.generator._get_vlan_description(self._vlan_id)
+
+    def __getitem__(self, key):
+        if key not in self._keys():
+            raise KeyError(key)
+        return _GETTERS[key](self)
+
+    def __contains__(self, key):
+        return key in self._keys()
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self):
+        return len(self._keys())
+
+    def items(self):
+        """
+        Return the fields and their values.
+
+        :return: List of (field, value) tuples, in output order.
+        """
+        return [(key, _GETTERS[key](self)) for key in self._keys()]
+
+    def __repr__(self):
+        return f"SubnetRecord({dict(self)!r})"
+
+    def to_json(self, sort_keys=False):
+        """
+        Serialize the record with the same output as json.dumps of its dictionary.
+
+        :param sort_keys: Whether to sort the fields by name.
+        :return: JSON object text.
+        """
+        prefixes = self._chunk.context.prefixes
+        return (
+            "{"
+            + ", ".join(
+                prefixes[key] + _encode(_GETTERS[key](self), sort_keys)
+                for key in self._keys(sort_keys)
+            )
+            + "}"
+        )
+
+    @staticmethod
+    def iter_json_many(records, sort_keys=False):
+        """
+        Serialize a list of records, formatting the address columns in bulk.
+
+        :param records: List of SubnetRecord objects, in output order.
+        :param sort_keys: Whether to sort the fields of each record by name.
+        :return: Iterator over the JSON text of each record.
+        """
+        start = 0
+        while start < len(records):
+            chunk = records[start]._chunk
+            stop = start + 1
+            while stop < len(records) and records[stop]._chunk is chunk:
+                stop += 1
+            yield from chunk.iter_json(records[start:stop], sort_keys)
+            start = stop
+
+
+# Computes each field of a record on access.
+_GETTERS = {
+    "cidr": SubnetRecord._cidr,
+    "device_count": SubnetRecord._device_count,
+    "uuid": SubnetRecord._uuid_field,
+    "vlan_id": SubnetRecord._vlan_id_field,
+    "dhcp_start": SubnetRecord._dhcp_start,
+    "dhcp_stop": SubnetRecord._dhcp_stop,
+    "domain": SubnetRecord._domain,
+    "name": SubnetRecord._name,
+    "gateway": SubnetRecord._gateway,
+    "description": SubnetRecord._description,
+}
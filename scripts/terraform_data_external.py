@@ -1,23 +1,182 @@
-import base64
+import io
 import json
-import logging
-from datetime import datetime
+import os
+import sys
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
-logger = logging.getLogger(__name__)
+# Make the scripts package importable when this file is run directly.
+if not __package__:
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts import instrumentation
+from scripts.lazy_logging import get_logger
+
+logger = get_logger(__name__)
+
+# How the query is echoed back in the output: in full, as a content hash, or not at all.
+SOURCE_MODES = ("full", "hash", "omit")
+
+# Serialization formats of the document: the streamed JSON Terraform decodes, JSON
+# through orjson when it is installed, and the compact binary MessagePack and CBOR.
+FORMATS = ("json", "orjson", "msgpack", "cbor")
+
+# Compression applied to the serialized document, before base64 encoding.
+COMPRESSIONS = ("none", "zlib")
+
+# Bytes of JSON base64 encoded per write; a multiple of 3 so no padding is emitted.
+BASE64_CHUNK_SIZE = 3 * 16384
+
+
+class RawJSON(str):
+    """
+    Already serialized JSON text, emitted verbatim by iter_json.
+
+    Only honoured within the streamed depth; json.dumps would encode it as a string.
+    """
+
+    __slots__ = ()
+
+
+def iter_json(obj, sort_keys=False, depth=4):
+    """
+    Serialize an object to JSON in chunks, with the same output as json.dumps.
+
+    Containers down to the given depth are written piece by piece, so only one
+    leaf (for example a single subnet) is serialized in memory at a time. Leaves
+    with a to_json(sort_keys) method, and lists whose items have an
+    iter_json_many(items, sort_keys) method, such as subnet records, serialize
+    themselves.
+
+    :param obj: JSON serializable object; RawJSON values are copied as-is.
+    :param sort_keys: Whether to sort dictionary keys.
+    :param depth: Number of container levels to stream before delegating to json.dumps.
+    :return: Iterator over JSON text chunks.
+    :raises TypeError: If the object is not JSON serializable.
+    """
+    if isinstance(obj, RawJSON):
+        yield obj
+    elif depth and isinstance(obj, dict) and obj:
+        items = sorted(obj.items()) if sort_keys else obj.items()
+        separator = "{"
+        for key, value in items:
+            if not isinstance(key, str):
+                key = json.dumps(key)  # Same key coercion as json.dumps
+            yield separator + json.dumps(key) + ": "
+            yield from iter_json(value, sort_keys, depth - 1)
+            separator = ", "
+        yield "}"
+    elif depth and isinstance(obj, list) and obj:
+        # Lists of subnet records serialize themselves in bulk.
+        many = getattr(obj[0], "iter_json_many", None)
+        separator = "["
+        if many is not None:
+            for text in many(obj, sort_keys):
+                yield separator + text
+                separator = ", "
+        else:
+            for item in obj:
+                yield separator
+                yield from iter_json(item, sort_keys, depth - 1)
+                separator = ", "
+        yield "]"
+    else:
+        to_json = getattr(obj, "to_json", None)
+        if to_json is not None:
+            yield to_json(sort_keys)
+        else:
+            yield json.dumps(obj, sort_keys=sort_keys)
+
+
+class Base64Writer:
+    def __init__(self, stream):
+        """
+        Base64 encode text or bytes incrementally onto a text stream.
+
+        :param stream: Text stream that receives the base64 output.
+        """
+        import base64
+
+        self._b64encode = base64.b64encode
+        self.stream = stream
+        self.buffer = bytearray()
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.buffer += data.encode() if isinstance(data, str) else data
+        if len(self.buffer) >= BASE64_CHUNK_SIZE:
+            whole = len(self.buffer) - len(self.buffer) % 3
+            self._emit(self.buffer[:whole])
+            del self.buffer[:whole]
+
+    def close(self):
+        """
+        Encode the remaining bytes, with padding.
+        """
+        self._emit(self.buffer)
+        self.buffer = bytearray()
+
+    def _emit(self, data):
+        encoded = self._b64encode(data).decode()
+        self.stream.write(encoded)
+        self.bytes_written += len(encoded)
 
 
 class TerraformDataExternal:
-    def __init__(self):
+    def __init__(
+        self, deterministic=False, source_mode="full", format="json", compression=None
+    ):
         """
         Initialize the class with a simplified, flattened structure.
+
+        :param deterministic: If True, the timestamp is a hash of the input content
+            instead of the current time, so identical input encodes identically.
+        :param source_mode: "full" to echo the input as 'source', "hash" to echo only
+            its sha256, or "omit" to leave it out of the output.
+        :param format: Serialization format of the document, one of FORMATS.
+            Terraform can only decode "json"; the others are for other consumers.
+        :param compression: "zlib" to compress the serialized document, or None.
+        :raises ValueError: If source_mode, format or compression is not supported.
         """
+        if source_mode not in SOURCE_MODES:
+            raise ValueError(
+                f"Invalid source mode: {source_mode}. Must be one of {SOURCE_MODES}."
+            )
+        if format not in FORMATS:
+            raise ValueError(f"Invalid format: {format}. Must be one of {FORMATS}.")
+        compression = compression or "none"
+        if compression not in COMPRESSIONS:
+            raise ValueError(
+                f"Invalid compression: {compression}. Must be one of {COMPRESSIONS}."
+            )
         self.config = {}
         self.source = {}
-        self.timestamp = datetime.now().isoformat()
+        self.deterministic = deterministic
+        self.source_mode = source_mode
+        self.format = format
+        self.compression = compression
+        self.timestamp = self._make_timestamp()
+
+    def _source_digest(self):
+        """
+        Hash the canonical JSON form of the source.
+
+        :return: Hex sha256 digest.
+        """
+        import hashlib
+
+        canonical = json.dumps(self.source, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def _make_timestamp(self):
+        """
+        Create the timestamp for the current source.
+
+        :return: ISO timestamp, or a content hash of the source in deterministic mode.
+        """
+        if self.deterministic:
+            return "sha256:" + self._source_digest()
+        from datetime import datetime
+
+        return datetime.now().isoformat()
 
     def process_inputs(self, input_data):
         """
@@ -38,9 +197,96 @@ class TerraformDataExternal:
             raise ValueError("Input data must be a dictionary")
 
         self.source = input_data
-        self.timestamp = datetime.now().isoformat()  # Update timestamp
+        self.timestamp = self._make_timestamp()  # Update timestamp
         logger.info("Input processed successfully")
 
+    def _document(self):
+        """
+        Assemble the document to encode, honouring the source mode.
+
+        :return: Dictionary with 'config', optionally 'source', and 'timestamp'.
+        """
+        document = {"config": self.config}
+        if self.source_mode == "full":
+            document["source"] = self.source
+        elif self.source_mode == "hash":
+            document["source"] = {"sha256": self._source_digest()}
+        document["timestamp"] = self.timestamp
+        return document
+
+    def write_document(self, write):
+        """
+        Serialize the document in the configured format and compression.
+
+        :param write: Callable that receives str or bytes chunks of the output.
+        :raises TypeError: If encoding fails due to non-serializable objects.
+        :raises ValueError: If the backend of the format is not installed.
+        """
+        # Sorted keys keep the encoding independent of input key order.
+        sort_keys = self.deterministic
+        try:
+            if self.format == "json" and self.compression == "none":
+                for chunk in iter_json(self._document(), sort_keys):
+                    write(chunk)
+                return
+
+            from scripts import serializers
+
+            compressor = None
+            if self.compression == "zlib":
+                compressor = serializers.ZlibWriter(write)
+                write = compressor.write
+            serializers.serialize(self._document(), write, self.format, sort_keys)
+            if compressor is not None:
+                compressor.close()
+        except TypeError as e:
+            logger.error(f"Error encoding data to {self.format}: {e}")
+            raise
+
+    def write_encoded(self, stream):
+        """
+        Stream the data as base64 encoded JSON onto a text stream.
+
+        Serialized chunks go straight through an incremental base64 encoder, so
+        neither the full document nor the full base64 text is held in memory.
+
+        :param stream: Text stream that receives the base64 output.
+        :return: Number of base64 characters written.
+        :raises TypeError: If encoding fails due to non-serializable objects.
+        """
+        writer = Base64Writer(stream)
+        with instrumentation.stage("encode"):
+            self.write_document(writer.write)
+            writer.close()
+        instrumentation.count("bytes_encoded", writer.bytes_written)
+        logger.info("Data encoded to base64")
+        return writer.bytes_written
+
+    def write_raw(self, stream):
+        """
+        Stream the serialized data onto a binary stream, without base64.
+
+        For consumers other than Terraform, which can read binary formats and
+        compressed output directly.
+
+        :param stream: Binary stream that receives the output.
+        :return: Number of bytes written.
+        :raises TypeError: If encoding fails due to non-serializable objects.
+        """
+        written = 0
+
+        def write(data):
+            nonlocal written
+            if isinstance(data, str):
+                data = data.encode()
+            stream.write(data)
+            written += len(data)
+
+        with instrumentation.stage("encode"):
+            self.write_document(write)
+        instrumentation.count("bytes_encoded", written)
+        return written
+
     def encode_data(self):
         """
         Encodes the data into JSON, then Base64.
@@ -48,22 +294,28 @@ class TerraformDataExternal:
         :return: A base64 encoded string of the data.
         :raises TypeError: If encoding to JSON fails due to non-serializable objects.
         """
-        try:
-            data_to_encode = {
-                "config": self.config,
-                "source": self.source,
-                "timestamp": self.timestamp,
-            }
-            json_data = json.dumps(data_to_encode)
-            encoded = base64.b64encode(json_data.encode()).decode()
-            logger.info("Data encoded to base64")
-            return encoded
-        except TypeError as e:
-            logger.error(f"Error encoding data to JSON: {e}")
-            raise
+        buffer = io.StringIO()
+        self.write_encoded(buffer)
+        return buffer.getvalue()
+
+
+def dumps(obj, sort_keys=False):
+    """
+    Serialize an object to JSON text, with the same output as json.dumps.
+
+    Unlike json.dumps it accepts RawJSON and subnet records within the
+    streamed depth of iter_json.
+
+    :param obj: JSON serializable object.
+    :param sort_keys: Whether to sort dictionary keys.
+    :return: JSON text.
+    """
+    return "".join(iter_json(obj, sort_keys))
 
 
 if __name__ == "__main__":
+    import base64
+
     # Example data for testing
     test_input = {
         "vpcs": [
@@ -0,0 +1,184 @@
+# Number of 802.1Q VLAN IDs, 0 to 4095.
+VLAN_ID_COUNT = 4096
+
+
+class VlanSet:
+    __slots__ = ("bits",)
+
+    def __init__(self, bits=0):
+        """
+        A set of VLAN IDs backed by a 4096-bit bitmap.
+
+        Bit n is set when VLAN n is a member. Iteration walks runs of set bits,
+        so a range like 1-4094 is yielded from a single range object, and set
+        algebra is a single integer operation.
+
+        :param bits: Bitmap of the members.
+        """
+        self.bits = bits
+
+    @classmethod
+    def parse(cls, text):
+        """
+        Parse a VLAN specification such as "1-10", "1,2,3" or "1,5-7".
+
+        :param text: Comma separated list of VLAN IDs and inclusive ranges.
+        :return: VlanSet of the listed IDs.
+        :raises ValueError: If an item is malformed or outside 0-4095, or if the
+            items are not in ascending order without repeats.
+        """
+        bits = 0
+        previous = -1  # Last ID of the previous item
+        for item in str(text).split(","):
+            first, separator, last = item.partition("-")
+            try:
+                first = int(first)
+                last = int(last) if separator else first
+            except ValueError:
+                raise ValueError(f"Invalid VLAN range: {item.strip()!r}.") from None
+            if not 0 <= first <= last < VLAN_ID_COUNT:
+                raise ValueError(
+                    f"Invalid VLAN range: {item.strip()!r}. "
+                    f"IDs must be ascending and between 0 and {VLAN_ID_COUNT - 1}."
+                )
+            if first <= previous:
+                # A set has no order, so "3,1,2" would silently become "1-3".
+                raise ValueError(
+                    f"Invalid VLAN range: {str(text)!r}. "
+                    "Items must be ascending and must not repeat an ID."
+                )
+            previous = last
+            bits |= ((1 << (last - first + 1)) - 1) << first
+        return cls(bits)
+
+    @classmethod
+    def from_ids(cls, vlan_ids):
+        """
+        Build a set from individual VLAN IDs.
+
+        :param vlan_ids: Iterable of VLAN IDs between 0 and 4095.
+        :return: VlanSet of the IDs.
+        :raises ValueError: If an ID is outside 0-4095.
+        """
+        bits = 0
+        for vlan_id in vlan_ids:
+            if not 0 <= vlan_id < VLAN_ID_COUNT:
+                raise ValueError(f"Invalid VLAN ID: {vlan_id}.")
+            bits |= 1 << vlan_id
+        return cls(bits)
+
+    def runs(self):
+        """
+        Iterate over maximal runs of consecutive members.
+
+        :return: Iterator over (first, last) tuples of inclusive ranges, ascending.
+        """
+        # Reversed binary string: character n is bit n.
+        bits = bin(self.bits)[:1:-1]
+        first = bits.find("1")
+        while first != -1:
+            end = bits.find("0", first)
+            if end == -1:
+                end = len(bits)
+            yield first, end - 1
+            first = bits.find("1", end)
+
+    def __iter__(self):
+        for first, last in self.runs():
+            yield from range(first, last + 1)
+
+    def __len__(self):
+        return self.bits.bit_count()
+
+    def __bool__(self):
+        return bool(self.bits)
+
+    def __contains__(self, vlan_id):
+        return (
+            isinstance(vlan_id, int)
+            and vlan_id >= 0
+            and bool((self.bits >> vlan_id) & 1)
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, VlanSet):
+            return NotImplemented
+        return self.bits == other.bits
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def __or__(self, other):
+        return VlanSet(self.bits | other.bits)
+
+    def __and__(self, other):
+        return VlanSet(self.bits & other.bits)
+
+    def __sub__(self, other):
+        return VlanSet(self.bits & ~other.bits)
+
+    def __xor__(self, other):
+        return VlanSet(self.bits ^ other.bits)
+
+    def __str__(self):
+        return ",".join(
+            str(first) if first == last else f"{first}-{last}"
+            for first, last in self.runs()
+        )
+
+    def __repr__(self):
+        return f"VlanSet({str(self)!r})"
+
+    def rank(self, vlan_id):
+        """
+        Count the members below a VLAN ID.
+
+        :param vlan_id: VLAN ID.
+        :return: Index the ID has, or would have, in ascending order.
+        """
+        return (self.bits & ((1 << vlan_id) - 1)).bit_count()
+
+    def select(self, index):
+        """
+        Find the member with a given index in ascending order.
+
+        :param index: Index of the member, from 0.
+        :return: VLAN ID.
+        :raises IndexError: If the set has no more than index members.
+        """
+        if index >= 0:
+            for first, last in self.runs():
+                if index <= last - first:
+                    return first + index
+                index -= last - first + 1
+        raise IndexError("VLAN set index out of range")
+
+    def positions(self, within, start=0, stop=None):
+        """
+        Pair members with their index in a superset, for a range of indices.
+
+        Used to leave out members of the superset while every remaining ID keeps
+        the position it has in the superset.
+
+        :param within: VlanSet containing this set.
+        :param start: First index in within to return.
+        :param stop: Index in within to stop at; the end of within if None.
+        :return: Iterator over (index in within, VLAN ID) tuples, ascending.
+        """
+        stop = len(within) if stop is None else stop
+        for first, last in self.runs():
+            index = within.rank(first)
+            if index >= stop:
+                return
+            if index + last - first < start:
+                continue
+            skip = max(start - index, 0)
+            take = min(last - first + 1, stop - index)
+            yield from zip(
+                range(index + skip, index + take), range(first + skip, first + take)
+            )
+
+
+# IDs that are never assigned to a subnet: 0 (priority tagging), 1002-1005
+# (Token Ring and FDDI defaults on Cisco) and 4095 (implementation use).
+RESERVED_VLANS = VlanSet.parse("0,1002-1005,4095")
@@ -1,149 +1,421 @@
-import ipaddress
 import json
-import logging
 import os
 import sys
-import uuid
 
-# Add the parent directory to sys.path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+# Make the scripts package importable when this file is run directly; startup
+# only pays for modules that every invocation needs, the rest are imported where used.
+if not __package__:
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from scripts.placeholder_processor import PlaceholderProcessor
+from scripts import instrumentation, request_context
+from scripts.lazy_logging import get_logger
+from scripts.result_cache import ResultCache
+from scripts.subnet_carver import SizedSubnetCarver, SubnetCarver
 from scripts.terraform_data_external import TerraformDataExternal
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+logger = get_logger(__name__)
+
+# Namespace for subnet UUIDs derived from (vpc_id, cidr, vlan_id) in deterministic mode.
+# uuid5(NAMESPACE_URL, "https://github.com/BrainXio/terraform-vpc-blueprint")
+SUBNET_UUID_NAMESPACE = "d70fce64-95af-5df7-9d44-6e5c2f2530e1"
+
+_SUBNET_UUID_NAMESPACE_BYTES = bytes.fromhex(SUBNET_UUID_NAMESPACE.replace("-", ""))
+
+# Fields of a generated subnet, in output order.
+SUBNET_FIELDS = (
+    "cidr",
+    "device_count",
+    "uuid",
+    "vlan_id",
+    "dhcp_start",
+    "dhcp_stop",
+    "domain",
+    "name",
+    "gateway",
+    "description",
 )
-logger = logging.getLogger(__name__)
+
+# Ranges reserved when ubiquity_unifi is enabled, by purpose.
+UNIFI_RESERVED_RANGES = {"192.168.4.0/24": "Teleport VPN server"}
+
+# Field values of a subnet that overlaps a reserved range; strings are
+# formatted with the range's purpose as {name}.
+RESERVED_SUBNET_FIELDS = {
+    "name": "{name}",
+    "dhcp_start": None,
+    "dhcp_stop": None,
+    "domain": None,
+    "gateway": None,
+    "description": "Reserved for {name}",
+}
+
+# Output layouts: a list of subnet objects, or one array per field.
+LAYOUTS = ("rows", "columns")
+
+# Number of subnets carved, rendered and formatted together by iter_subnets.
+CHUNK_SIZE = 1024
+
+# Usable 802.1Q VLAN IDs; a VPC never produces more tagged subnets than this.
+MAX_VLANS = 4094
+
+# Below this many subnets in total, generate_all stays serial.
+PARALLEL_MIN_SUBNETS = 20000
 
 
 class VpcGenerator:
-    def __init__(self, vpc, ubiquity_unifi=False):
+    def __init__(self, vpc, ubiquity_unifi=False, deterministic=False, fields=None):
         self.vpc = vpc
         self.ubiquity_unifi = ubiquity_unifi
+        self.deterministic = deterministic
+        self.fields = SUBNET_FIELDS if fields is None else self._parse_fields(fields)
+
+    def generate_subnets(self, offset=0, limit=None):
+        """
+        Generate the subnets of the VPC.
+
+        :param offset: Index of the first subnet of the split to return.
+        :param limit: Maximum number of subnets to return; all remaining if None.
+        :return: List of SubnetRecord mappings.
+        """
+        with instrumentation.stage("generate_subnets"):
+            subnets = list(self.iter_subnets(offset, limit))
+        instrumentation.count("subnets", len(subnets))
+        return subnets
+
+    def generate_columns(self, offset=0, limit=None):
+        """
+        Generate the subnets of the VPC as one array per field.
+
+        :param offset: Index of the first subnet of the split to return.
+        :param limit: Maximum number of subnets to return; all remaining if None.
+        :return: Dictionary mapping each selected field to a list of values.
+        """
+        columns = {field: [] for field in self.fields}
+        appends = [(field, columns[field].append) for field in self.fields]
+        with instrumentation.stage("generate_subnets"):
+            for subnet in self.iter_subnets(offset, limit):
+                for field, append in appends:
+                    append(subnet[field])
+        instrumentation.count("subnets", len(columns[self.fields[0]]))
+        return columns
+
+    def iter_subnets(self, offset=0, limit=None):
+        """
+        Lazily generate the subnets of the VPC, one chunk at a time.
+
+        Subnets before offset are never carved or rendered, so paging through
+        a large split (for example an IPv6 /48 into /64s) uses constant memory.
+
+        :param offset: Index of the first subnet of the split to return.
+        :param limit: Maximum number of subnets to return; all remaining if None.
+        :return: Iterator over SubnetRecord mappings.
+        :raises ValueError: If the VPC configuration or the page is invalid.
+        """
+        if offset < 0 or (limit is not None and limit < 0):
+            raise ValueError(f"Invalid page: offset={offset}, limit={limit}.")
+
+        network = self._network()
+        vlan_ids = self._vlan_ids()
+
+        subnet_sizes = self.vpc.get("subnet_sizes")
+        if subnet_sizes:
+            from scripts.buddy_allocator import allocate_blocks
+
+            prefixes = self._parse_subnet_sizes(subnet_sizes, network)
+            addresses = allocate_blocks(network, prefixes)
+            carver = SizedSubnetCarver(network, list(zip(addresses, prefixes)))
+        else:
+            carver = SubnetCarver(network, self._split_prefix(network))
+        count = carver.count if vlan_ids is None else min(len(vlan_ids), carver.count)
+        stop = count if limit is None else min(count, offset + limit)
+
+        return self._iter_chunks(
+            carver, vlan_ids, self._reserved_ranges(network), offset, stop
+        )
+
+    def estimate(self):
+        """
+        Describe the split of the VPC without generating any subnet.
+
+        Everything is derived from vpc_cidr, vpc_subnets (or subnet_sizes) and
+        vlan_range in constant time, so even splits too large to generate are
+        estimated instantly. Subnets dropped by excluded_ranges are not
+        subtracted.
+
+        :return: Dictionary with the 'vpc_id', 'vpc_cidr', 'subnet_prefix' (None
+            with subnet_sizes), 'subnets_requested', 'subnets_carved' (rounded up
+            to a power of two), 'subnets' actually generated after the VLAN cap
+            and reserved VLAN IDs, 'addresses' of the VPC, 'unused_addresses'
+            outside the generated subnets, 'rounding_waste' (addresses of carved
+            subnets beyond the requested count), per-subnet 'dhcp_pool_size' and
+            'static_addresses' (None with subnet_sizes), and 'error', the message
+            generation would fail with, or None.
+        """
+        estimate = {
+            "vpc_id": self.vpc.get("vpc_id"),
+            "vpc_cidr": self.vpc.get("vpc_cidr"),
+            "subnet_prefix": None,
+            "subnets_requested": None,
+            "subnets_carved": None,
+            "subnets": None,
+            "addresses": None,
+            "unused_addresses": None,
+            "rounding_waste": None,
+            "dhcp_pool_size": None,
+            "static_addresses": None,
+            "error": None,
+        }
+        try:
+            estimate.update(self._estimate())
+        except KeyError as e:
+            estimate["error"] = f"Missing VPC setting: {e.args[0]}."
+        except (TypeError, ValueError) as e:
+            estimate["error"] = str(e)
+        return estimate
+
+    def _estimate(self):
+        network = self._network()
+        vlan_ids = self._vlan_ids()
+        estimate = {"addresses": network.num_addresses}
+
+        subnet_sizes = self.vpc.get("subnet_sizes")
+        if subnet_sizes:
+            prefixes = self._parse_subnet_sizes(subnet_sizes, network)
+            sizes = [1 << (network.max_prefixlen - prefixlen) for prefixlen in prefixes]
+            needed = sum(sizes)
+            if needed > network.num_addresses:
+                raise ValueError(
+                    f"Subnet sizes need {needed} addresses but {network} "
+                    f"only has {network.num_addresses}."
+                )
+            requested = carved = len(sizes)
+            estimate["rounding_waste"] = 0
+        else:
+            requested = self.vpc["vpc_subnets"]
+            carver = SubnetCarver(network, self._split_prefix(network))
+            carved = carver.count
+            static_count = carver.static_count
+            estimate.update(
+                subnet_prefix=carver.prefixlen,
+                rounding_waste=(carved - requested) * carver.block_size,
+                dhcp_pool_size=max(carver.block_size - 2 - 2 * static_count, 0),
+                # Below the DHCP range after the gateway, and above it.
+                static_addresses=max(static_count - 1, 0) + static_count,
+            )
+
+        # Reserved VLAN IDs are skipped but keep their slot, as in _iter_chunks.
+        count = carved if vlan_ids is None else min(len(vlan_ids), carved)
+        if vlan_ids is None:
+            slots = range(count)
+        else:
+            from scripts.vlan_set import RESERVED_VLANS
+
+            usable_vlan_ids = vlan_ids - RESERVED_VLANS
+            if subnet_sizes:
+                slots = [
+                    index for index, _ in usable_vlan_ids.positions(vlan_ids, 0, count)
+                ]
+            elif count == len(vlan_ids):
+                slots = range(len(usable_vlan_ids))
+            else:
+                slots = range(usable_vlan_ids.rank(vlan_ids.select(count)))
+
+        if subnet_sizes:
+            used = sum(sizes[index] for index in slots)
+        else:
+            used = len(slots) * carver.block_size
+        estimate.update(
+            subnets_requested=requested,
+            subnets_carved=carved,
+            subnets=len(slots),
+            unused_addresses=network.num_addresses - used,
+        )
+        return estimate
 
-    def generate_subnets(self):
+    def _network(self):
+        import ipaddress
+
+        if not self.vpc.get("vpc_cidr"):
+            raise ValueError(
+                f"VPC {self.vpc.get('vpc_id')} has no vpc_cidr; set one or "
+                "assign it from vpc_pools."
+            )
         try:
-            network = ipaddress.ip_network(self.vpc["vpc_cidr"])
+            return ipaddress.ip_network(self.vpc["vpc_cidr"])
         except ValueError as e:
             raise ValueError(f"Invalid VPC CIDR: {self.vpc['vpc_cidr']}") from e
 
+    def _vlan_ids(self):
+        # An explicit null vlan_range generates untagged subnets for the full split.
+        vlan_range = self.vpc["settings"].get("vlan_range", "1-1")
+        return None if vlan_range is None else self._parse_vlan_range(vlan_range)
+
+    def _split_prefix(self, network):
         num_subnets = self.vpc["vpc_subnets"]
         if num_subnets <= 0:
             raise ValueError(
                 f"Invalid number of subnets: {num_subnets}. Must be positive."
             )
+        return self._calculate_new_prefix(
+            network.prefixlen, num_subnets, network.max_prefixlen
+        )
 
-        vlan_range = self.vpc["settings"].get("vlan_range", "1-1")
-        vlan_ids = self._parse_vlan_range(vlan_range)
+    def _reserved_ranges(self, network):
+        """
+        Index the reserved and excluded ranges that apply to the VPC.
 
-        name_prefix = network.prefixlen
-        new_prefix = self._calculate_new_prefix(name_prefix, num_subnets)
+        :param network: ipaddress network object of the VPC.
+        :return: ReservedRanges instance, or None if no range overlaps the VPC.
+        """
+        reserved = self.vpc.get("reserved_ranges") or {}
+        if self.ubiquity_unifi:
+            # The first declared range wins an overlap; the VPC's own go first.
+            reserved = _most_specific_first(reserved, UNIFI_RESERVED_RANGES)
+        excluded = self.vpc.get("excluded_ranges") or ()
+        if not (reserved or excluded):
+            return None
 
-        subnets = []
-        processor = PlaceholderProcessor({"vpcs": [self.vpc]})
-        vlan_counter = 0
+        from scripts.reserved_ranges import ReservedRanges
 
-        reserved_subnet = (
-            ipaddress.ip_network("192.168.4.0/24") if self.ubiquity_unifi else None
-        )
+        return ReservedRanges(network, reserved, excluded) or None
 
-        for i, subnet in enumerate(network.subnets(new_prefix=new_prefix)):
-            if vlan_counter >= len(vlan_ids):
-                break
+    def _iter_chunks(self, carver, vlan_ids, reserved, start, stop):
+        from scripts.subnet_record import RecordContext, SubnetChunk, SubnetRecord
+        from scripts.vlan_set import RESERVED_VLANS
+
+        # Reserved VLAN IDs are dropped up front; the others keep their position
+        # in the declared set, so the subnet each VLAN gets does not change.
+        usable_vlan_ids = None if vlan_ids is None else vlan_ids - RESERVED_VLANS
+        processor = None
+        if "template" in self.vpc:
+            from scripts.placeholder_processor import PlaceholderProcessor
 
-            current_vlan_id = vlan_ids[vlan_counter]
-
-            if current_vlan_id == 0:
-                vlan_counter += 1
-                continue
-
-            subnet_details = {
-                "cidr": str(subnet),
-                "device_count": subnet.num_addresses - 2,
-                "uuid": str(uuid.uuid4()),
-                "vlan_id": current_vlan_id,
-            }
-
-            if self.ubiquity_unifi and subnet.overlaps(reserved_subnet):
-                subnet_details.update(
-                    {
-                        "name": "Teleport VPN server",
-                        "dhcp_start": None,
-                        "dhcp_stop": None,
-                        "domain": None,
-                        "gateway": None,
-                        "description": "Reserved for Teleport VPN server",
-                    }
+            processor = PlaceholderProcessor({"vpcs": [self.vpc]})
+
+        want = set(self.fields)
+        want_rendered = processor is not None and bool(want & {"domain", "name"})
+        # Templated subnets list the domain first, untemplated ones the name.
+        label_order = (
+            ("domain", "name") if processor is not None else ("name", "domain")
+        )
+        leading = ("cidr", "device_count", "uuid", "vlan_id")
+        trailing = ("dhcp_start", "dhcp_stop", *label_order, "gateway", "description")
+        context = RecordContext(
+            self,
+            [field for field in (*leading, *trailing) if field in want],
+            [field for field in (*leading, *RESERVED_SUBNET_FIELDS) if field in want],
+            RESERVED_SUBNET_FIELDS,
+        )
+
+        for chunk_start in range(start, stop, CHUNK_SIZE):
+            chunk_stop = min(chunk_start + CHUNK_SIZE, stop)
+            rendered = None
+            if want_rendered:
+                rendered = processor.render_templates(
+                    self.vpc, chunk_stop - chunk_start, chunk_start
                 )
+
+            # Addresses are carved as integer columns; records format them only
+            # when they are read or serialized.
+            with instrumentation.stage("carve"):
+                columns = carver.columns(chunk_start, chunk_stop)
+            chunk = SubnetChunk(context, carver, columns, chunk_start)
+
+            if vlan_ids is None:
+                slots = ((index, None) for index in range(chunk_start, chunk_stop))
             else:
-                try:
-                    subnet_details.update(self._scale_dhcp(subnet))
-                    if "template" in self.vpc:
-                        context = processor._create_context(self.vpc)
-                        context["count_index"] = vlan_counter + 1  # 1-based index
-                        processed_subnet = processor._process_vpc(
-                            self.vpc, context, vlan_counter
-                        )
-                        subnet_details.update(
-                            {
-                                "domain": processed_subnet.get(
-                                    "domain", f"subdomain_{vlan_counter}.lan"
-                                ),
-                                "name": processed_subnet.get(
-                                    "name",
-                                    f"{self.vpc['vpc_name']} Region {vlan_counter}",
-                                ),
-                            }
-                        )
-                    else:
-                        subnet_details["name"] = (
-                            f"{self.vpc['vpc_name']} Region {vlan_counter}"
-                        )
-                        subnet_details["domain"] = f"subdomain_{vlan_counter}.lan"
-                    subnet_details["gateway"] = str(subnet.network_address + 1)
-                    subnet_details["description"] = self._get_vlan_description(
-                        current_vlan_id
+                slots = usable_vlan_ids.positions(vlan_ids, chunk_start, chunk_stop)
+
+            for vlan_counter, current_vlan_id in slots:
+                position = vlan_counter - chunk_start
+
+                reservation = None
+                if reserved is not None:
+                    reservation = reserved.lookup(
+                        columns["network"][position], columns["broadcast"][position]
                     )
-                except Exception as e:
-                    logger.error(f"Error processing subnet {str(subnet)}: {str(e)}")
-                    continue  # Skip this subnet if there's an error
+                    if reservation is not None and reservation[0]:
+                        continue  # Inside an excluded range
 
-            subnets.append(subnet_details)
-            vlan_counter += 1
+                yield SubnetRecord(
+                    chunk,
+                    position,
+                    current_vlan_id,
+                    None if rendered is None else rendered[position],
+                    None if reservation is None else reservation[1],
+                )
 
-        return subnets
+    def _parse_fields(self, fields):
+        if isinstance(fields, str):
+            fields = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in fields if field not in SUBNET_FIELDS]
+        if unknown or not fields:
+            raise ValueError(
+                f"Invalid subnet fields: {unknown or fields}. "
+                f"Must be a non-empty selection of {SUBNET_FIELDS}."
+            )
+        return tuple(field for field in SUBNET_FIELDS if field in fields)
+
+    def _subnet_uuid(self, cidr, vlan_id):
+        if self.deterministic:
+            return _uuid5(f"{self.vpc.get('vpc_id')}/{cidr}/{vlan_id}")
+        import uuid
+
+        return str(uuid.uuid4())
 
     def _parse_vlan_range(self, vlan_range):
-        if "-" in vlan_range:
-            start, end = map(int, vlan_range.split("-"))
-            return list(range(start, end + 1))
-        elif "," in vlan_range:
-            return [int(v) for v in vlan_range.split(",")]
-        else:
-            return [int(vlan_range)]
+        from scripts.vlan_set import VlanSet
 
-    def _calculate_new_prefix(self, name_prefix, num_subnets):
-        new_prefix = name_prefix
-        while (1 << (new_prefix - name_prefix)) < num_subnets:
-            new_prefix += 1
-        if new_prefix > 32:  # For IPv4, adjust to 128 for IPv6
+        return VlanSet.parse(vlan_range)
+
+    def _parse_subnet_sizes(self, subnet_sizes, network):
+        """
+        Parse per-subnet size requirements into prefix lengths.
+
+        Items are comma separated, each an optional "<count>x" followed by a
+        prefix length ("/26") or a number of devices ("60"), for example
+        "/20,20x/26" or "500,20x60". A device count gets the smallest subnet
+        whose device_count holds it.
+
+        :param subnet_sizes: Size specification string.
+        :param network: ipaddress network object the subnets are placed in.
+        :return: List of prefix lengths, in declaration order.
+        :raises ValueError: If an item is malformed or does not fit the network.
+        """
+        prefixes = []
+        for item in subnet_sizes.split(","):
+            item = item.strip()
+            count, _, size = item.rpartition("x")
+            try:
+                count = int(count) if count else 1
+                if size.startswith("/"):
+                    prefixlen = int(size[1:])
+                elif int(size) < 0:
+                    raise ValueError(size)
+                else:
+                    # Network and broadcast addresses are not usable by devices.
+                    prefixlen = network.max_prefixlen - (int(size) + 1).bit_length()
+            except ValueError:
+                raise ValueError(f"Invalid subnet size: {item!r}.") from None
+            if (
+                count <= 0
+                or not network.prefixlen <= prefixlen <= network.max_prefixlen
+            ):
+                raise ValueError(f"Subnet size {item!r} does not fit in {network}.")
+            prefixes.extend([prefixlen] * count)
+        return prefixes
+
+    def _calculate_new_prefix(self, name_prefix, num_subnets, max_prefixlen=32):
+        # Smallest power of two that holds num_subnets; 32 for IPv4, 128 for IPv6.
+        new_prefix = name_prefix + (num_subnets - 1).bit_length()
+        if new_prefix > max_prefixlen:
             raise ValueError("Cannot subdivide network further due to subnet limit.")
         return new_prefix
 
-    def _scale_dhcp(self, subnet):
-        total_hosts = subnet.num_addresses - 2
-        static_count = int(0.1 * total_hosts)
-        dhcp_start = subnet.network_address + 1 + static_count
-        dhcp_end = subnet.broadcast_address - static_count - 1
-        return {
-            "dhcp_start": str(dhcp_start),
-            "dhcp_stop": str(dhcp_end),
-        }
-
     def _get_vlan_description(self, vlan_id):
-        if vlan_id == 0:
+        if vlan_id is None:
+            return "Untagged"
+        elif vlan_id == 0:
             return "Reserved for priority-tagged frames"
         elif vlan_id == 1:
             return "Default VLAN, often used for management"
@@ -153,35 +425,490 @@ class VpcGenerator:
             return "Reserved for Token Ring and FDDI VLANs in Cisco"
         return "Dynamic"
 
-    def _get_subnet_purpose(self, cidr):
-        reserved_subnets = {
-            "192.168.4.0/24": "Reserved for Teleport VPN server",
-            "10.255.253.0/24": "Reserved for Inter-VLAN routing (VLAN 4040)",
-        }
-        return reserved_subnets.get(cidr)
 
+def _uuid5(name):
+    """
+    Derive a subnet UUID, equal to str(uuid.uuid5(SUBNET_UUID_NAMESPACE, name)).
 
-if __name__ == "__main__":
-    try:
-        input_data = json.load(sys.stdin)
+    Hashes directly with SHA-1 instead of building uuid.UUID objects.
+
+    :param name: Name to derive the UUID from.
+    :return: UUID string.
+    """
+    import hashlib
+
+    digest = bytearray(
+        hashlib.sha1(_SUBNET_UUID_NAMESPACE_BYTES + name.encode()).digest()[:16]
+    )
+    digest[6] = digest[6] & 0x0F | 0x50  # Version 5
+    digest[8] = digest[8] & 0x3F | 0x80  # RFC 4122 variant
+    h = digest.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def _generate_vpc(args):
+    vpc, ubiquity_unifi, deterministic, fields, layout = args
+    generator = VpcGenerator(vpc, ubiquity_unifi, deterministic, fields)
+    if layout == "columns":
+        return generator.generate_columns()
+    return generator.generate_subnets()
+
+
+def _generate_vpc_reported(args):
+    # Runs in a pool worker; its trace and diagnostics travel back with the result.
+    from scripts import diagnostics
+
+    result = _generate_vpc(args)
+    trace = instrumentation.collect() if instrumentation.enabled() else None
+    return result, trace, diagnostics.collect()
+
+
+def configure_worker(trace_target, strict):
+    """
+    Apply the tracing and diagnostics settings of the parent in a pool worker.
+
+    Workers may not inherit settings that were configured at runtime.
+
+    :param trace_target: Trace target of the parent's request.
+    :param strict: Strict mode of the parent's request.
+    """
+    from scripts import diagnostics
+
+    instrumentation.configure(trace_target)
+    diagnostics.configure(strict)
+
+
+def _estimated_subnets(vpcs):
+    total = 0
+    for vpc in vpcs:
+        try:
+            count = int(vpc["vpc_subnets"])
+            if vpc["settings"].get("vlan_range", "") is not None:
+                count = min(count, MAX_VLANS)
+            total += count
+        except (KeyError, TypeError, ValueError):
+            pass  # Reported by the generator itself
+    return total
+
+
+def generate_all(
+    vpcs,
+    ubiquity_unifi=False,
+    deterministic=False,
+    workers=None,
+    fields=None,
+    layout="rows",
+):
+    """
+    Generate the subnets of several VPCs, optionally across a process pool.
+
+    The pool is only used when it is worth the fork overhead: more than one
+    worker, more than one VPC and at least PARALLEL_MIN_SUBNETS subnets in total.
+    Results are returned in input order and equal the serial results.
+
+    :param vpcs: List of VPC configuration dictionaries.
+    :param ubiquity_unifi: Whether to apply the Unifi reservations.
+    :param deterministic: Whether to derive subnet UUIDs from the subnets.
+    :param workers: Number of worker processes; 0 or "auto" for one per CPU,
+        None or 1 to run serially.
+    :param fields: Subnet fields to generate, as a list or comma-separated string;
+        all of SUBNET_FIELDS if None.
+    :param layout: "rows" for a list of subnets per VPC, "columns" for one array
+        per field.
+    :return: List of per-VPC results in the requested layout.
+    :raises ValueError: If the layout is not one of LAYOUTS.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Invalid layout: {layout}. Must be one of {LAYOUTS}.")
+    tasks = [(vpc, ubiquity_unifi, deterministic, fields, layout) for vpc in vpcs]
+    if workers in (None, ""):
+        workers = 1
+    elif workers == "auto" or int(workers) == 0:
+        workers = os.cpu_count() or 1
+    workers = min(int(workers), len(tasks))
+
+    if workers <= 1 or _estimated_subnets(vpcs) < PARALLEL_MIN_SUBNETS:
+        return [_generate_vpc(task) for task in tasks]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    from scripts import diagnostics
+
+    # A few chunks per worker balances uneven VPCs without per-VPC round trips.
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=configure_worker,
+        initargs=(instrumentation.current_target(), diagnostics.is_strict()),
+    ) as executor:
+        results = []
+        for result, trace, problems in executor.map(
+            _generate_vpc_reported, tasks, chunksize=chunksize
+        ):
+            if trace is not None:
+                instrumentation.merge(trace)
+            diagnostics.merge(problems)
+            results.append(result)
+        return results
+
+
+def generate_incremental(
+    vpcs,
+    state,
+    ubiquity_unifi=False,
+    deterministic=False,
+    workers=None,
+    fields=None,
+    layout="rows",
+):
+    """
+    Generate only the VPCs whose configuration changed since the previous run.
+
+    Results of unchanged VPCs are spliced in from the state as RawJSON text; the
+    others are generated with generate_all and recorded for the next run.
+
+    :param vpcs: List of VPC configuration dictionaries.
+    :param state: IncrementalState holding the results of the previous run.
+    :param ubiquity_unifi: Whether to apply the Unifi reservations.
+    :param deterministic: Whether to derive subnet UUIDs from the subnets.
+    :param workers: Number of worker processes, as for generate_all.
+    :param fields: Subnet fields to generate, as for generate_all.
+    :param layout: Output layout, as for generate_all.
+    :return: List of per-VPC results in the requested layout, as RawJSON for
+        the VPCs taken from the state.
+    """
+    fingerprints = [state.fingerprint(vpc) for vpc in vpcs]
+    results = [state.lookup(fingerprint) for fingerprint in fingerprints]
+    stale = [i for i, result in enumerate(results) if result is None]
+    logger.info(f"Regenerating {len(stale)} of {len(vpcs)} VPCs")
+    instrumentation.count("vpcs_reused", len(vpcs) - len(stale))
+
+    fresh = generate_all(
+        [vpcs[i] for i in stale], ubiquity_unifi, deterministic, workers, fields, layout
+    )
+    for i, result in zip(stale, fresh):
+        results[i] = result
+    for fingerprint, result in zip(fingerprints, results):
+        state.record(fingerprint, result)
+    state.prune()
+    return results
+
+
+def _most_specific_first(*ranges):
+    """
+    Merge mappings of CIDR to purpose, most specific first.
+
+    :param ranges: Mappings of CIDR to purpose, most specific first.
+    :return: Mapping in which each CIDR keeps the purpose and position of the
+        first mapping that declares it.
+    """
+    merged = {}
+    for mapping in ranges:
+        for cidr, purpose in mapping.items():
+            merged.setdefault(cidr, purpose)
+    return merged
+
+
+def _apply_vpc_settings(vpcs, query):
+    """
+    Merge settings passed as separate query keys into the VPC configurations.
+
+    subnet_sizes maps VPC IDs to size specifications and vpc_prefixes to the
+    prefix length of the block to assign from vpc_pools. reserved_ranges and
+    excluded_ranges map VPC IDs, or "*" for every VPC, to a mapping of CIDR to
+    purpose and a list of CIDRs respectively. Where reserved ranges overlap the
+    first declared wins, so ranges declared on the VPC come first, then those
+    for its ID, then the global ones.
+
+    :param vpcs: List of VPC configuration dictionaries.
+    :param query: Decoded Terraform query dictionary.
+    :return: List of VPC configurations, copied where settings were merged.
+    """
+    subnet_sizes = json.loads(query.get("subnet_sizes") or "{}")
+    vpc_prefixes = json.loads(query.get("vpc_prefixes") or "{}")
+    reserved = json.loads(query.get("reserved_ranges") or "{}")
+    excluded = json.loads(query.get("excluded_ranges") or "{}")
+    if not (subnet_sizes or vpc_prefixes or reserved or excluded):
+        return vpcs
+
+    merged = []
+    for vpc in vpcs:
+        vpc_id = str(vpc["vpc_id"])
+        vpc = dict(vpc)
+        if vpc_id in subnet_sizes:
+            vpc["subnet_sizes"] = subnet_sizes[vpc_id]
+        if vpc_id in vpc_prefixes:
+            vpc["vpc_prefix"] = vpc_prefixes[vpc_id]
+        if "*" in reserved or vpc_id in reserved:
+            vpc["reserved_ranges"] = _most_specific_first(
+                vpc.get("reserved_ranges") or {},
+                reserved.get(vpc_id, {}),
+                reserved.get("*", {}),
+            )
+        if "*" in excluded or vpc_id in excluded:
+            vpc["excluded_ranges"] = [
+                *excluded.get("*", []),
+                *excluded.get(vpc_id, []),
+                *(vpc.get("excluded_ranges") or []),
+            ]
+        merged.append(vpc)
+    return merged
+
+
+def build_encoder(query):
+    """
+    Generate the configuration for a Terraform query.
+
+    :param query: Decoded Terraform query; 'vpcs' is a JSON encoded string.
+    :return: TerraformDataExternal holding the generated configuration.
+    """
+    from scripts import diagnostics
+
+    input_data = dict(query)
+    with instrumentation.stage("decode_input"):
         input_data["vpcs"] = json.loads(input_data["vpcs"])
-        ubiquity_unifi = json.loads(input_data.get("ubiquity_unifi", "false"))
+    ubiquity_unifi = json.loads(input_data.get("ubiquity_unifi", "false"))
+    deterministic = json.loads(input_data.get("deterministic", "false"))
+    source_mode = input_data.get("source_mode") or "full"
+    output_format = input_data.get("format") or "json"
+    compression = input_data.get("compression") or None
+    diagnostics.configure(json.loads(input_data.get("strict", "false")))
 
-        encoder = TerraformDataExternal()
-        encoder.process_inputs(input_data)
+    encoder = TerraformDataExternal(
+        deterministic, source_mode, output_format, compression
+    )
+    encoder.process_inputs(input_data)
+
+    workers = input_data.get("workers") or request_context.getenv(
+        "VPC_BLUEPRINT_WORKERS"
+    )
+    vpcs = encoder.source["vpcs"]
+    instrumentation.count("vpcs", len(vpcs))
+    vpcs = _apply_vpc_settings(vpcs, input_data)
+    pools = json.loads(input_data.get("vpc_pools") or "[]")
+    if pools:
+        from scripts.address_pool import DEFAULT_NEWBITS, assign_vpc_cidrs
+
+        newbits = int(input_data.get("vpc_pool_newbits") or DEFAULT_NEWBITS)
+        vpcs = assign_vpc_cidrs(vpcs, pools, newbits)
+    fields = input_data.get("fields") or None
+    layout = input_data.get("layout") or "rows"
+    options = [ubiquity_unifi, deterministic, fields, layout]
+    state = None
+    if input_data.get("state_dir") or request_context.getenv("VPC_BLUEPRINT_STATE_DIR"):
+        from scripts.incremental_state import IncrementalState
+
+        state = IncrementalState.from_query(input_data, options, deterministic)
+    if state is None:
+        results = generate_all(
+            vpcs, ubiquity_unifi, deterministic, workers, fields, layout
+        )
+    else:
+        results = generate_incremental(
+            vpcs, state, ubiquity_unifi, deterministic, workers, fields, layout
+        )
 
-        for vpc in encoder.source["vpcs"]:
-            vpc_generator = VpcGenerator(vpc, ubiquity_unifi)
-            vpc_subnets = vpc_generator.generate_subnets()
-            if str(vpc["vpc_id"]) not in encoder.config:
-                encoder.config[str(vpc["vpc_id"])] = {}
-            encoder.config[str(vpc["vpc_id"])]["subnets"] = vpc_subnets
+    for vpc, vpc_subnets in zip(vpcs, results):
+        if str(vpc["vpc_id"]) not in encoder.config:
+            encoder.config[str(vpc["vpc_id"])] = {}
+        if pools:
+            encoder.config[str(vpc["vpc_id"])]["vpc_cidr"] = vpc["vpc_cidr"]
+        encoder.config[str(vpc["vpc_id"])]["subnets"] = vpc_subnets
 
-        encoded_result = encoder.encode_data()
-        print(json.dumps({"output": encoded_result}))
+    return encoder
+
+
+def estimate_query(query):
+    """
+    Estimate the split of every VPC of a Terraform query without generating it.
+
+    Settings passed as separate query keys and vpc_pools are applied first, as
+    in build_encoder.
+
+    :param query: Decoded Terraform query; 'vpcs' is a JSON encoded string.
+    :return: Dictionary mapping VPC IDs to VpcGenerator.estimate() results.
+    :raises ValueError: If VPC CIDRs cannot be assigned from vpc_pools.
+    """
+    vpcs = _apply_vpc_settings(json.loads(query["vpcs"]), query)
+    pools = json.loads(query.get("vpc_pools") or "[]")
+    if pools:
+        from scripts.address_pool import DEFAULT_NEWBITS, assign_vpc_cidrs
+
+        newbits = int(query.get("vpc_pool_newbits") or DEFAULT_NEWBITS)
+        vpcs = assign_vpc_cidrs(vpcs, pools, newbits)
+    return {str(vpc["vpc_id"]): VpcGenerator(vpc).estimate() for vpc in vpcs}
+
+
+def write_response(encoder, stream):
+    """
+    Stream the external data source response document for an encoder.
+
+    :param encoder: TerraformDataExternal holding the generated configuration.
+    :param stream: Text stream that receives {"output": "<base64>"}.
+    """
+    stream.write('{"output": "')
+    encoder.write_encoded(stream)  # Base64 needs no JSON string escaping
+    stream.write('"}')
+
+
+def run(query, stream):
+    """
+    Write the Terraform external data source response for a query.
+
+    When a cache directory is configured, a cache hit copies the stored
+    response without decoding the VPCs, carving or templating.
+
+    :param query: Decoded Terraform query dictionary.
+    :param stream: Text stream that receives the JSON response document.
+    """
+    cache = ResultCache.from_query(query)
+    if cache is None:
+        write_response(build_encoder(query), stream)
+        return
+
+    key = cache.key(query)
+    cached = cache.open(key)
+    instrumentation.count("cache_misses" if cached is None else "cache_hits")
+    if cached is None:
+        encoder = build_encoder(query)
+        cache.store(key, lambda f: write_response(encoder, f))
+        cached = cache.open(key)
+        if cached is None:
+            # Evicted right away: larger than cache_max_bytes, or a concurrent run.
+            write_response(encoder, stream)
+            return
+    with cached:
+        while True:
+            chunk = cached.read(65536)
+            if not chunk:
+                break
+            stream.write(chunk)
+
+
+def handle_request(
+    raw, stream, overrides=None, raw_output=False, environ=None, cwd=None
+):
+    """
+    Answer a raw Terraform query, capturing errors instead of raising them.
+
+    When $VPC_BLUEPRINT_TRACE is set, the stage timings and counters of the
+    request are written out once it is answered. Template problems are logged
+    as one summary per request. Both are kept per thread, so concurrent requests
+    of the daemon are reported separately, and so are the environment and
+    working directory of the client a request is answered for.
+
+    :param raw: Query JSON text as read from stdin.
+    :param stream: Text stream that receives the response document, or a binary
+        stream with raw_output.
+    :param overrides: Optional query keys that replace those of the query.
+    :param raw_output: If True, write the serialized document itself instead of
+        the base64 Terraform response, bypassing the result cache.
+    :param environ: $VPC_BLUEPRINT_* variables of the client, used instead of
+        os.environ; None to use os.environ.
+    :param cwd: Working directory of the client, against which relative cache
+        and state directories are resolved; None to use the current directory.
+    :return: Tuple of (exit status, error message or None).
+    """
+    from scripts import diagnostics
+
+    request_context.begin(environ, cwd)
+    diagnostics.begin()
+    instrumentation.begin()
+    try:
+        with instrumentation.stage("decode_input"):
+            query = json.loads(raw)
+        query.update(overrides or {})
+        with instrumentation.stage("request"):
+            if raw_output:
+                build_encoder(query).write_raw(stream)
+            else:
+                run(query, stream)
+        return 0, None
     except json.JSONDecodeError as e:
-        logger.error(f"Failed to decode JSON input: {e}")
-        sys.exit(1)
+        return 1, f"Failed to decode JSON input: {e}"
     except Exception as e:
-        logger.error(f"An error occurred: {e}")
-        sys.exit(1)
+        return 1, f"An error occurred: {e}"
+    finally:
+        diagnostics.emit()
+        instrumentation.emit()
+
+
+def parse_output_args(argv):
+    """
+    Parse the output options of a query answered from the command line.
+
+    :param argv: Command line arguments.
+    :return: argparse namespace with format, compression and raw.
+    """
+    import argparse
+
+    from scripts.terraform_data_external import COMPRESSIONS, FORMATS
+
+    parser = argparse.ArgumentParser(description="Answer the Terraform query on stdin.")
+    parser.add_argument(
+        "--format", choices=FORMATS, help="Serialization format of the document."
+    )
+    parser.add_argument(
+        "--compression", choices=COMPRESSIONS, help="Compress the serialized document."
+    )
+    parser.add_argument(
+        "--raw",
+        action="store_true",
+        help="Write the serialized document itself instead of the Terraform response.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Answer the query on stdin, run the long-lived server with --serve,
+    generate JSONL records offline with --batch, or print the estimated split
+    of each VPC of the query on stdin with --estimate.
+
+    :param argv: Command line arguments; defaults to sys.argv[1:].
+    :return: Exit status.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "--serve":
+        from scripts import blueprint_daemon
+
+        blueprint_daemon.main(argv[1:])
+        return 0
+    if argv and argv[0] == "--batch":
+        from scripts import blueprint_batch
+
+        return blueprint_batch.main(argv[1:])
+    if argv and argv[0] == "--estimate":
+        try:
+            estimates = estimate_query(json.loads(sys.stdin.read()))
+        except Exception as e:
+            logger.error(f"An error occurred: {e}")
+            return 1
+        json.dump(estimates, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return int(any(estimate["error"] for estimate in estimates.values()))
+
+    overrides, raw_output = {}, False
+    if argv:
+        args = parse_output_args(argv)
+        overrides = {
+            key: value
+            for key, value in (
+                ("format", args.format),
+                ("compression", args.compression),
+            )
+            if value
+        }
+        raw_output = args.raw
+
+    stream = sys.stdout.buffer if raw_output else sys.stdout
+    status, error = handle_request(sys.stdin.read(), stream, overrides, raw_output)
+    if status:
+        logger.error(error)
+    elif not raw_output:
+        sys.stdout.write("\n")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
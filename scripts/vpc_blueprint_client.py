@@ -0,0 +1,124 @@
+import json
+import os
+import socket
+import sys
+
+
+def socket_path():
+    """
+    Return the Unix socket path shared by the server and the client.
+
+    :return: $VPC_BLUEPRINT_SOCKET, or a per-user socket in the runtime directory.
+    """
+    path = os.environ.get("VPC_BLUEPRINT_SOCKET")
+    if path:
+        return path
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or "/tmp"
+    return os.path.join(runtime_dir, f"vpc-blueprint-{os.getuid()}.sock")
+
+
+def _check_owner(path, conn):
+    """
+    Make sure the socket and the server behind it belong to the current user.
+
+    The default socket path in /tmp is predictable, so another local user could
+    bind it first and answer queries with forged plans.
+
+    :param path: Unix socket path of the server.
+    :param conn: Socket connected to the server.
+    :raises OSError: If the socket or the server process belongs to another user.
+    """
+    uid = os.getuid()
+    if os.stat(path).st_uid != uid:
+        raise OSError(f"Socket {path} is owned by another user")
+    if hasattr(socket, "SO_PEERCRED"):
+        import struct
+
+        credentials = conn.getsockopt(
+            socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+        )
+        _, peer_uid, _ = struct.unpack("3i", credentials)
+        if peer_uid != uid:
+            raise OSError(f"Server on {path} runs as another user")
+
+
+def _header():
+    """
+    Describe the client to the server.
+
+    Requests are answered in the client's environment and working directory
+    rather than the server's, as in-process execution would.
+
+    :return: One JSON line with the working directory and $VPC_BLUEPRINT_*
+        variables.
+    """
+    environ = {
+        name: value
+        for name, value in os.environ.items()
+        if name.startswith("VPC_BLUEPRINT_")
+    }
+    return json.dumps({"cwd": os.getcwd(), "environ": environ}).encode() + b"\n"
+
+
+def request(data, path):
+    """
+    Forward a raw query to the server and return its answer.
+
+    Nothing is sent unless the socket and the server process belong to the
+    current user. The server applies the client's working directory and
+    $VPC_BLUEPRINT_* variables to the request, as in-process execution would.
+
+    :param data: Raw query bytes as read from stdin.
+    :param path: Unix socket path of the server.
+    :return: Tuple of (exit status, response bytes).
+    :raises OSError: If the server is not running or belongs to another user.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.connect(path)
+        _check_owner(path, conn)
+        conn.sendall(_header() + data)
+        conn.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = conn.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    response = b"".join(chunks)
+    if not response:
+        raise OSError("Server closed the connection without a response")
+    return int(response[:1]), response[1:]
+
+
+def run_in_process(data):
+    """
+    Answer a query without the server, as scripts/vpc_blueprint.py would.
+
+    :param data: Raw query bytes as read from stdin.
+    :return: Tuple of (exit status, response bytes).
+    """
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+    import io
+
+    from scripts.vpc_blueprint import handle_request
+
+    response = io.StringIO()
+    status, error = handle_request(data.decode(), response)
+    return status, (error if status else response.getvalue()).encode()
+
+
+def main():
+    data = sys.stdin.buffer.read()
+    try:
+        status, body = request(data, socket_path())
+    except OSError:
+        status, body = run_in_process(data)
+    if status:
+        sys.stderr.buffer.write(body + b"\n")
+    else:
+        sys.stdout.buffer.write(body + b"\n")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+import base64
+import json
+import os
+import sys
+
+import pytest
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts.address_pool import assign_vpc_cidrs, find_overlaps
+from scripts.vpc_blueprint import build_encoder
+
+
+def cidrs(vpcs):
+    return [vpc["vpc_cidr"] for vpc in vpcs]
+
+
+def test_assign_by_vpc_id_slot():
+    """Test that each VPC gets the start of the slot of its ID."""
+    vpcs = [
+        {"vpc_id": 3, "vpc_subnets": 4},
+        {"vpc_id": 1, "vpc_prefix": "/16"},
+        {"vpc_id": 2, "vpc_cidr": "172.16.0.0/16"},
+        {"vpc_id": 0, "vpc_prefix": 20},
+    ]
+    placed = assign_vpc_cidrs(vpcs, ["10.0.0.0/8"])
+
+    assert cidrs(placed) == [
+        "10.3.0.0/22",
+        "10.1.0.0/16",
+        "172.16.0.0/16",
+        "10.0.0.0/20",
+    ]
+    assert placed[2] is vpcs[2]
+    assert "vpc_cidr" not in vpcs[0]
+    assert cidrs(assign_vpc_cidrs(vpcs[::3], ["10.0.0.0/16"], newbits=4)) == [
+        "10.0.48.0/22",
+        "10.0.0.0/20",
+    ]
+
+
+def test_other_vpcs_keep_their_cidrs():
+    """Test that removing, resizing or adding a VPC does not move the others."""
+    vpcs = [{"vpc_id": i, "vpc_prefix": 22} for i in range(1, 5)]
+    before = cidrs(assign_vpc_cidrs(vpcs, ["10.0.0.0/16"], newbits=6))
+    assert before == ["10.0.4.0/22", "10.0.8.0/22", "10.0.12.0/22", "10.0.16.0/22"]
+
+    removed = cidrs(assign_vpc_cidrs(vpcs[:1] + vpcs[2:], ["10.0.0.0/16"], 6))
+    assert removed == before[:1] + before[2:]
+
+    resized = [dict(vpcs[1], vpc_prefix=23)] + vpcs[:1] + vpcs[2:]
+    resized = cidrs(assign_vpc_cidrs(resized, ["10.0.0.0/16"], 6))
+    assert resized == ["10.0.8.0/23"] + before[:1] + before[2:]
+
+    added = [{"vpc_id": 0, "vpc_prefix": 22}] + vpcs
+    assert cidrs(assign_vpc_cidrs(added, ["10.0.0.0/16"], 6))[1:] == before
+
+
+def test_later_pools_and_ipv6():
+    """Test that a VPC that outgrows its slot goes to the next pool."""
+    vpcs = [{"vpc_id": 1, "vpc_prefix": 24}, {"vpc_id": 2, "vpc_subnets": 256}]
+    placed = assign_vpc_cidrs(vpcs, ["10.0.0.0/16", "fd00::/48"])
+
+    assert cidrs(placed) == ["10.0.1.0/24", "fd00:0:0:200::/56"]
+
+
+def test_assignment_errors():
+    """Test that missing slots, overlaps and missing sizes are reported."""
+    with pytest.raises(
+        ValueError, match=r"No VPC pool has a slot for VPC 2 \(/23 in /24\)"
+    ):
+        assign_vpc_cidrs([{"vpc_id": 2, "vpc_prefix": 23}], ["10.0.0.0/16"])
+    with pytest.raises(ValueError, match=r"slot for VPC 256 \(ID out of range\)"):
+        assign_vpc_cidrs([{"vpc_id": 256, "vpc_prefix": 24}], ["10.0.0.0/8"])
+    with pytest.raises(ValueError, match=r"VPCs overlap: 1 \(10.1.0.0/16\) and 2"):
+        assign_vpc_cidrs(
+            [
+                {"vpc_id": 1, "vpc_prefix": 16},
+                {"vpc_id": 2, "vpc_cidr": "10.1.128.0/24"},
+            ],
+            ["10.0.0.0/8"],
+        )
+    with pytest.raises(ValueError, match="VPC pools overlap"):
+        assign_vpc_cidrs([], ["10.0.0.0/8", "10.1.0.0/16"])
+    with pytest.raises(ValueError, match="needs a vpc_cidr, a vpc_prefix"):
+        assign_vpc_cidrs([{"vpc_id": 1}], ["10.0.0.0/8"])
+    with pytest.raises(ValueError, match="needs a non-negative integer vpc_id"):
+        assign_vpc_cidrs([{"vpc_id": "a", "vpc_prefix": 24}], ["10.0.0.0/8"])
+    with pytest.raises(ValueError, match="Invalid VPC pool newbits"):
+        assign_vpc_cidrs([], ["10.0.0.0/8"], newbits=-1)
+
+
+def test_find_overlaps():
+    """Test that every overlapped block is paired with the one covering it."""
+    blocks = [(4, 0, 99), (4, 10, 20), (4, 50, 60), (4, 100, 110), (6, 0, 99)]
+    assert find_overlaps(blocks) == [(0, 1), (0, 2)]
+
+
+def test_pool_query():
+    """Test that a query with vpc_pools returns each VPC's assigned CIDR."""
+    vpc = {
+        "vpc_id": 1,
+        "vpc_cidr": "",
+        "vpc_name": "Test VPC",
+        "vpc_subnets": 2,
+        "settings": {"vlan_range": "1-2"},
+    }
+    query = {
+        "vpcs": json.dumps([vpc, dict(vpc, vpc_id=2)]),
+        "vpc_pools": '["10.8.0.0/16"]',
+        "vpc_pool_newbits": "7",
+        "vpc_prefixes": '{"2": 24}',
+    }
+    config = json.loads(base64.b64decode(build_encoder(query).encode_data()))["config"]
+
+    assert config["1"]["vpc_cidr"] == "10.8.2.0/23"
+    assert [subnet["cidr"] for subnet in config["1"]["subnets"]] == [
+        "10.8.2.0/24",
+        "10.8.3.0/24",
+    ]
+    assert config["2"]["vpc_cidr"] == "10.8.4.0/24"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
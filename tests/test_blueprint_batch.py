@@ -0,0 +1,93 @@
+import io
+import json
+import os
+import sys
+
+import pytest
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts import vpc_blueprint
+from scripts.blueprint_batch import iter_records, main, run_batch
+
+
+def vpc(vpc_id, subnets=2):
+    return {
+        "vpc_id": vpc_id,
+        "vpc_cidr": f"10.{vpc_id}.0.0/24",
+        "vpc_name": f"VPC {vpc_id}",
+        "vpc_subnets": subnets,
+        "settings": {"vlan_range": f"1-{subnets}"},
+    }
+
+
+@pytest.fixture
+def records_file(tmp_path):
+    """Write a JSONL file of five VPCs with a blank line in the middle."""
+    path = tmp_path / "vpcs.jsonl"
+    lines = [json.dumps(vpc(i)) for i in range(1, 6)]
+    path.write_text("\n".join(lines[:2] + [""] + lines[2:]) + "\n")
+    return str(path)
+
+
+def test_iter_records_skips_blank_lines(records_file):
+    """Test that blank lines are skipped and sources keep their line numbers."""
+    sources = [source for source, _ in iter_records([records_file])]
+    assert sources == [f"{records_file}:{n}" for n in (1, 2, 4, 5, 6)]
+
+
+def test_iter_records_reads_stdin(monkeypatch):
+    """Test that "-" reads records from standard input."""
+    monkeypatch.setattr(sys, "stdin", io.StringIO(json.dumps(vpc(1)) + "\n"))
+    assert [source for source, _ in iter_records(["-"])] == ["-:1"]
+
+
+def test_run_batch_preserves_order(records_file):
+    """Test that results are written in input order and match generate_subnets."""
+    out = io.StringIO()
+    written, failed = run_batch(
+        iter_records([records_file]), out, (False, True, None, "rows")
+    )
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert (written, failed) == (5, 0)
+    assert [result["vpc_id"] for result in results] == [1, 2, 3, 4, 5]
+    expected = vpc_blueprint.VpcGenerator(vpc(3), deterministic=True)
+    assert results[2]["subnets"] == expected.generate_subnets()
+
+
+def test_run_batch_parallel_matches_serial(records_file):
+    """Test that worker processes produce the same output as a serial run."""
+    options = (False, True, "cidr,vlan_id", "columns")
+    serial, parallel = io.StringIO(), io.StringIO()
+    run_batch(iter_records([records_file]), serial, options)
+    run_batch(iter_records([records_file]), parallel, options, jobs=2)
+    assert parallel.getvalue() == serial.getvalue()
+    assert json.loads(serial.getvalue().splitlines()[0])["subnets"]["cidr"] == [
+        "10.1.0.0/25",
+        "10.1.0.128/25",
+    ]
+
+
+def test_failed_record_is_reported(tmp_path, capsys):
+    """Test that a bad record yields an error line and exit status 1."""
+    path = tmp_path / "vpcs.jsonl"
+    path.write_text(
+        "\n".join([json.dumps(vpc(1)), "{not json", json.dumps(vpc(2, 300))]) + "\n"
+    )
+    output = tmp_path / "out.jsonl"
+    assert main([str(path), "-o", str(output), "--deterministic"]) == 1
+    results = [json.loads(line) for line in output.read_text().splitlines()]
+    assert results[0]["vpc_id"] == 1
+    assert results[1]["source"] == f"{path}:2"
+    assert "error" in results[1] and "error" in results[2]
+
+
+def test_batch_dispatch(records_file, capsys):
+    """Test that vpc_blueprint --batch runs the batch command."""
+    assert vpc_blueprint.main(["--batch", records_file]) == 0
+    assert len(capsys.readouterr().out.splitlines()) == 5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
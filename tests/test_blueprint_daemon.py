@@ -0,0 +1,148 @@
+import json
+import os
+import socket
+import sys
+import threading
+
+import pytest
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts import vpc_blueprint_client
+from scripts.blueprint_daemon import BlueprintServer
+
+QUERY = json.dumps(
+    {
+        "vpcs": json.dumps(
+            [
+                {
+                    "vpc_id": 1,
+                    "vpc_cidr": "10.0.0.0/24",
+                    "vpc_name": "Test VPC",
+                    "vpc_subnets": 2,
+                    "settings": {"vlan_range": "1-2"},
+                }
+            ]
+        ),
+        "deterministic": "true",
+    }
+).encode()
+
+
+@pytest.fixture
+def server(tmp_path):
+    """Run a server on a temporary socket for the duration of a test."""
+    path = str(tmp_path / "blueprint.sock")
+    server = BlueprintServer(path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield path
+    server.shutdown()
+    server.server_close()
+
+
+def test_request_matches_in_process(server):
+    """Test that the server answers exactly like in-process execution."""
+    status, body = vpc_blueprint_client.request(QUERY, server)
+    assert status == 0
+    assert (status, body) == vpc_blueprint_client.run_in_process(QUERY)
+    assert "output" in json.loads(body)
+
+
+def test_request_error(server):
+    """Test that errors are relayed with a non-zero status."""
+    status, body = vpc_blueprint_client.request(b"{invalid", server)
+    assert status == 1
+    assert b"Failed to decode JSON input" in body
+
+
+def test_request_uses_client_environment(server, tmp_path, monkeypatch):
+    """Test that the client's directory and variables apply, not the server's."""
+    client_dir = tmp_path / "client"
+    client_dir.mkdir()
+    monkeypatch.chdir(client_dir)
+    monkeypatch.setenv("VPC_BLUEPRINT_CACHE_DIR", "cache")
+    monkeypatch.setenv("VPC_BLUEPRINT_TRACE", "trace.jsonl")
+    header = vpc_blueprint_client._header()
+    # The server shares this process, so make its own settings differ.
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("VPC_BLUEPRINT_CACHE_DIR")
+    monkeypatch.delenv("VPC_BLUEPRINT_TRACE")
+    monkeypatch.setattr(vpc_blueprint_client, "_header", lambda: header)
+
+    status, _ = vpc_blueprint_client.request(QUERY, server)
+    assert status == 0
+    assert os.listdir(client_dir / "cache")
+    assert len((client_dir / "trace.jsonl").read_text().splitlines()) == 1
+    assert not (tmp_path / "cache").exists()
+
+
+def test_request_with_invalid_header(server):
+    """Test that a request without a valid client header is refused."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.connect(server)
+        conn.sendall(b"{}\n" + QUERY)
+        conn.shutdown(socket.SHUT_WR)
+        response = conn.makefile("rb").read()
+    assert response.startswith(b"1Invalid request header")
+
+
+def test_disconnected_clients_are_ignored(tmp_path, monkeypatch, capsys, caplog):
+    """Test that clients leaving early neither log errors nor raise tracebacks."""
+    server = BlueprintServer(str(tmp_path / "blueprint.sock"))
+    handled = threading.Semaphore(0)
+    shutdown_request = server.shutdown_request
+
+    def count_handled(request):
+        shutdown_request(request)
+        handled.release()
+
+    monkeypatch.setattr(server, "shutdown_request", count_handled)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        for data in (b"", vpc_blueprint_client._header() + QUERY):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+                conn.connect(server.server_address)
+                conn.sendall(data)
+                conn.shutdown(socket.SHUT_WR)
+            assert handled.acquire(timeout=10)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert "Traceback" not in capsys.readouterr().err
+    assert not [record for record in caplog.records if record.levelname == "ERROR"]
+
+
+def test_request_without_server(tmp_path):
+    """Test that the client reports a missing server as OSError."""
+    with pytest.raises(OSError):
+        vpc_blueprint_client.request(QUERY, str(tmp_path / "missing.sock"))
+
+
+def test_request_refuses_server_of_another_user(server, monkeypatch):
+    """Test that nothing is sent to a socket owned by a different user."""
+    uid = os.getuid()
+    monkeypatch.setattr(os, "getuid", lambda: uid + 1)
+    with pytest.raises(OSError, match="another user"):
+        vpc_blueprint_client.request(QUERY, server)
+
+
+def test_stale_socket_is_replaced(tmp_path):
+    """Test that a socket left behind by a dead server does not block startup."""
+    path = tmp_path / "blueprint.sock"
+    path.touch()
+    server = BlueprintServer(str(path))
+    server.server_close()
+    assert not path.exists()
+
+
+def test_socket_path(monkeypatch):
+    """Test the socket path override."""
+    monkeypatch.setenv("VPC_BLUEPRINT_SOCKET", "/run/custom.sock")
+    assert vpc_blueprint_client.socket_path() == "/run/custom.sock"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,68 @@
+import ipaddress
+import os
+import sys
+
+import pytest
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts.buddy_allocator import BuddyAllocator, allocate_blocks
+
+
+def cidrs(addresses, prefixes):
+    return [
+        str(ipaddress.ip_network((address, prefixlen)))
+        for address, prefixlen in zip(addresses, prefixes)
+    ]
+
+
+def test_allocate_lowest_address_first():
+    """Test that blocks are split off at the lowest free address."""
+    allocator = BuddyAllocator(ipaddress.ip_network("10.0.0.0/24"))
+    first = allocator.allocate(26)
+    second = allocator.allocate(25)
+    third = allocator.allocate(26)
+    assert cidrs([first, second, third], [26, 25, 26]) == [
+        "10.0.0.0/26",
+        "10.0.0.128/25",
+        "10.0.0.64/26",
+    ]
+    with pytest.raises(ValueError, match="No free /26 block"):
+        allocator.allocate(26)
+
+
+def test_free_merges_buddies():
+    """Test that freeing both halves makes the whole block available again."""
+    allocator = BuddyAllocator(ipaddress.ip_network("10.0.0.0/24"))
+    low = allocator.allocate(25)
+    high = allocator.allocate(25)
+    allocator.free(low, 25)
+    allocator.free(high, 25)
+    assert allocator.allocate(24) == int(ipaddress.IPv4Address("10.0.0.0"))
+
+
+def test_allocate_blocks_largest_first():
+    """Test mixed sizes are placed largest first and returned in request order."""
+    network = ipaddress.ip_network("10.0.0.0/16")
+    prefixes = [26, 20] + [26] * 19 + [24]
+    addresses = allocate_blocks(network, prefixes)
+    placed = cidrs(addresses, prefixes)
+
+    assert placed[1] == "10.0.0.0/20"
+    assert placed[-1] == "10.0.16.0/24"
+    assert placed[0] == "10.0.17.0/26"
+    assert placed[2] == "10.0.17.64/26"
+    assert len(set(placed)) == len(placed)
+
+
+def test_allocate_blocks_exact_fit_and_overflow():
+    """Test that blocks fit exactly when their total size does."""
+    network = ipaddress.ip_network("10.0.0.0/24")
+    assert len(allocate_blocks(network, [25, 26, 27, 28, 29, 30, 30])) == 7
+    with pytest.raises(ValueError, match="need 260 addresses but 10.0.0.0/24"):
+        allocate_blocks(network, [25, 26, 27, 28, 29, 29, 30])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,124 @@
+import io
+import json
+import logging
+import os
+import sys
+import threading
+
+import pytest
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts import diagnostics, vpc_blueprint
+from scripts.vpc_blueprint import VpcGenerator
+
+VPC = {
+    "vpc_id": 1,
+    "vpc_cidr": "10.0.0.0/22",
+    "vpc_name": "Test VPC",
+    "vpc_subnets": 64,
+    "settings": {"domain": "lan", "vlan_range": None},
+    "template": {"name": "{vpc_name}.{settings_domian}", "domain": "{settings_domain}"},
+}
+
+
+@pytest.fixture(autouse=True)
+def reset():
+    """Start and end every test with no recorded problems and strict mode off."""
+    diagnostics.configure(False)
+    diagnostics.collect()
+    yield
+    diagnostics.configure(False)
+    diagnostics.collect()
+
+
+def test_unresolved_placeholders_are_counted_once_per_template(caplog):
+    """Test that a typo is recorded once with a count instead of logged per subnet."""
+    with caplog.at_level(logging.WARNING):
+        subnets = VpcGenerator(VPC).generate_subnets()
+    assert subnets[0]["name"] == "Test VPC.{settings_domian}"
+    assert caplog.records == []
+    assert diagnostics.collect() == {("unresolved", 1, "name", "settings_domian"): 64}
+
+
+def test_template_errors_are_counted():
+    """Test that a template failing to render is kept and recorded."""
+
+    class Unprintable:
+        def __str__(self):
+            raise RuntimeError("boom")
+
+    settings = {"zone": Unprintable(), "vlan_range": None}
+    vpc = dict(VPC, template={"name": "{settings_zone}"}, settings=settings)
+    subnets = VpcGenerator(vpc).generate_subnets()
+    assert subnets[0]["name"] == "{settings_zone}"
+    assert diagnostics.collect() == {("error", 1, "name", "RuntimeError: boom"): 64}
+
+
+def test_strict_mode_fails_on_first_problem():
+    """Test that strict mode raises instead of collecting."""
+    diagnostics.configure(True)
+    with pytest.raises(ValueError, match=r"\{settings_domian\} in template 'name'"):
+        VpcGenerator(VPC).generate_subnets()
+    assert diagnostics.collect() == {}
+
+
+def test_summary_lists_most_frequent_first():
+    """Test that the summary is ordered by count and truncated."""
+    diagnostics.unresolved(1, "name", "a")
+    diagnostics.merge({("unresolved", 2, "domain", "b"): 10})
+    for i in range(diagnostics.MAX_REPORTED):
+        diagnostics.unresolved(3, None, f"p{i}")
+
+    lines = diagnostics.summary(diagnostics.collect()).splitlines()
+    assert lines[0].startswith(f"{diagnostics.MAX_REPORTED + 2} template problem(s)")
+    assert lines[1] == "  template 'domain' of VPC 2: unresolved placeholder {b} (x10)"
+    assert lines[-1] == "  ... and 2 more"
+    assert diagnostics.summary({}) is None
+
+
+def test_request_logs_one_summary(caplog):
+    """Test that a request logs one warning, or fails in strict mode."""
+    query = {"vpcs": json.dumps([VPC]), "deterministic": "true"}
+    with caplog.at_level(logging.WARNING):
+        status, _ = vpc_blueprint.handle_request(json.dumps(query), io.StringIO())
+    assert status == 0
+    assert len(caplog.records) == 1
+    assert "{settings_domian} (x64)" in caplog.records[0].getMessage()
+
+    query["strict"] = "true"
+    status, error = vpc_blueprint.handle_request(json.dumps(query), io.StringIO())
+    assert status == 1
+    assert "Unresolved placeholder {settings_domian}" in error
+
+
+def test_concurrent_requests_keep_their_own_problems():
+    """Test that strict mode and problems of one thread do not reach another."""
+    diagnostics.unresolved(1, "name", "main")
+    started, checked = threading.Event(), threading.Event()
+    seen = {}
+
+    def strict_request():
+        diagnostics.begin()
+        diagnostics.configure(True)
+        started.set()
+        checked.wait(5)
+        with pytest.raises(ValueError):
+            diagnostics.unresolved(2, "name", "other")
+        seen["entries"] = diagnostics.collect()
+
+    thread = threading.Thread(target=strict_request)
+    thread.start()
+    started.wait(5)
+    assert not diagnostics.is_strict()
+    diagnostics.unresolved(1, "name", "main")
+    checked.set()
+    thread.join()
+
+    assert seen["entries"] == {}
+    assert diagnostics.collect() == {("unresolved", 1, "name", "main"): 2}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,74 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Cumulative import time budget for scripts.vpc_blueprint, as a multiple of the
+# time to import json measured alongside it. A loaded machine slows both alike,
+# while the absolute time varies by half on the same machine.
+IMPORT_BUDGET = float(os.environ.get("VPC_BLUEPRINT_IMPORT_BUDGET", "4.0"))
+
+# Modules that only some code paths need and must not be imported at startup.
+LAZY_MODULES = {
+    "argparse",
+    "base64",
+    "concurrent.futures",
+    "datetime",
+    "hashlib",
+    "heapq",
+    "ipaddress",
+    "logging",
+    "numpy",
+    "socketserver",
+    "tempfile",
+    "uuid",
+    "scripts.diagnostics",
+    "scripts.incremental_state",
+    "scripts.placeholder_processor",
+    "scripts.subnet_record",
+    "scripts.vlan_set",
+}
+
+
+def import_times(module):
+    """Run `python -X importtime` and return {module: cumulative microseconds}."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_no_lazy_modules_at_startup():
+    """Test that importing the entry point does not pull in path-specific modules."""
+    times = import_times("scripts.vpc_blueprint")
+    assert "scripts.vpc_blueprint" in times
+    assert LAZY_MODULES.isdisjoint(times), LAZY_MODULES & set(times)
+
+
+def test_import_time_budget():
+    """Test that importing the entry point stays within the startup budget."""
+    entry, reference = [], []
+    for _ in range(5):
+        entry.append(import_times("scripts.vpc_blueprint")["scripts.vpc_blueprint"])
+        reference.append(import_times("json")["json"])
+    ratio = min(entry) / min(reference)
+    assert (
+        ratio <= IMPORT_BUDGET
+    ), f"import took {min(entry)}us, {ratio:.2f}x json (budget {IMPORT_BUDGET}x)"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,126 @@
+import base64
+import glob
+import json
+import os
+import sys
+import time
+
+import pytest
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts import vpc_blueprint
+from scripts.incremental_state import IncrementalState
+from scripts.terraform_data_external import RawJSON
+
+
+def make_vpc(vpc_id, subnets=2):
+    return {
+        "vpc_id": vpc_id,
+        "vpc_cidr": f"10.{vpc_id}.0.0/16",
+        "vpc_name": f"VPC {vpc_id}",
+        "vpc_subnets": subnets,
+        "settings": {"vlan_range": "1-8"},
+    }
+
+
+def test_fingerprint_is_canonical(tmp_path):
+    """Test that fingerprints ignore key order and include the options."""
+    state = IncrementalState(str(tmp_path), [False, True])
+    vpc = make_vpc(1)
+    reordered = dict(reversed(list(vpc.items())))
+    assert state.fingerprint(vpc) == state.fingerprint(reordered)
+    assert state.fingerprint(vpc) != state.fingerprint(make_vpc(1, subnets=3))
+
+    other = IncrementalState(str(tmp_path), [True, True])
+    assert state.fingerprint(vpc) != other.fingerprint(vpc)
+
+
+def test_record_and_lookup(tmp_path):
+    """Test that recorded results come back as the encoder's JSON text."""
+    state = IncrementalState(str(tmp_path), [], sort_keys=True)
+    assert state.lookup("missing") is None
+
+    state.record("abc", [{"b": 1, "a": None}])
+    stored = state.lookup("abc")
+    assert isinstance(stored, RawJSON)
+    assert stored == '[{"a": null, "b": 1}]'
+
+
+def test_only_changed_vpcs_are_regenerated(tmp_path, monkeypatch):
+    """Test that unchanged VPCs are spliced in from the state directory."""
+    directory = str(tmp_path / "state")
+    vpcs = [make_vpc(1), make_vpc(2), make_vpc(3)]
+
+    state = IncrementalState(directory, [False, True])
+    first = vpc_blueprint.generate_incremental(vpcs, state, deterministic=True)
+    assert first == vpc_blueprint.generate_all(vpcs, deterministic=True)
+
+    generated = []
+    generate_all = vpc_blueprint.generate_all
+
+    def counting_generate_all(vpcs, *args):
+        generated.extend(vpc["vpc_id"] for vpc in vpcs)
+        return generate_all(vpcs, *args)
+
+    monkeypatch.setattr(vpc_blueprint, "generate_all", counting_generate_all)
+    vpcs[1] = make_vpc(2, subnets=4)
+    state = IncrementalState(directory, [False, True])
+    second = vpc_blueprint.generate_incremental(vpcs, state, deterministic=True)
+
+    assert generated == [2]
+    assert json.loads(second[0]) == first[0]
+    assert json.loads(second[2]) == first[2]
+    assert len(second[1]) == 4
+
+    # The old result of VPC 2 is kept until it ages out.
+    assert len(glob.glob(os.path.join(directory, "*.json"))) == 4
+
+
+def test_prune_by_age_keeps_shared_entries(tmp_path):
+    """Test that runs sharing a directory only prune entries nobody used recently."""
+    directory = str(tmp_path)
+    first = IncrementalState(directory, [False], max_age=60)
+    second = IncrementalState(directory, [True], max_age=60)
+    first.record("first", [1])
+    second.record("second", [2])
+    first.record("stale", [3])
+    past = time.time() - 120
+    os.utime(tmp_path / "stale.json", (past, past))
+    os.utime(tmp_path / "first.json", (past, past))
+
+    assert first.lookup("first") == "[1]"  # A lookup marks the entry as used
+    second.prune()
+    assert first.lookup("first") == "[1]"
+    assert second.lookup("second") == "[2]"
+    assert not (tmp_path / "stale.json").exists()
+    assert (
+        IncrementalState.from_query(
+            {"state_dir": directory, "state_max_age": "5"}, []
+        ).max_age
+        == 5
+    )
+
+
+def test_run_with_state_dir(tmp_path):
+    """Test that reused results decode to the same configuration."""
+    query = {
+        "vpcs": json.dumps([make_vpc(1), make_vpc(2)]),
+        "ubiquity_unifi": "false",
+        "deterministic": "true",
+        "source_mode": "omit",
+    }
+
+    def decoded_config():
+        encoded = vpc_blueprint.build_encoder(query).encode_data()
+        return json.loads(base64.b64decode(encoded))["config"]
+
+    expected = decoded_config()
+    query["state_dir"] = str(tmp_path / "state")
+    assert decoded_config() == expected
+    assert decoded_config() == expected
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
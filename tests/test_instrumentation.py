@@ -0,0 +1,121 @@
+import io
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts import instrumentation, vpc_blueprint
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    instrumentation.configure(str(path))
+    instrumentation.collect()
+    yield path
+    instrumentation.configure(None)
+    instrumentation.collect()
+
+
+def test_disabled_records_nothing():
+    """Test that a disabled trace hands out a no-op stage and ignores counters."""
+    instrumentation.configure(None)
+    assert instrumentation.stage("a") is instrumentation.stage("b")
+    with instrumentation.stage("a"):
+        instrumentation.count("things", 3)
+    assert instrumentation.collect() == {"stages": {}, "counters": {}}
+
+
+def test_stages_and_counters(trace_file):
+    """Test that stages and counters accumulate until collected."""
+    for _ in range(2):
+        with instrumentation.stage("outer"):
+            with instrumentation.stage("inner"):
+                instrumentation.count("things", 2)
+    instrumentation.merge(
+        {"stages": {"inner": {"calls": 3, "seconds": 1.0}}, "counters": {"things": 1}}
+    )
+
+    trace = instrumentation.collect()
+    assert trace["stages"]["outer"]["calls"] == 2
+    assert trace["stages"]["inner"]["calls"] == 5
+    assert trace["stages"]["inner"]["seconds"] >= 1.0
+    assert trace["counters"] == {"things": 5}
+    assert instrumentation.collect() == {"stages": {}, "counters": {}}
+
+
+def test_handle_request_writes_trace(trace_file):
+    """Test that a request appends one trace line with its stages and counters."""
+    vpcs = [
+        {
+            "vpc_id": 1,
+            "vpc_cidr": "10.0.0.0/24",
+            "vpc_name": "Test VPC",
+            "vpc_subnets": 4,
+            "settings": {"vlan_range": "1-4"},
+            "template": {"name": "{vpc_name} {count_index} {missing}"},
+        }
+    ]
+    raw = json.dumps({"vpcs": json.dumps(vpcs)})
+    for _ in range(2):
+        assert vpc_blueprint.handle_request(raw, io.StringIO()) == (0, None)
+
+    lines = trace_file.read_text().splitlines()
+    assert len(lines) == 2
+    trace = json.loads(lines[0])
+    assert {"decode_input", "request", "generate_subnets", "carve"} <= set(
+        trace["stages"]
+    )
+    assert {"render_templates", "encode"} <= set(trace["stages"])
+    counters = trace["counters"]
+    assert counters["vpcs"] == 1
+    assert counters["subnets"] == 4
+    assert counters["placeholders_resolved"] == 8
+    assert counters["placeholders_missed"] == 4
+    assert counters["bytes_encoded"] > 0
+
+
+def test_pool_workers_report_back(trace_file, monkeypatch):
+    """Test that traces recorded in worker processes reach the parent."""
+    monkeypatch.setattr(vpc_blueprint, "PARALLEL_MIN_SUBNETS", 0)
+    vpcs = [
+        {
+            "vpc_id": i,
+            "vpc_cidr": f"10.{i}.0.0/24",
+            "vpc_name": f"VPC {i}",
+            "vpc_subnets": 2,
+            "settings": {"vlan_range": "1-2"},
+        }
+        for i in range(3)
+    ]
+    vpc_blueprint.generate_all(vpcs, workers=2)
+    assert instrumentation.collect()["counters"]["subnets"] == 6
+
+
+def test_concurrent_requests_keep_their_own_trace(trace_file):
+    """Test that stages and counters of one thread do not reach another."""
+    instrumentation.count("things")
+
+    def other_request():
+        instrumentation.begin()
+        with instrumentation.stage("other"):
+            instrumentation.count("things", 5)
+        instrumentation.emit()
+
+    thread = threading.Thread(target=other_request)
+    thread.start()
+    thread.join()
+
+    assert instrumentation.collect() == {"stages": {}, "counters": {"things": 1}}
+    other = json.loads(trace_file.read_text())
+    assert other["counters"] == {"things": 5}
+    assert set(other["stages"]) == {"other"}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
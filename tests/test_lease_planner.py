@@ -0,0 +1,132 @@
+import os
+import sys
+
+import pytest
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts.lease_planner import LeasePlanner, LeasePool, normalize_mac
+from scripts.vpc_blueprint import VpcGenerator
+
+VPC = {
+    "vpc_id": 1,
+    "vpc_cidr": "10.0.0.0/23",
+    "vpc_name": "Test VPC",
+    "vpc_subnets": 2,
+    "settings": {"vlan_range": "1-2"},
+}
+
+
+def mac(i):
+    return f"02:00:00:00:{i >> 8:02x}:{i & 255:02x}"
+
+
+@pytest.fixture
+def planner():
+    """Plan leases in two /24 subnets with 49 static addresses each."""
+    return LeasePlanner(VpcGenerator(VPC).generate_subnets())
+
+
+def test_normalize_mac():
+    """Test that common MAC notations normalize to one form."""
+    assert normalize_mac("AA-BB-CC-DD-EE-FF") == "aa:bb:cc:dd:ee:ff"
+    assert normalize_mac("aabb.ccdd.eeff") == "aa:bb:cc:dd:ee:ff"
+    with pytest.raises(ValueError, match="Invalid MAC address"):
+        normalize_mac("aa:bb:cc:dd:ee:gg")
+
+
+def test_static_band():
+    """Test that the band skips the gateway and the DHCP range."""
+    pool = LeasePool("10.0.0.0/24", "10.0.0.26", "10.0.0.229")
+
+    assert pool.size == 24 + 25
+    assert pool.index(int(pool.address(0))) == 0
+    assert pool.format(pool.address(0)) == "10.0.0.2"
+    assert pool.format(pool.address(23)) == "10.0.0.25"
+    assert pool.format(pool.address(24)) == "10.0.0.230"
+    assert pool.format(pool.address(48)) == "10.0.0.254"
+    for last_octet in (0, 1, 26, 229, 255):
+        assert pool.index(pool.network + last_octet) is None
+
+
+def test_assign_lowest_free_address(planner):
+    """Test that assignment fills the band in order around pinned addresses."""
+    assert planner.pin(mac(0), "10.0.0.3") == "10.0.0.3"
+    assert planner.assign(mac(1), "10.0.0.0/24") == "10.0.0.2"
+    assert planner.assign(mac(2), "10.0.0.0/24") == "10.0.0.4"
+
+    planner.release(mac(1))
+    assert planner.assign(mac(3), "10.0.0.0/24") == "10.0.0.2"
+    assert planner.report()["10.0.0.0/24"] == {"size": 49, "used": 3, "free": 46}
+
+
+def test_pin_collisions(planner):
+    """Test that pinned addresses must be free and static."""
+    planner.pin(mac(0), "10.0.1.2")
+    with pytest.raises(ValueError, match="already assigned"):
+        planner.pin(mac(1), "10.0.1.2")
+    with pytest.raises(ValueError, match="not a static address"):
+        planner.pin(mac(1), "10.0.1.100")
+    with pytest.raises(ValueError, match="not in any subnet"):
+        planner.pin(mac(1), "10.0.2.2")
+    with pytest.raises(ValueError, match="already has a lease"):
+        planner.pin(mac(0), "10.0.1.3")
+
+
+def test_pool_exhausted(planner):
+    """Test that assigning beyond the band reports the exhausted pool."""
+    for i in range(49):
+        planner.assign(mac(i), "10.0.0.0/24")
+    with pytest.raises(ValueError, match="10.0.0.0/24 is exhausted: all 49"):
+        planner.assign(mac(49), "10.0.0.0/24")
+
+
+def test_plan_bulk(planner):
+    """Test that pinned leases are placed before the others."""
+    leases = [{"mac": mac(i), "subnet": "10.0.0.0/24"} for i in range(48)]
+    leases.append({"mac": mac(99), "address": "10.0.0.2"})
+    placed = planner.plan(leases)
+
+    assert placed[mac(99)] == "10.0.0.2"
+    assert placed[mac(0)] == "10.0.0.3"
+    assert placed[mac(47)] == "10.0.0.254"
+    assert planner.report()["10.0.0.0/24"]["free"] == 0
+
+
+def test_plan_reports_every_short_pool(planner):
+    """Test that an oversubscribed plan assigns nothing and names each pool."""
+    leases = [{"mac": mac(i), "subnet": "10.0.0.0/24"} for i in range(50)]
+    leases += [{"mac": mac(100 + i), "subnet": "10.0.1.0/24"} for i in range(49)]
+    leases.append({"mac": mac(200), "address": "10.0.1.254"})
+
+    with pytest.raises(ValueError) as error:
+        planner.plan(leases)
+    assert "10.0.0.0/24 needs 50 addresses but has 49 of 49 free" in str(error.value)
+    assert "10.0.1.0/24 needs 49 addresses but has 48 of 49 free" in str(error.value)
+    assert planner.leases == {}
+
+
+def test_plan_rejects_duplicate_macs(planner):
+    """Test that a MAC address can only get one lease."""
+    with pytest.raises(ValueError, match="more than one lease"):
+        planner.plan(
+            [
+                {"mac": "02:00:00:00:00:01", "subnet": "10.0.0.0/24"},
+                {"mac": "02-00-00-00-00-01", "address": "10.0.1.2"},
+            ]
+        )
+
+
+def test_ipv6_band_is_sparse():
+    """Test that a /64 band is usable without allocating its bitmap."""
+    pool = LeasePool(
+        "fd00::/64", "fd00::1999:9999:9999:999a", "fd00::e666:6666:6666:6665"
+    )
+
+    assert pool.format(pool.allocate()) == "fd00::2"
+    assert pool.words == {0: 1}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -7,6 +7,7 @@ import pytest
 # Add the parent directory to sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+from scripts import placeholder_processor
 from scripts.placeholder_processor import PlaceholderProcessor
 
 
@@ -120,5 +121,99 @@ def test_resolve_template():
     assert resolved["name"] == "Test VPC_1"
 
 
+def test_compile_template_segments():
+    """Test that templates are split into literals and placeholder names."""
+    compiled = placeholder_processor.compile_template("{vpc_name}-{vpc_id}.lan")
+    assert compiled.segments == ("", "vpc_name", "-", "vpc_id", ".lan")
+    assert compiled.placeholders == ("vpc_name", "vpc_id")
+
+
+def test_compile_template_cached():
+    """Test that the compiled form is shared for identical template text."""
+    assert placeholder_processor.compile_template(
+        "{vpc_name}.lan"
+    ) is placeholder_processor.compile_template("{vpc_name}.lan")
+
+
+def test_compiled_template_render():
+    """Test rendering with list cycling and unknown placeholders."""
+    compiled = placeholder_processor.compile_template(
+        "{settings_subdomains}.{missing}.{vpc_id}"
+    )
+    context = {"settings_subdomains": ["a", "b"], "vpc_id": 7}
+    assert compiled.render(context, 0) == "a.{missing}.7"
+    assert compiled.render(context, 3) == "b.{missing}.7"
+    assert (
+        placeholder_processor.compile_template("static").render(context, 0) == "static"
+    )
+
+
+def test_render_templates():
+    """Test batch rendering of template fields for a range of indices."""
+    vpc = {
+        "vpc_id": 1,
+        "vpc_name": "Test VPC",
+        "settings": {"subdomains": ["a", "b"], "limits": [1, 2]},
+        "template": {
+            "domain": "{settings_subdomains}.lan",
+            "name": "{vpc_name} {count_index}",
+        },
+    }
+    processor = PlaceholderProcessor({"vpcs": [vpc]})
+    rendered = processor.render_templates(vpc, 3)
+    assert rendered == [
+        {"domain": "a.lan", "name": "Test VPC 1"},
+        {"domain": "b.lan", "name": "Test VPC 2"},
+        {"domain": "a.lan", "name": "Test VPC 3"},
+    ]
+    assert processor.render_templates(vpc, 1, start=1) == [rendered[1]]
+
+
+def test_lazy_context_resolves_nested_keys():
+    """Test that flattened keys resolve against the nested VPC on demand."""
+    vpc = {
+        "vpc_name": "Test VPC",
+        "settings": {
+            "domain": "lan",
+            "subdomains": ["a", "b"],
+            "zones": [{"name": "z1"}, {"name": "z2"}],
+            "mixed": [{"name": "m1"}, "x", {"name": "m3"}],
+        },
+    }
+    context = placeholder_processor.LazyContext(vpc)
+
+    assert len(context) == 0  # Nothing is copied up front
+    assert context["vpc_name"] == "Test VPC"
+    assert context["settings_domain"] == "lan"
+    assert context["settings_subdomains"] is vpc["settings"]["subdomains"]
+    assert context["settings_zones_1_name"] == "z2"
+    assert context["settings_mixed"] == [{"name": "m1"}, "x", {"name": "m3"}]
+    assert context["settings_mixed_0_name"] == "m1"
+    for key in ("settings", "settings_zones", "settings_mixed_2_name", "missing"):
+        assert key not in context
+    assert context.get("settings_zones_01_name", "-") == "-"
+    assert set(context) == {
+        "vpc_name",
+        "settings_domain",
+        "settings_subdomains",
+        "settings_zones_1_name",
+        "settings_mixed",
+        "settings_mixed_0_name",
+    }
+
+
+def test_lazy_context_ambiguous_keys():
+    """Test that the key written last wins when paths spell the same key."""
+    vpc = {"settings": {"domain": "nested"}, "settings_domain": "flat"}
+    context = placeholder_processor.LazyContext(vpc)
+    assert context["settings_domain"] == "flat"
+
+    vpc = {"settings_domain": "flat", "settings": {"domain": "nested"}}
+    context = placeholder_processor.LazyContext(vpc)
+    context["count_index"] = 3
+    assert context["settings_domain"] == "nested"
+    assert context["count_index"] == 3
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -0,0 +1,82 @@
+import ipaddress
+import os
+import random
+import sys
+
+import pytest
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts.reserved_ranges import ReservedRanges
+
+NETWORK = ipaddress.ip_network("10.0.0.0/16")
+
+
+def block(cidr):
+    network = ipaddress.ip_network(cidr)
+    start = int(network.network_address)
+    return start, start + network.num_addresses - 1
+
+
+def test_lookup_reserved_and_excluded():
+    """Test that a block finds the range it overlaps."""
+    ranges = ReservedRanges(
+        NETWORK,
+        reserved={"10.0.4.0/24": "Printers", "10.0.8.0/22": "Lab"},
+        excluded=["10.0.9.0/24"],
+    )
+    assert ranges.lookup(*block("10.0.4.0/24")) == (False, "Printers")
+    assert ranges.lookup(*block("10.0.4.128/25")) == (False, "Printers")
+    assert ranges.lookup(*block("10.0.0.0/22")) is None
+    assert ranges.lookup(*block("10.0.0.0/21")) == (False, "Printers")
+    # Excluded ranges win over reserved ones they overlap.
+    assert ranges.lookup(*block("10.0.8.0/24")) == (False, "Lab")
+    assert ranges.lookup(*block("10.0.8.0/23")) == (True, None)
+    assert ranges.lookup(*block("10.0.0.0/16")) == (True, None)
+
+
+def test_first_declared_reservation_wins():
+    """Test that overlapping reservations resolve to the first declared."""
+    ranges = ReservedRanges(
+        NETWORK, reserved={"10.0.0.0/16": "Everything", "10.0.1.0/24": "Servers"}
+    )
+    assert ranges.lookup(*block("10.0.1.0/24")) == (False, "Everything")
+
+
+def test_ranges_outside_the_network_are_dropped():
+    """Test that ranges of another network or IP version are ignored."""
+    ranges = ReservedRanges(
+        NETWORK, reserved={"192.168.4.0/24": "VPN", "2001:db8::/64": "v6"}
+    )
+    assert not ranges
+    with pytest.raises(ValueError, match="Invalid reserved range"):
+        ReservedRanges(NETWORK, excluded=["10.0.0.300/24"])
+
+
+def test_lookup_matches_linear_scan():
+    """Test the index against a linear scan over hundreds of ranges."""
+    rng = random.Random(4)
+    reserved = {}
+    for _ in range(300):
+        prefixlen = rng.randint(20, 30)
+        address = NETWORK.network_address + rng.randrange(NETWORK.num_addresses)
+        reserved[str(ipaddress.ip_network((address, prefixlen), strict=False))] = (
+            f"range {len(reserved)}"
+        )
+    excluded = list(reserved)[::7]
+    ranges = ReservedRanges(NETWORK, reserved, excluded)
+
+    candidates = [(True, None, cidr) for cidr in excluded]
+    candidates += [(False, name, cidr) for cidr, name in reserved.items()]
+    for subnet in NETWORK.subnets(new_prefix=24):
+        expected = None
+        for excluded_range, name, cidr in candidates:
+            if ipaddress.ip_network(cidr).overlaps(subnet):
+                expected = (excluded_range, name)
+                break
+        assert ranges.lookup(*block(subnet)) == expected, subnet
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
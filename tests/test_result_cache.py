@@ -0,0 +1,129 @@
+import base64
+import io
+import json
+import os
+import sys
+import time
+
+import pytest
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts import vpc_blueprint
+from scripts.result_cache import ResultCache
+
+
+def test_key_is_canonical(tmp_path):
+    """Test that the key ignores key order and cache control keys."""
+    cache = ResultCache(str(tmp_path))
+    first = cache.key({"vpcs": "[]", "ubiquity_unifi": "false"})
+    second = cache.key(
+        {"ubiquity_unifi": "false", "vpcs": "[]", "cache_dir": str(tmp_path)}
+    )
+    assert first == second
+    assert first != cache.key({"vpcs": "[]", "ubiquity_unifi": "true"})
+
+
+def test_put_and_get(tmp_path):
+    """Test storing and retrieving a document."""
+    cache = ResultCache(str(tmp_path))
+    assert cache.get("missing") is None
+    cache.put("abc", '{"output": "x"}')
+    assert cache.get("abc") == '{"output": "x"}'
+
+
+def test_eviction_by_age(tmp_path):
+    """Test that entries older than max_age are neither returned nor kept."""
+    cache = ResultCache(str(tmp_path), max_age=60)
+    cache.put("old", "{}")
+    past = time.time() - 120
+    os.utime(tmp_path / "old.json", (past, past))
+    assert cache.get("old") is None
+
+    cache.put("new", "{}")
+    assert not (tmp_path / "old.json").exists()
+
+
+def test_eviction_by_size(tmp_path):
+    """Test that least recently used entries are evicted above max_bytes."""
+    cache = ResultCache(str(tmp_path), max_bytes=25)
+    cache.put("first", "x" * 10)
+    past = time.time() - 10
+    os.utime(tmp_path / "first.json", (past, past))
+    cache.put("second", "y" * 10)
+    cache.put("third", "z" * 10)
+    assert cache.get("first") is None
+    assert cache.get("third") == "z" * 10
+
+
+def test_from_query(tmp_path, monkeypatch):
+    """Test that caching is opt-in through the query or environment."""
+    monkeypatch.delenv("VPC_BLUEPRINT_CACHE_DIR", raising=False)
+    assert ResultCache.from_query({"cache_dir": ""}) is None
+    cache = ResultCache.from_query({"cache_dir": str(tmp_path), "cache_max_age": "5"})
+    assert cache.max_age == 5
+    monkeypatch.setenv("VPC_BLUEPRINT_CACHE_DIR", str(tmp_path))
+    assert ResultCache.from_query({}).directory == str(tmp_path)
+
+
+def test_run_cache_hit_skips_generation(tmp_path, monkeypatch):
+    """Test that a cache hit does not regenerate the output."""
+    query = {
+        "vpcs": json.dumps(
+            [
+                {
+                    "vpc_id": 1,
+                    "vpc_cidr": "10.0.0.0/24",
+                    "vpc_name": "Test VPC",
+                    "vpc_subnets": 2,
+                    "settings": {"vlan_range": "1-2"},
+                }
+            ]
+        ),
+        "cache_dir": str(tmp_path),
+    }
+    first = io.StringIO()
+    vpc_blueprint.run(query, first)
+
+    def fail(query):
+        raise AssertionError("output regenerated on a cache hit")
+
+    monkeypatch.setattr(vpc_blueprint, "build_encoder", fail)
+    second = io.StringIO()
+    vpc_blueprint.run(query, second)
+    assert second.getvalue() == first.getvalue()
+
+
+def test_run_entry_larger_than_cache(tmp_path):
+    """Test that a response evicted as soon as it is stored is still written."""
+    query = {
+        "vpcs": json.dumps(
+            [
+                {
+                    "vpc_id": 1,
+                    "vpc_cidr": "10.0.0.0/24",
+                    "vpc_name": "Test VPC",
+                    "vpc_subnets": 2,
+                    "settings": {"vlan_range": "1-2"},
+                }
+            ]
+        ),
+        "deterministic": "true",
+    }
+    uncached = io.StringIO()
+    vpc_blueprint.run(query, uncached)
+
+    stream = io.StringIO()
+    vpc_blueprint.run(
+        dict(query, cache_dir=str(tmp_path), cache_max_bytes="10"), stream
+    )
+    config = lambda out: json.loads(
+        base64.b64decode(json.loads(out.getvalue())["output"])
+    )["config"]
+    assert config(stream) == config(uncached)
+    assert not list(tmp_path.glob("*.json"))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
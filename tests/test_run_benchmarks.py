@@ -0,0 +1,55 @@
+import json
+import os
+import sys
+
+import pytest
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks import run_benchmarks
+
+
+def test_run_small_scale():
+    """Test that every benchmark runs and reports its timings."""
+    results = run_benchmarks.run(scale=0.001, repeat=1)
+    assert set(results["results"]) == {
+        "carve_large_vpc",
+        "generate_large_vpc",
+        "generate_many_vpcs",
+        "render_templates",
+        "encode_large_payload",
+    }
+    for result in results["results"].values():
+        assert result["best"] > 0 and result["relative"] > 0
+
+
+def test_compare_flags_regressions():
+    """Test the comparison against a baseline."""
+
+    def document(scale, **relative):
+        return {
+            "scale": scale,
+            "results": {name: {"relative": value} for name, value in relative.items()},
+        }
+
+    baseline = document(1.0, carve=1.0, encode=2.0, removed=1.0)
+    current = document(1.0, carve=1.2, encode=3.0, added=1.0)
+    assert run_benchmarks.compare(current, baseline, threshold=0.25) == [
+        ("carve", 1.2, False),
+        ("encode", 1.5, True),
+    ]
+    with pytest.raises(ValueError, match="scale"):
+        run_benchmarks.compare(document(0.5), baseline)
+
+
+def test_baseline_covers_every_benchmark():
+    """Test that the checked-in baseline matches the benchmark names."""
+    with open(run_benchmarks.DEFAULT_BASELINE) as f:
+        baseline = json.load(f)
+    assert baseline["scale"] == 1.0
+    assert set(baseline["results"]) == set(run_benchmarks.workloads(0.001))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
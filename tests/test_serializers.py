@@ -0,0 +1,149 @@
+import base64
+import io
+import json
+import os
+import sys
+import zlib
+
+import pytest
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts import vpc_blueprint
+from scripts.serializers import serialize
+from scripts.terraform_data_external import RawJSON, TerraformDataExternal
+
+
+def serialized(document, format, sort_keys=False):
+    chunks = []
+    serialize(document, chunks.append, format, sort_keys)
+    return b"".join(
+        chunk.encode() if isinstance(chunk, str) else chunk for chunk in chunks
+    )
+
+
+def test_msgpack_encoding():
+    """Test MessagePack output against hand-encoded bytes."""
+    document = {"a": [1, -33, None, True, 300, "hi"]}
+    assert serialized(document, "msgpack") == bytes.fromhex(
+        "81 a1 61 96 01 d0 df c0 c3 cd 01 2c a2 68 69"
+    )
+    assert serialized("x" * 32, "msgpack")[:2] == b"\xd9\x20"
+    assert serialized("x" * 256, "msgpack")[:3] == b"\xda\x01\x00"
+    assert serialized(list(range(16)), "msgpack")[:3] == b"\xdc\x00\x10"
+    assert serialized(-(2**40), "msgpack") == b"\xd3" + (-(2**40)).to_bytes(
+        8, "big", signed=True
+    )
+
+
+def test_cbor_encoding():
+    """Test CBOR output against hand-encoded bytes."""
+    document = {"a": [1, -33, None, True, 300, "hi"]}
+    assert serialized(document, "cbor") == bytes.fromhex(
+        "a1 61 61 86 01 38 20 f6 f5 19 01 2c 62 68 69"
+    )
+    assert serialized(1.5, "cbor") == bytes.fromhex("fb 3ff8000000000000")
+    assert serialized("é", "cbor") == bytes.fromhex("62 c3 a9")
+
+
+def test_big_integers():
+    """Test that integers beyond 64 bits, as in IPv6 subnets, are encoded."""
+    assert serialized(2**64, "cbor") == bytes.fromhex("c2 49 01 0000000000000000")
+    assert serialized(-(2**64) - 1, "cbor") == bytes.fromhex(
+        "c3 49 01 0000000000000000"
+    )
+    assert serialized(2**64, "msgpack") == b"\xb4" + b"18446744073709551616"
+
+    vpc = {
+        "vpc_id": 1,
+        "vpc_cidr": "2001:db8::/48",
+        "vpc_name": "IPv6 VPC",
+        "vpc_subnets": 2,
+        "settings": {"vlan_range": "1-2"},
+    }
+    subnets = vpc_blueprint.VpcGenerator(vpc, fields="device_count").generate_subnets()
+    device_count = 2**79 - 2
+    assert subnets[0]["device_count"] == device_count
+    cbor = serialized(subnets, "cbor")
+    assert cbor.count(b"\xc2\x4a" + device_count.to_bytes(10, "big")) == 2
+    msgpack = serialized(subnets, "msgpack")
+    assert msgpack.count(str(device_count).encode()) == 2
+
+
+def test_binary_formats_sort_keys_and_raw_json():
+    """Test that keys are sorted on request and RawJSON is decoded first."""
+    assert serialized({"b": 1, "a": 2}, "msgpack", sort_keys=True) == bytes.fromhex(
+        "82 a1 61 02 a1 62 01"
+    )
+    assert serialized(RawJSON('{"a": 2}'), "cbor") == serialized({"a": 2}, "cbor")
+
+
+def test_unsupported_value():
+    """Test that values without a JSON counterpart are rejected."""
+    with pytest.raises(TypeError, match="not serializable"):
+        serialized({"a": object()}, "cbor")
+
+
+def test_orjson_format():
+    """Test that the orjson backend produces the same document."""
+    pytest.importorskip("orjson")
+    document = {"b": [1, None, RawJSON('{"x": 1}')], "a": "é"}
+    assert json.loads(serialized(document, "orjson", sort_keys=True)) == {
+        "a": "é",
+        "b": [1, None, {"x": 1}],
+    }
+
+
+def test_invalid_format_and_compression():
+    """Test that unknown formats and compressions are rejected."""
+    with pytest.raises(ValueError, match="Invalid format"):
+        TerraformDataExternal(format="xml")
+    with pytest.raises(ValueError, match="Invalid compression"):
+        TerraformDataExternal(compression="lzma")
+
+
+def test_compressed_encoding_round_trips():
+    """Test that zlib output decompresses to the uncompressed document."""
+    encoder = TerraformDataExternal(deterministic=True, compression="zlib")
+    encoder.process_inputs({"vpcs": "[]"})
+    encoder.config = {"1": {"subnets": [{"cidr": "10.0.0.0/24"}] * 100}}
+    plain = TerraformDataExternal(deterministic=True)
+    plain.process_inputs({"vpcs": "[]"})
+    plain.config = encoder.config
+
+    compressed = base64.b64decode(encoder.encode_data())
+    assert zlib.decompress(compressed) == base64.b64decode(plain.encode_data())
+    assert len(compressed) < len(base64.b64decode(plain.encode_data()))
+
+
+def test_raw_output_request():
+    """Test that a query selecting a format can be answered without base64."""
+    query = {
+        "vpcs": json.dumps(
+            [
+                {
+                    "vpc_id": 1,
+                    "vpc_cidr": "10.0.0.0/24",
+                    "vpc_name": "Test VPC",
+                    "vpc_subnets": 2,
+                    "settings": {"vlan_range": "1-2"},
+                }
+            ]
+        ),
+        "deterministic": "true",
+        "compression": "zlib",
+    }
+    raw, encoded = io.BytesIO(), io.StringIO()
+    status, _ = vpc_blueprint.handle_request(
+        json.dumps(query), raw, {"format": "cbor"}, raw_output=True
+    )
+    assert status == 0
+    vpc_blueprint.handle_request(json.dumps(query), encoded, {"format": "cbor"})
+    output = json.loads(encoded.getvalue())["output"]
+    assert base64.b64decode(output) == raw.getvalue()
+    assert zlib.decompress(raw.getvalue())[:1] == b"\xa3"  # Map of three keys
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
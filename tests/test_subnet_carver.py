@@ -0,0 +1,112 @@
+import ipaddress
+import os
+import sys
+
+import pytest
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts import subnet_carver
+from scripts.subnet_carver import SizedSubnetCarver, SubnetCarver, format_ipv4
+
+
+def test_format_ipv4():
+    """Test dotted-quad formatting of integer addresses."""
+    assert format_ipv4(0) == "0.0.0.0"
+    assert format_ipv4(int(ipaddress.IPv4Address("192.168.4.1"))) == "192.168.4.1"
+
+
+def test_carver_counts():
+    """Test the closed-form subnet count and sizes."""
+    carver = SubnetCarver(ipaddress.ip_network("10.0.0.0/24"), 26)
+    assert carver.count == 4
+    assert carver.block_size == 64
+    assert carver.device_count == 62
+    assert carver.static_count == 6
+
+
+def test_carver_columns_match_ipaddress():
+    """Test that carved columns match the ipaddress module."""
+    network = ipaddress.ip_network("10.0.0.0/16")
+    carver = SubnetCarver(network, 20)
+    columns = carver.columns()
+    expected = list(network.subnets(new_prefix=20))
+
+    assert carver.format_networks(columns["network"]) == [str(s) for s in expected]
+    assert carver.format_addresses(columns["gateway"]) == [
+        str(s.network_address + 1) for s in expected
+    ]
+    assert carver.format_addresses(columns["broadcast"]) == [
+        str(s.broadcast_address) for s in expected
+    ]
+    assert carver.format_addresses(columns["dhcp_start"])[0] == "10.0.1.154"
+    assert carver.format_addresses(columns["dhcp_stop"])[0] == "10.0.14.101"
+
+
+def test_carver_partial_range():
+    """Test carving a slice of the split without the subnets before it."""
+    carver = SubnetCarver(ipaddress.ip_network("10.0.0.0/8"), 24)
+    networks = carver.network_ints(256, 258)
+    assert carver.format_networks(networks) == ["10.1.0.0/24", "10.1.1.0/24"]
+
+
+def test_carver_numpy_path(monkeypatch):
+    """Test that the vectorized path formats the same addresses."""
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(subnet_carver, "NUMPY_THRESHOLD", 1)
+    carver = SubnetCarver(ipaddress.ip_network("10.0.0.0/8"), 24)
+    columns = carver.columns(0, 5000)
+    assert not isinstance(columns["network"], range)
+    assert carver.format_networks(columns["network"])[4097] == "10.16.1.0/24"
+    assert carver.format_addresses(columns["gateway"])[4097] == "10.16.1.1"
+
+
+def test_carver_overlaps():
+    """Test integer overlap checks against another network."""
+    carver = SubnetCarver(ipaddress.ip_network("192.168.0.0/16"), 18)
+    reserved = ipaddress.ip_network("192.168.4.0/24")
+    first, second = carver.network_ints(0, 2)
+    assert carver.overlaps(first, reserved)
+    assert not carver.overlaps(second, reserved)
+
+
+def test_carver_invalid_prefix():
+    """Test that carving into a shorter prefix is rejected."""
+    with pytest.raises(ValueError):
+        SubnetCarver(ipaddress.ip_network("10.0.0.0/24"), 16)
+
+
+def test_sized_carver_columns():
+    """Test the columns of individually sized subnets."""
+    network = ipaddress.ip_network("10.0.0.0/16")
+    blocks = [
+        (int(ipaddress.IPv4Address("10.0.16.0")), 24),
+        (int(ipaddress.IPv4Address("10.0.0.0")), 20),
+    ]
+    carver = SizedSubnetCarver(network, blocks)
+    columns = carver.columns()
+
+    assert carver.format_networks(columns["network"]) == [
+        "10.0.16.0/24",
+        "10.0.0.0/20",
+    ]
+    assert columns["device_count"] == [254, 4094]
+    assert carver.format_addresses(columns["dhcp_start"]) == [
+        "10.0.16.26",
+        "10.0.1.154",
+    ]
+    assert carver.format_addresses(columns["dhcp_stop"]) == [
+        "10.0.16.229",
+        "10.0.14.101",
+    ]
+    assert carver.overlaps(blocks[1][0], ipaddress.ip_network("10.0.15.0/24"))
+    assert not carver.overlaps(blocks[0][0], ipaddress.ip_network("10.0.17.0/24"))
+    assert carver.count == 2
+    assert carver.format_address(blocks[0][0]) == "10.0.16.0"
+    assert carver.format_network(blocks[1][0]) == "10.0.0.0/20"
+    assert not hasattr(carver, "block_size")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
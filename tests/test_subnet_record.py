@@ -0,0 +1,100 @@
+import json
+import os
+import pickle
+import sys
+
+import pytest
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts.subnet_record import SubnetRecord
+from scripts.terraform_data_external import dumps
+from scripts.vpc_blueprint import VpcGenerator
+
+VPC = {
+    "vpc_id": 1,
+    "vpc_cidr": "192.168.0.0/16",
+    "vpc_name": 'Test "VPC"',
+    "vpc_subnets": 2048,
+    "settings": {"domain": "lan", "subdomains": ["a", "b"], "vlan_range": None},
+    "template": {"name": "{vpc_name} {settings_subdomains} {count_index}"},
+    "reserved_ranges": {"192.168.8.0/22": "Lab"},
+    "excluded_ranges": ["192.168.16.0/24"],
+}
+
+
+def test_record_is_a_mapping():
+    """Test that a record behaves like the dictionary of its fields."""
+    subnet = VpcGenerator(VPC, deterministic=True).generate_subnets()[1]
+
+    assert isinstance(subnet, SubnetRecord)
+    assert list(subnet) == [
+        "cidr",
+        "device_count",
+        "uuid",
+        "vlan_id",
+        "dhcp_start",
+        "dhcp_stop",
+        "domain",
+        "name",
+        "gateway",
+        "description",
+    ]
+    assert subnet["cidr"] == "192.168.0.32/27"
+    assert subnet["gateway"] == "192.168.0.33"
+    assert subnet["name"] == 'Test "VPC" b 2'
+    assert subnet["domain"] == "subdomain_1.lan"
+    assert subnet == dict(subnet)
+    assert "mtu" not in subnet
+    with pytest.raises(KeyError):
+        subnet["mtu"]
+
+
+def test_reserved_record_fields():
+    """Test that a subnet in a reserved range gets the reserved field values."""
+    subnets = VpcGenerator(VPC, deterministic=True).generate_subnets()
+    lab = next(s for s in subnets if s["cidr"] == "192.168.8.0/27")
+
+    assert list(lab)[4:] == [
+        "name",
+        "dhcp_start",
+        "dhcp_stop",
+        "domain",
+        "gateway",
+        "description",
+    ]
+    assert lab["name"] == "Lab"
+    assert lab["gateway"] is None
+    assert lab["description"] == "Reserved for Lab"
+
+
+@pytest.mark.parametrize("sort_keys", [False, True])
+def test_serialization_matches_json_dumps(sort_keys):
+    """Test that bulk and single serialization equal json.dumps of the dicts."""
+    subnets = VpcGenerator(VPC, deterministic=True).generate_subnets()
+    expected = json.dumps([dict(s) for s in subnets], sort_keys=sort_keys)
+
+    assert dumps(subnets, sort_keys) == expected
+    assert subnets[0].to_json(sort_keys) == json.dumps(
+        dict(subnets[0]), sort_keys=sort_keys
+    )
+
+
+def test_random_uuid_is_stable():
+    """Test that a random UUID is created on first read and then kept."""
+    subnet = VpcGenerator(VPC).generate_subnets()[0]
+
+    assert subnet["uuid"] == subnet["uuid"]
+    assert json.loads(dumps([subnet]))[0]["uuid"] == subnet["uuid"]
+
+
+def test_records_pickle():
+    """Test that records survive the trip back from a worker process."""
+    subnets = VpcGenerator(VPC, fields="cidr,vlan_id,name").generate_subnets()
+
+    assert pickle.loads(pickle.dumps(subnets)) == subnets
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -1,4 +1,5 @@
 import base64
+import io
 import json
 import os
 import sys
@@ -9,6 +10,7 @@ import pytest
 # Add the parent directory to sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+from scripts import terraform_data_external
 from scripts.terraform_data_external import TerraformDataExternal
 
 
@@ -111,5 +113,58 @@ def test_encode_data_with_error():
         encoder.encode_data()
 
 
+def test_deterministic_timestamp():
+    """Test that deterministic mode derives the timestamp from the input."""
+    first = TerraformDataExternal(deterministic=True)
+    second = TerraformDataExternal(deterministic=True)
+    first.process_inputs({"vpcs": [], "b": 1})
+    second.process_inputs({"b": 1, "vpcs": []})
+
+    assert first.timestamp.startswith("sha256:")
+    assert first.timestamp == second.timestamp
+    assert first.encode_data() == second.encode_data()
+
+    second.process_inputs({"b": 2, "vpcs": []})
+    assert first.timestamp != second.timestamp
+
+
+def test_encode_data_source_modes():
+    """Test that the source echo can be hashed or omitted."""
+    encoder = TerraformDataExternal(source_mode="hash")
+    encoder.process_inputs({"vpcs": []})
+    decoded = json.loads(base64.b64decode(encoder.encode_data()).decode())
+    assert set(decoded["source"]) == {"sha256"}
+
+    encoder = TerraformDataExternal(source_mode="omit")
+    encoder.process_inputs({"vpcs": []})
+    decoded = json.loads(base64.b64decode(encoder.encode_data()).decode())
+    assert "source" not in decoded
+    assert "config" in decoded and "timestamp" in decoded
+
+    with pytest.raises(ValueError, match="Invalid source mode"):
+        TerraformDataExternal(source_mode="partial")
+
+
+def test_write_encoded_matches_one_shot_encoding(monkeypatch):
+    """Test that streamed chunks decode to exactly the json.dumps document."""
+    monkeypatch.setattr(terraform_data_external, "BASE64_CHUNK_SIZE", 6)
+    encoder = TerraformDataExternal(deterministic=True)
+    encoder.config = {"2": {"subnets": [{"b": 1, "a": [1, {}]}, {}]}, "1": {}}
+    encoder.process_inputs({"vpcs": [{"vpc_id": 1}], "empty": []})
+
+    stream = io.StringIO()
+    written = encoder.write_encoded(stream)
+    expected = json.dumps(
+        {
+            "config": encoder.config,
+            "source": encoder.source,
+            "timestamp": encoder.timestamp,
+        },
+        sort_keys=True,
+    )
+    assert written == len(stream.getvalue())
+    assert base64.b64decode(stream.getvalue()).decode() == expected
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
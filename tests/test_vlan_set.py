@@ -0,0 +1,82 @@
+import os
+import sys
+
+import pytest
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts.vlan_set import RESERVED_VLANS, VlanSet
+
+
+def test_parse_mixed_grammar():
+    """Test parsing of single IDs, ranges and mixed lists."""
+    assert list(VlanSet.parse("7")) == [7]
+    assert list(VlanSet.parse("1-4")) == [1, 2, 3, 4]
+    assert list(VlanSet.parse("1, 5-7,10")) == [1, 5, 6, 7, 10]
+    assert str(VlanSet.parse("1,5-7,8,10")) == "1,5-8,10"
+    assert len(VlanSet.parse("1-4094")) == 4094
+
+
+@pytest.mark.parametrize("text", ["", "a", "1-", "5-3", "4096", "-1", "1,,2"])
+def test_parse_invalid(text):
+    """Test that malformed or out of range specifications are rejected."""
+    with pytest.raises(ValueError, match="Invalid VLAN range"):
+        VlanSet.parse(text)
+
+
+@pytest.mark.parametrize("text", ["3,1,2", "1,1", "1-5,3", "5-7,1"])
+def test_parse_rejects_unsorted_or_repeated_ids(text):
+    """Test that lists whose order would be lost are rejected, not sorted."""
+    with pytest.raises(ValueError, match="must be ascending and must not repeat"):
+        VlanSet.parse(text)
+
+
+def test_membership_and_set_algebra():
+    """Test membership checks and set operators."""
+    vlans = VlanSet.parse("0-10")
+    assert 0 in vlans and 10 in vlans
+    assert 11 not in vlans and -1 not in vlans and "1" not in vlans
+
+    usable = vlans - RESERVED_VLANS
+    assert list(usable) == list(range(1, 11))
+    assert usable | VlanSet.parse("1002") == VlanSet.parse("1-10,1002")
+    assert vlans & VlanSet.parse("5-20") == VlanSet.parse("5-10")
+    assert vlans ^ VlanSet.parse("5-20") == VlanSet.parse("0-4,11-20")
+    assert VlanSet.from_ids([3, 1, 2]) == VlanSet.parse("1-3")
+    assert not VlanSet()
+
+
+def test_rank_and_positions():
+    """Test that remaining IDs keep their index in the declared set."""
+    declared = VlanSet.parse("0-3,1000-1006")
+    usable = declared - RESERVED_VLANS
+    assert declared.rank(1000) == 4
+    assert list(usable.positions(declared)) == [
+        (1, 1),
+        (2, 2),
+        (3, 3),
+        (4, 1000),
+        (5, 1001),
+        (10, 1006),
+    ]
+    assert list(usable.positions(declared, 2, 6)) == [
+        (2, 2),
+        (3, 3),
+        (4, 1000),
+        (5, 1001),
+    ]
+    assert list(usable.positions(declared, 6, 10)) == []
+
+
+def test_select():
+    """Test that select() is the inverse of rank() for members."""
+    declared = VlanSet.parse("0-3,1000-1006")
+    assert [declared.select(declared.rank(v)) for v in declared] == list(declared)
+    assert declared.select(4) == 1000
+    with pytest.raises(IndexError):
+        declared.select(11)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
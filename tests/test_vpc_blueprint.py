@@ -1,14 +1,16 @@
 import json
 import os
 import sys
+import uuid
 
 import pytest
 
 # Add the parent directory to sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+from scripts import vpc_blueprint
 from scripts.placeholder_processor import PlaceholderProcessor
-from scripts.vpc_blueprint import VpcGenerator
+from scripts.vpc_blueprint import SUBNET_UUID_NAMESPACE, VpcGenerator
 
 
 def test_vpc_generator_init():
@@ -91,12 +93,243 @@ def test_generate_subnets_with_unifi():
     )  # 4 VLANs specified, one is reserved for Teleport VPN
 
 
+def test_generate_subnets_deterministic():
+    """Test that deterministic mode derives stable UUIDs from the subnet."""
+    vpc_config = {
+        "vpc_id": 1,
+        "vpc_cidr": "10.0.0.0/24",
+        "vpc_name": "Test VPC",
+        "vpc_subnets": 2,
+        "settings": {"vlan_range": "1,2"},
+    }
+    first = VpcGenerator(vpc_config, deterministic=True).generate_subnets()
+    second = VpcGenerator(vpc_config, deterministic=True).generate_subnets()
+
+    assert first == second
+    assert first[0]["uuid"] != first[1]["uuid"]
+    assert first[0]["uuid"] == str(
+        uuid.uuid5(uuid.UUID(SUBNET_UUID_NAMESPACE), "1/10.0.0.0/25/1")
+    )
+
+
+def test_generate_all_parallel_matches_serial(monkeypatch):
+    """Test that the process pool returns the serial results in order."""
+    monkeypatch.setattr(vpc_blueprint, "PARALLEL_MIN_SUBNETS", 0)
+    vpcs = [
+        {
+            "vpc_id": vpc_id,
+            "vpc_cidr": f"10.{vpc_id}.0.0/16",
+            "vpc_name": f"VPC {vpc_id}",
+            "vpc_subnets": 16,
+            "settings": {"vlan_range": "1-16"},
+        }
+        for vpc_id in range(6)
+    ]
+    serial = vpc_blueprint.generate_all(vpcs, deterministic=True)
+    parallel = vpc_blueprint.generate_all(vpcs, deterministic=True, workers=2)
+
+    assert parallel == serial
+    assert [subnets[0]["cidr"] for subnets in parallel][:2] == [
+        "10.0.0.0/20",
+        "10.1.0.0/20",
+    ]
+
+
+def test_generate_all_small_input_stays_serial(monkeypatch):
+    """Test that small inputs skip the process pool."""
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("process pool used for a small input")
+
+    monkeypatch.setattr("concurrent.futures.ProcessPoolExecutor", no_pool)
+    vpcs = [
+        {
+            "vpc_id": 1,
+            "vpc_cidr": "10.0.0.0/24",
+            "vpc_name": "Test VPC",
+            "vpc_subnets": 2,
+            "settings": {"vlan_range": "1-2"},
+        }
+    ] * 3
+    assert len(vpc_blueprint.generate_all(vpcs, workers="auto")) == 3
+
+
+def test_generate_subnets_field_projection(monkeypatch):
+    """Test that only the requested fields are generated."""
+
+    def no_uuid(*args):
+        raise AssertionError("uuid computed although not requested")
+
+    vpc_config = {
+        "vpc_id": 1,
+        "vpc_cidr": "10.0.0.0/24",
+        "vpc_name": "Test VPC",
+        "vpc_subnets": 2,
+        "settings": {"vlan_range": "1,2"},
+        "template": {"name": "{vpc_name} {count_index}"},
+    }
+    generator = VpcGenerator(vpc_config, fields="vlan_id, cidr,gateway")
+    monkeypatch.setattr(generator, "_subnet_uuid", no_uuid)
+
+    assert generator.generate_subnets() == [
+        {"cidr": "10.0.0.0/25", "vlan_id": 1, "gateway": "10.0.0.1"},
+        {"cidr": "10.0.0.128/25", "vlan_id": 2, "gateway": "10.0.0.129"},
+    ]
+    with pytest.raises(ValueError, match="Invalid subnet fields"):
+        VpcGenerator(vpc_config, fields=["cidr", "mtu"])
+
+
+def test_generate_columns():
+    """Test the struct-of-arrays layout."""
+    vpc_config = {
+        "vpc_id": 1,
+        "vpc_cidr": "192.168.0.0/16",
+        "vpc_name": "Test VPC",
+        "vpc_subnets": 4,
+        "settings": {"vlan_range": "1-4"},
+    }
+    generator = VpcGenerator(
+        vpc_config, ubiquity_unifi=True, fields=["cidr", "name", "gateway"]
+    )
+    rows = generator.generate_subnets()
+    columns = generator.generate_columns()
+
+    assert list(columns) == ["cidr", "name", "gateway"]
+    assert columns["cidr"] == [row["cidr"] for row in rows]
+    assert columns["name"][0] == "Teleport VPN server"
+    assert columns["gateway"] == [
+        None,
+        "192.168.64.1",
+        "192.168.128.1",
+        "192.168.192.1",
+    ]
+
+    with pytest.raises(ValueError, match="Invalid layout"):
+        vpc_blueprint.generate_all([vpc_config], layout="tree")
+
+
+def test_generate_subnets_with_subnet_sizes():
+    """Test variable-length subnets from a size specification."""
+    vpc_config = {
+        "vpc_id": 1,
+        "vpc_cidr": "10.0.0.0/16",
+        "vpc_name": "Test VPC",
+        "vpc_subnets": 1,
+        "subnet_sizes": "/20, 2x60",
+        "settings": {"vlan_range": "10-12"},
+    }
+    generator = VpcGenerator(vpc_config, fields="cidr,device_count,vlan_id")
+
+    assert generator.generate_subnets() == [
+        {"cidr": "10.0.0.0/20", "device_count": 4094, "vlan_id": 10},
+        {"cidr": "10.0.16.0/26", "device_count": 62, "vlan_id": 11},
+        {"cidr": "10.0.16.64/26", "device_count": 62, "vlan_id": 12},
+    ]
+
+    vpc_config["subnet_sizes"] = "/17,/17,/24"
+    with pytest.raises(ValueError, match="need 65792 addresses"):
+        generator.generate_subnets()
+    for invalid in ("/8", "2x", "-3", "0x/24"):
+        vpc_config["subnet_sizes"] = invalid
+        with pytest.raises(ValueError, match="(?i)subnet size"):
+            generator.generate_subnets()
+
+
+def test_generate_subnets_with_reserved_ranges():
+    """Test that reserved subnets are tagged and excluded ones skipped."""
+    vpc_config = {
+        "vpc_id": 1,
+        "vpc_cidr": "10.0.0.0/22",
+        "vpc_name": "Test VPC",
+        "vpc_subnets": 4,
+        "reserved_ranges": {"10.0.1.0/25": "Printers"},
+        "excluded_ranges": ["10.0.3.0/24"],
+        "settings": {"vlan_range": "1-4"},
+    }
+    generator = VpcGenerator(vpc_config, fields="cidr,name,gateway,description")
+
+    assert generator.generate_subnets() == [
+        {
+            "cidr": "10.0.0.0/24",
+            "name": "Test VPC Region 0",
+            "gateway": "10.0.0.1",
+            "description": "Default VLAN, often used for management",
+        },
+        {
+            "cidr": "10.0.1.0/24",
+            "name": "Printers",
+            "gateway": None,
+            "description": "Reserved for Printers",
+        },
+        {
+            "cidr": "10.0.2.0/24",
+            "name": "Test VPC Region 2",
+            "gateway": "10.0.2.1",
+            "description": "Dynamic",
+        },
+    ]
+
+
+def test_apply_vpc_settings():
+    """Test that global and per-VPC query settings are merged into each VPC."""
+    vpcs = [{"vpc_id": 1}, {"vpc_id": 2, "excluded_ranges": ["10.2.0.0/24"]}]
+    query = {
+        "reserved_ranges": json.dumps(
+            {"*": {"10.0.0.0/24": "A"}, "1": {"10.1.0.0/24": "B"}}
+        ),
+        "excluded_ranges": json.dumps({"2": ["10.3.0.0/24"]}),
+        "subnet_sizes": json.dumps({"2": "/24"}),
+    }
+    assert vpc_blueprint._apply_vpc_settings(vpcs, query) == [
+        {"vpc_id": 1, "reserved_ranges": {"10.0.0.0/24": "A", "10.1.0.0/24": "B"}},
+        {
+            "vpc_id": 2,
+            "excluded_ranges": ["10.3.0.0/24", "10.2.0.0/24"],
+            "subnet_sizes": "/24",
+            "reserved_ranges": {"10.0.0.0/24": "A"},
+        },
+    ]
+    assert vpc_blueprint._apply_vpc_settings(vpcs, {}) is vpcs
+
+
+def test_specific_reserved_ranges_override_global_ones():
+    """Test that per-VPC and inline ranges win over the "*" ranges they overlap."""
+    vpcs = [
+        {
+            "vpc_id": 1,
+            "vpc_cidr": "10.0.0.0/22",
+            "vpc_name": "Test VPC",
+            "vpc_subnets": 4,
+            "settings": {"vlan_range": "1-4"},
+            "reserved_ranges": {"10.0.3.0/24": "inline", "10.0.2.0/24": "inline"},
+        }
+    ]
+    query = {
+        "reserved_ranges": json.dumps(
+            {
+                "*": {"10.0.0.0/22": "global", "10.0.2.0/24": "global"},
+                "1": {"10.0.1.0/24": "storage", "10.0.3.0/24": "storage"},
+            }
+        )
+    }
+    (vpc,) = vpc_blueprint._apply_vpc_settings(vpcs, query)
+    subnets = VpcGenerator(vpc, fields="cidr,name").generate_subnets()
+
+    assert [subnet["name"] for subnet in subnets] == [
+        "global",
+        "storage",
+        "inline",
+        "inline",
+    ]
+
+
 def test_parse_vlan_range():
     """Test parsing of VLAN range strings."""
     generator = VpcGenerator({})
-    assert generator._parse_vlan_range("1-3") == [1, 2, 3]
-    assert generator._parse_vlan_range("1,2,3") == [1, 2, 3]
-    assert generator._parse_vlan_range("1") == [1]
+    assert list(generator._parse_vlan_range("1-3")) == [1, 2, 3]
+    assert list(generator._parse_vlan_range("1,2,3")) == [1, 2, 3]
+    assert list(generator._parse_vlan_range("1")) == [1]
+    assert list(generator._parse_vlan_range("1,5-7")) == [1, 5, 6, 7]
 
 
 def test_calculate_new_prefix():
@@ -105,6 +338,135 @@ def test_calculate_new_prefix():
     assert generator._calculate_new_prefix(24, 2) == 25  # /24 to /25 for 2 subnets
     with pytest.raises(ValueError):
         generator._calculate_new_prefix(32, 2)  # Can't divide /32 further
+    assert generator._calculate_new_prefix(48, 65536, 128) == 64  # IPv6 /48 to /64
+
+
+def test_iter_subnets_ipv6_page():
+    """Test paging through an IPv6 split without generating earlier subnets."""
+    vpc_config = {
+        "vpc_id": 6,
+        "vpc_cidr": "2001:db8::/48",
+        "vpc_name": "IPv6 VPC",
+        "vpc_subnets": 65536,
+        "settings": {"vlan_range": None},
+        "template": {"name": "{vpc_name} {count_index}"},
+    }
+    generator = VpcGenerator(vpc_config)
+    page = generator.generate_subnets(offset=10000, limit=100)
+
+    assert len(page) == 100
+    assert page[0]["cidr"] == "2001:db8:0:2710::/64"
+    assert page[0]["gateway"] == "2001:db8:0:2710::1"
+    assert page[0]["name"] == "IPv6 VPC 10001"
+    assert page[0]["vlan_id"] is None
+    assert page[-1]["cidr"] == "2001:db8:0:2773::/64"
+
+    last_page = list(generator.iter_subnets(offset=65530))
+    assert len(last_page) == 6
+
+
+def test_generate_subnets_page_matches_full_list():
+    """Test that a page equals the same slice of the full result."""
+    vpc_config = {
+        "vpc_id": 1,
+        "vpc_cidr": "10.0.0.0/16",
+        "vpc_name": "Test VPC",
+        "vpc_subnets": 4096,
+        "settings": {"vlan_range": "1-3000"},
+    }
+    generator = VpcGenerator(vpc_config)
+    full = generator.generate_subnets()
+    page = generator.generate_subnets(offset=1500, limit=1200)
+
+    # VLANs 1002-1005 are reserved and get no subnet.
+    assert len(full) == 2996
+    assert [s["vlan_id"] for s in full[1000:1002]] == [1001, 1006]
+    strip = lambda subnets: [{**s, "uuid": None} for s in subnets]
+    assert strip(page) == strip(full[1496:2696])
+
+
+@pytest.mark.parametrize(
+    "vpc_subnets, settings",
+    [
+        (6, {"vlan_range": None}),
+        (12, {"vlan_range": "1,1000-1003,2000-2002"}),
+        (40, {"vlan_range": "1-4094"}),
+    ],
+)
+def test_estimate_matches_generated_subnets(vpc_subnets, settings):
+    """Test that the estimate agrees with the subnets actually generated."""
+    vpc_config = {
+        "vpc_id": 1,
+        "vpc_cidr": "10.0.0.0/22",
+        "vpc_name": "Test VPC",
+        "vpc_subnets": vpc_subnets,
+        "settings": settings,
+    }
+    generator = VpcGenerator(vpc_config)
+    estimate = generator.estimate()
+    subnets = generator.generate_subnets()
+
+    prefixlen = int(subnets[0]["cidr"].split("/")[1])
+    size = 1 << (32 - prefixlen)
+    assert estimate["subnet_prefix"] == prefixlen
+    assert estimate["subnets"] == len(subnets)
+    assert estimate["unused_addresses"] == 1024 - len(subnets) * size
+    assert (
+        estimate["rounding_waste"] == (estimate["subnets_carved"] - vpc_subnets) * size
+    )
+    first, last = (
+        int(subnets[0][key].split(".")[3]) for key in ("dhcp_start", "dhcp_stop")
+    )
+    assert estimate["dhcp_pool_size"] == last - first + 1
+    assert estimate["static_addresses"] == size - 3 - estimate["dhcp_pool_size"]
+
+
+def test_estimate_huge_split_and_errors():
+    """Test that splits too large to generate are estimated and failures reported."""
+    vpc_config = {
+        "vpc_id": 1,
+        "vpc_cidr": "2001:db8::/32",
+        "vpc_subnets": 2**32 - 1,
+        "settings": {"vlan_range": None},
+    }
+    estimate = VpcGenerator(vpc_config).estimate()
+    assert estimate["subnet_prefix"] == 64
+    assert estimate["subnets"] == 2**32
+    assert estimate["rounding_waste"] == 2**64
+    assert estimate["error"] is None
+
+    vpc_config.update(vpc_cidr="10.0.0.0/30", vpc_subnets=5)
+    estimate = VpcGenerator(vpc_config).estimate()
+    assert estimate["error"] == "Cannot subdivide network further due to subnet limit."
+    assert estimate["subnets"] is None
+
+    vpc_config.update(subnet_sizes="/31,2x/32")
+    estimate = VpcGenerator(vpc_config).estimate()
+    assert estimate["subnets"] == 3
+    assert estimate["unused_addresses"] == 0
+    assert estimate["error"] is None
+
+
+def test_estimate_query():
+    """Test that a query is estimated per VPC after merging its settings."""
+    vpcs = [
+        {"vpc_id": 1, "vpc_subnets": 3, "settings": {"vlan_range": "1-10"}},
+        {"vpc_id": 2, "vpc_cidr": "10.9.0.0/24", "settings": {}},
+    ]
+    query = {
+        "vpcs": json.dumps(vpcs),
+        "vpc_pools": '["10.8.0.0/16"]',
+        "vpc_pool_newbits": "6",
+        "subnet_sizes": '{"2": "100,2x/27"}',
+    }
+    estimates = vpc_blueprint.estimate_query(query)
+
+    assert estimates["1"]["vpc_cidr"] == "10.8.4.0/22"
+    assert estimates["1"]["subnets"] == 4
+    assert estimates["1"]["rounding_waste"] == 256
+    # Only VLAN 1 is in the default range, so one subnet is generated.
+    assert estimates["2"]["subnets"] == 1
+    assert estimates["2"]["unused_addresses"] == 128
 
 
 if __name__ == "__main__":
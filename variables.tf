@@ -26,12 +26,26 @@ variable "vpc_configurations" {
   validation {
     condition = alltrue([
       for config in var.vpc_configurations :
-      can(cidrsubnet(config.vpc_cidr, 0, 0)) # Checks if the CIDR is valid
+      (config.vpc_cidr == "" || can(cidrsubnet(config.vpc_cidr, 0, 0))) # Checks if the CIDR is valid; "" is assigned from vpc_pools
       && config.vpc_subnets > 0
       && length(config.settings.subdomains) > 0
       && try(regex("^\\d+(-\\d+)?(,\\d+(-\\d+)?)*$", config.settings.vlan_range), "") != "" # Ensures VLAN range is in correct format
     ])
-    error_message = "Each VPC configuration must have a valid CIDR, positive number of subnets, at least one subdomain, and a properly formatted VLAN range (e.g., '1-5', '1,2,3', '1,5-7')."
+    error_message = "Each VPC configuration must have a valid CIDR (or \"\", with vpc_pools), positive number of subnets, at least one subdomain, and a properly formatted VLAN range (e.g., '1-5', '1,2,3', '1,5-7')."
+  }
+}
+
+variable "subnet_sizes" {
+  type        = map(string)
+  default     = {}
+  description = "Per-VPC subnet sizes, keyed by VPC ID. Each value is a comma separated list of items, each an optional `<count>x` followed by a prefix length (`/26`) or a number of devices (`60`), for example `\"/20,20x/26\"`. Subnets are placed in the VPC CIDR largest first by a buddy allocator instead of splitting it into `vpc_subnets` equal parts."
+
+  validation {
+    condition = alltrue([
+      for sizes in values(var.subnet_sizes) :
+      can(regex("^(\\d+x)?/?\\d+(,(\\d+x)?/?\\d+)*$", sizes))
+    ])
+    error_message = "Each subnet_sizes value must be a comma separated list of sizes (e.g., '/20,20x/26', '500,20x60')."
   }
 }
 
@@ -43,4 +57,102 @@ variable "ubiquity_unifi" {
     condition     = var.ubiquity_unifi == true || var.ubiquity_unifi == false
     error_message = "The ubiquity_unifi variable must be a boolean value (true or false)."
   }
-}
\ No newline at end of file
+}
+
+variable "deterministic" {
+  type        = bool
+  default     = false
+  description = "Flag to make the generated output reproducible. When enabled, subnet UUIDs are derived from the VPC ID, CIDR and VLAN ID, and the timestamp is replaced by a hash of the input, so identical input produces an identical output and plans stay clean."
+}
+
+variable "cache_dir" {
+  type        = string
+  default     = ""
+  description = "Directory in which to cache the generated output, keyed by a hash of the query and the script version. A cache hit skips generation entirely. Leave empty to disable caching."
+}
+
+variable "state_dir" {
+  type        = string
+  default     = ""
+  description = "Directory holding each VPC's generated subnets, one file per fingerprint of its configuration. When set, only VPCs whose configuration changed since the previous run are regenerated. Entries unused for a week are removed, so the directory can be shared. Leave empty to regenerate every VPC."
+}
+
+variable "use_daemon" {
+  type        = bool
+  default     = false
+  description = "Flag to run the generator through the thin client, which forwards the query to a server started with `python3 scripts/vpc_blueprint.py --serve` and falls back to in-process execution when no server is running. The server answers each query with the `VPC_BLUEPRINT_*` variables and working directory of the `terraform` process, as in-process execution would; only traces to `stderr` and log records go to the server's standard error."
+}
+
+variable "reserved_ranges" {
+  type        = map(map(string))
+  default     = {}
+  description = "Address ranges to reserve, keyed by VPC ID or `\"*\"` for every VPC. Each value maps a CIDR to its purpose. Subnets that overlap a reserved range are kept with the purpose as their name and without gateway, DHCP range or domain. Where ranges overlap, a VPC's own ranges win over the `\"*\"` ones. Ranges are looked up through a sorted interval index, so hundreds of them cost little."
+}
+
+variable "excluded_ranges" {
+  type        = map(list(string))
+  default     = {}
+  description = "Address ranges to leave out, keyed by VPC ID or `\"*\"` for every VPC. Subnets that overlap an excluded range are not generated; their VLAN ID is not reused."
+}
+
+variable "source_mode" {
+  type        = string
+  default     = "full"
+  description = "How the input is echoed in the `source` output: `full` echoes it verbatim, `hash` replaces it with its sha256, and `omit` leaves it out to shrink the encoded payload."
+  validation {
+    condition     = contains(["full", "hash", "omit"], var.source_mode)
+    error_message = "The source_mode variable must be one of \"full\", \"hash\" or \"omit\"."
+  }
+}
+
+variable "output_layout" {
+  type        = string
+  default     = "rows"
+  description = "Layout of each VPC in the `config` output: `rows` emits a list of subnet objects, `columns` emits one array per subnet field, which keeps the key names out of the payload for large VPCs."
+  validation {
+    condition     = contains(["rows", "columns"], var.output_layout)
+    error_message = "The output_layout variable must be either \"rows\" or \"columns\"."
+  }
+}
+
+variable "output_fields" {
+  type        = list(string)
+  default     = []
+  description = "Subnet fields to generate, out of `cidr`, `device_count`, `uuid`, `vlan_id`, `dhcp_start`, `dhcp_stop`, `domain`, `name`, `gateway` and `description`. Fields that are not listed are never computed. An empty list generates all fields."
+}
+
+variable "strict_templates" {
+  type        = bool
+  default     = false
+  description = "Flag to fail the plan on the first template placeholder that cannot be resolved, or template that fails to render, instead of keeping it as written and logging one summary of all such problems."
+}
+
+variable "vpc_pools" {
+  type        = list(string)
+  default     = []
+  description = "Supernets to assign VPC CIDRs from, in order of preference. Each pool is cut into 2^`vpc_pool_newbits` slots, and a VPC whose `vpc_cidr` is `\"\"` gets the start of slot `vpc_id` of the first pool whose slots hold it, sized by `vpc_prefixes` or to hold `vpc_subnets` /24 (IPv4) or /64 (IPv6) subnets. A VPC's CIDR only depends on its own ID and size, so adding, removing or resizing other VPCs never moves it. When set, all VPCs must be disjoint, and the assigned CIDR is returned as `vpc_cidr` next to each VPC's subnets."
+}
+
+variable "vpc_prefixes" {
+  type        = map(number)
+  default     = {}
+  description = "Prefix length of the block to assign from `vpc_pools` to each VPC whose `vpc_cidr` is `\"\"`, keyed by VPC ID. VPCs without an entry get a block that holds their `vpc_subnets` /24 (IPv4) or /64 (IPv6) subnets."
+
+  validation {
+    condition = alltrue([
+      for prefix in values(var.vpc_prefixes) :
+      prefix >= 0 && prefix <= 128 && floor(prefix) == prefix
+    ])
+    error_message = "Each vpc_prefixes value must be a prefix length between 0 and 128."
+  }
+}
+
+variable "vpc_pool_newbits" {
+  type        = number
+  default     = 8
+  description = "Bits added to the prefix length of each of `vpc_pools` to get the size of its per-VPC slots, as the `newbits` of `cidrsubnet()`. VPC IDs must be below 2^`vpc_pool_newbits`."
+  validation {
+    condition     = var.vpc_pool_newbits >= 0 && floor(var.vpc_pool_newbits) == var.vpc_pool_newbits
+    error_message = "The vpc_pool_newbits variable must be a non-negative whole number."
+  }
+}